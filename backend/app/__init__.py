@@ -1,8 +1,25 @@
 # -*- coding: utf-8 -*-
 from flask import Flask, jsonify
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 from config import config
 from app.models import db
+from app.utils.password import password_hasher, PasswordHasherBusy
+from app.utils.permission_resolver import permission_resolver
+from app.utils.jwt_utils import init_token_cache
+from app.utils.user_search import user_search
+from app.utils.json_provider import init_json_provider
+from app.utils.token_denylist import token_denylist
+from app.utils.session_registry import session_registry
+from app.utils.server_monitor import server_monitor
+from app.utils.audit import audit_log
+from app.utils.login_records import login_records
+from app.utils.rate_limit import login_limiter
+from app.utils.metrics import metrics
+from app.utils.sql_profiler import sql_profiler
+from app.utils.db_pool import engine_options, warmup
+from app.utils.menu_tree import seed_default_menus
+from app.utils.file_store import file_store
 
 
 def create_app():
@@ -12,12 +29,94 @@ def create_app():
     app.config['SECRET_KEY'] = config.SECRET_KEY
     app.config['JWT_SECRET_KEY'] = config.JWT_SECRET_KEY
     app.config['JWT_EXPIRE_HOURS'] = config.JWT_EXPIRE_HOURS
+    app.config['JWT_CACHE_SIZE'] = config.JWT_CACHE_SIZE
+    app.config['TOKEN_DENYLIST_STORE'] = config.TOKEN_DENYLIST_STORE
+    app.config['TOKEN_DENYLIST_REFRESH'] = config.TOKEN_DENYLIST_REFRESH
+    app.config['TOKEN_BLOOM_BITS'] = config.TOKEN_BLOOM_BITS
+    app.config['SESSION_IDLE_TIMEOUT'] = config.SESSION_IDLE_TIMEOUT
+    app.config['SESSION_FLUSH_INTERVAL'] = config.SESSION_FLUSH_INTERVAL
+    app.config['SERVER_MONITOR_INTERVAL'] = config.SERVER_MONITOR_INTERVAL
+    app.config['SERVER_MONITOR_PROCESS_INTERVAL'] = config.SERVER_MONITOR_PROCESS_INTERVAL
+    app.config['SERVER_MONITOR_DISK_INTERVAL'] = config.SERVER_MONITOR_DISK_INTERVAL
+    app.config['SERVER_MONITOR_DIR'] = config.SERVER_MONITOR_DIR
     app.config['SQLALCHEMY_DATABASE_URI'] = config.SQLALCHEMY_DATABASE_URI
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = config.SQLALCHEMY_TRACK_MODIFICATIONS
     app.config['SQLALCHEMY_ECHO'] = config.SQLALCHEMY_ECHO
+    app.config['DB_AUTO_CREATE'] = config.DB_AUTO_CREATE
+    app.config['DB_POOL_SIZE'] = config.DB_POOL_SIZE
+    app.config['DB_MAX_OVERFLOW'] = config.DB_MAX_OVERFLOW
+    app.config['DB_POOL_TIMEOUT'] = config.DB_POOL_TIMEOUT
+    app.config['DB_POOL_RECYCLE'] = config.DB_POOL_RECYCLE
+    app.config['DB_POOL_PRE_PING'] = config.DB_POOL_PRE_PING
+    app.config['DB_POOL_USE_LIFO'] = config.DB_POOL_USE_LIFO
+    app.config['DB_POOL_WARMUP'] = config.DB_POOL_WARMUP
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
+    app.config['HTTP_CACHE_VERSION_TTL'] = config.HTTP_CACHE_VERSION_TTL
+    app.config['PROXY_TRUSTED_HOPS'] = config.PROXY_TRUSTED_HOPS
+    app.config['LOGIN_LIMIT_ENABLED'] = config.LOGIN_LIMIT_ENABLED
+    app.config['LOGIN_LIMIT_STORE'] = config.LOGIN_LIMIT_STORE
+    app.config['LOGIN_LIMIT_SIZE'] = config.LOGIN_LIMIT_SIZE
+    app.config['LOGIN_IP_RATE'] = config.LOGIN_IP_RATE
+    app.config['LOGIN_FAIL_LIMIT'] = config.LOGIN_FAIL_LIMIT
+    app.config['LOGIN_IP_FAIL_LIMIT'] = config.LOGIN_IP_FAIL_LIMIT
+    app.config['LOGIN_LOCKOUT_BASE'] = config.LOGIN_LOCKOUT_BASE
+    app.config['LOGIN_LOCKOUT_MAX'] = config.LOGIN_LOCKOUT_MAX
+    app.config['BCRYPT_ROUNDS'] = config.BCRYPT_ROUNDS
+    app.config['BCRYPT_WORKERS'] = config.BCRYPT_WORKERS
+    app.config['BCRYPT_MAX_PENDING'] = config.BCRYPT_MAX_PENDING
+    app.config['BCRYPT_TIMEOUT'] = config.BCRYPT_TIMEOUT
+    app.config['JSON_PROVIDER'] = config.JSON_PROVIDER
+    app.config['PERMISSION_CACHE_SIZE'] = config.PERMISSION_CACHE_SIZE
+    app.config['PERMISSION_CACHE_TTL'] = config.PERMISSION_CACHE_TTL
+    app.config['PERMISSION_VERSION_TTL'] = config.PERMISSION_VERSION_TTL
+    app.config['USER_SEARCH_BACKEND'] = config.USER_SEARCH_BACKEND
+    app.config['USER_SEARCH_LIMIT'] = config.USER_SEARCH_LIMIT
+    app.config['USER_IMPORT_CHUNK_SIZE'] = config.USER_IMPORT_CHUNK_SIZE
+    app.config['USER_IMPORT_MAX_ERRORS'] = config.USER_IMPORT_MAX_ERRORS
+    app.config['EXPORT_BATCH_SIZE'] = config.EXPORT_BATCH_SIZE
+    app.config['FILE_UPLOAD_DIR'] = config.FILE_UPLOAD_DIR
+    app.config['FILE_MAX_SIZE'] = config.FILE_MAX_SIZE
+    app.config['FILE_ALLOWED_EXTENSIONS'] = config.FILE_ALLOWED_EXTENSIONS
+    app.config['FILE_CHUNK_SIZE'] = config.FILE_CHUNK_SIZE
+    app.config['FILE_UPLOAD_EXPIRE'] = config.FILE_UPLOAD_EXPIRE
+    app.config['FILE_ACCEL_REDIRECT'] = config.FILE_ACCEL_REDIRECT
+    app.config['USE_X_SENDFILE'] = config.FILE_X_SENDFILE
+    app.config['AUDIT_ENABLED'] = config.AUDIT_ENABLED
+    app.config['AUDIT_BATCH_SIZE'] = config.AUDIT_BATCH_SIZE
+    app.config['AUDIT_FLUSH_MS'] = config.AUDIT_FLUSH_MS
+    app.config['AUDIT_QUEUE_SIZE'] = config.AUDIT_QUEUE_SIZE
+    app.config['AUDIT_OVERFLOW'] = config.AUDIT_OVERFLOW
+    app.config['AUDIT_SAMPLE_EVERY'] = config.AUDIT_SAMPLE_EVERY
+    app.config['LOGIN_RECORD_PARTITION'] = config.LOGIN_RECORD_PARTITION
+    app.config['METRICS_ENABLED'] = config.METRICS_ENABLED
+    app.config['METRICS_PATH'] = config.METRICS_PATH
+    app.config['SQL_PROFILER'] = config.SQL_PROFILER
+    app.config['SQL_PROFILER_TOKEN'] = config.SQL_PROFILER_TOKEN
+    app.config['SQL_PROFILER_N1_THRESHOLD'] = config.SQL_PROFILER_N1_THRESHOLD
+    app.config['SQL_PROFILER_KEEP'] = config.SQL_PROFILER_KEEP
+
+    # 只按配置的可信代理层数采用 X-Forwarded-*，request.remote_addr 即客户端 IP
+    if app.config['PROXY_TRUSTED_HOPS']:
+        hops = app.config['PROXY_TRUSTED_HOPS']
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops)
 
     # 初始化扩展
+    init_json_provider(app)
     db.init_app(app)
+    # 指标钩子最先注册，耗时统计覆盖其它扩展的 before_request
+    metrics.init_app(app)
+    sql_profiler.init_app(app)
+    password_hasher.init_app(app)
+    login_limiter.init_app(app)
+    permission_resolver.init_app(app)
+    init_token_cache(app)
+    token_denylist.init_app(app)
+    session_registry.init_app(app)
+    server_monitor.init_app(app)
+    user_search.init_app(app)
+    audit_log.init_app(app)
+    login_records.init_app(app)
+    file_store.init_app(app)
     CORS(app, resources={r'/api/*': {'origins': '*'}})
 
     # 注册蓝图
@@ -25,113 +124,37 @@ def create_app():
     from app.api.user import user_bp
     from app.api.role import role_bp
     from app.api.permission import permission_bp
+    from app.api.monitor import monitor_bp
+    from app.api.log import log_bp
+    from app.api.menu import menu_bp
+    from app.api.dept import dept_bp
+    from app.api.dictionary import dict_bp
+    from app.api.file import file_bp
 
     app.register_blueprint(auth_bp)
     app.register_blueprint(user_bp)
     app.register_blueprint(role_bp)
     app.register_blueprint(permission_bp)
-
-    # 字典/Lookup stub：返回空列表，避免前端 404
-    from app.utils.jwt_utils import login_required
-    from flask import jsonify as _jsonify
-
-    @app.get('/api/v1/system/dict/type/list/all')
-    @login_required
-    def dict_type_list():
-        return _jsonify({'code': 200, 'msg': 'ok', 'data': []}), 200
-
-    @app.get('/api/v1/system/dict/data/list/all')
-    @login_required
-    def dict_data_list():
-        return _jsonify({'code': 200, 'msg': 'ok', 'data': []}), 200
-
-    # 菜单管理 stub（前端 /system/menu 页面渲染用）
-    MOCK_MENUS = [
-        {
-            "id": 1, "parent_id": 0, "menu_name": "首页", "path": "/home",
-            "component": "/src/views/home/index.vue", "perms": "", "component_name": "home",
-            "order_num": 1, "menu_type": "C", "icon": "iconfont icon-shouye", "status": 1
-        },
-        {
-            "id": 2, "parent_id": 0, "menu_name": "系统设置", "path": "/system",
-            "component": "/src/layout/routerView/parent.vue", "perms": "", "component_name": "system",
-            "order_num": 2, "menu_type": "M", "icon": "iconfont icon-xitongshezhi", "status": 1
-        },
-        {
-            "id": 3, "parent_id": 2, "menu_name": "菜单管理", "path": "/system/menu",
-            "component": "/src/views/system/menu/index.vue", "perms": "system:menu:list", "component_name": "systemMenu",
-            "order_num": 1, "menu_type": "C", "icon": "ele-Menu", "status": 1
-        },
-        {
-            "id": 4, "parent_id": 2, "menu_name": "角色管理", "path": "/system/role",
-            "component": "/src/views/system/role/index.vue", "perms": "system:role:list", "component_name": "systemRole",
-            "order_num": 2, "menu_type": "C", "icon": "ele-ColdDrink", "status": 1
-        },
-        {
-            "id": 5, "parent_id": 2, "menu_name": "用户管理", "path": "/system/user",
-            "component": "/src/views/system/user/index.vue", "perms": "system:user:list", "component_name": "systemUser",
-            "order_num": 3, "menu_type": "C", "icon": "ele-User", "status": 1
-        },
-        {
-            "id": 6, "parent_id": 2, "menu_name": "部门管理", "path": "/system/dept",
-            "component": "/src/views/system/dept/index.vue", "perms": "system:dept:list", "component_name": "systemDept",
-            "order_num": 4, "menu_type": "C", "icon": "ele-OfficeBuilding", "status": 1
-        }
-    ]
-
-    @app.get('/api/v1/system/menu')
-    @login_required
-    def menu_list():
-        return _jsonify({'code': 200, 'msg': 'ok', 'data': MOCK_MENUS, 'total': len(MOCK_MENUS)}), 200
-
-    @app.get('/api/v1/system/menu/tree')
-    @login_required
-    def menu_tree():
-        # 构建树形
-        tree = []
-        for menu in MOCK_MENUS:
-            if menu['parent_id'] == 0:
-                menu_copy = dict(menu)
-                menu_copy['children'] = [dict(m) for m in MOCK_MENUS if m['parent_id'] == menu['id']]
-                tree.append(menu_copy)
-        return _jsonify({'code': 200, 'msg': 'ok', 'data': tree, 'total': len(tree)}), 200
-
-    @app.post('/api/v1/system/menu')
-    @login_required
-    def menu_create():
-        return _jsonify({'code': 200, 'msg': '暂不支持菜单管理，使用静态路由', 'data': None}), 200
-
-    # 部门管理 stub（前端 /system/dept 页面渲染用）
-    @app.get('/api/v1/system/dept')
-    @login_required
-    def dept_list():
-        return _jsonify({'code': 200, 'msg': 'ok', 'data': []}), 200
-
-    @app.get('/api/v1/system/dept/tree')
-    @login_required
-    def dept_tree():
-        return _jsonify({'code': 200, 'msg': 'ok', 'data': []}), 200
-
-    @app.post('/api/v1/system/dept')
-    @login_required
-    def dept_create():
-        return _jsonify({'code': 200, 'msg': 'ok', 'data': None}), 200
-
-    # 字典管理 stub
-    @app.get('/api/v1/system/dict/type')
-    @login_required
-    def dict_type_list2():
-        return _jsonify({'code': 200, 'msg': 'ok', 'data': [], 'total': 0}), 200
-
-    @app.post('/api/v1/system/dict/type')
-    @login_required
-    def dict_type_create():
-        return _jsonify({'code': 200, 'msg': 'ok', 'data': None}), 200
-
-    @app.get('/api/v1/system/dict/data')
-    @login_required
-    def dict_data_list2():
-        return _jsonify({'code': 200, 'msg': 'ok', 'data': [], 'total': 0}), 200
+    app.register_blueprint(monitor_bp)
+    app.register_blueprint(log_bp)
+    app.register_blueprint(menu_bp)
+    app.register_blueprint(dept_bp)
+    app.register_blueprint(dict_bp)
+    app.register_blueprint(file_bp)
+
+    # 自动建表（已存在的表不做变更）
+    if app.config['DB_AUTO_CREATE']:
+        with app.app_context():
+            db.create_all()
+            seed_default_menus()
+    warmup(app)
+
+    from app.utils.response import success as _success
+
+    # 健康检查（容器 HEALTHCHECK、负载均衡探活用，不查库）
+    @app.get('/api/health/health')
+    def health():
+        return _success({'status': 'ok'})
 
     # 全局错误处理
     @app.errorhandler(404)
@@ -142,6 +165,10 @@ def create_app():
     def method_not_allowed(e):
         return jsonify({'code': 405, 'msg': '方法不允许', 'data': None}), 405
 
+    @app.errorhandler(PasswordHasherBusy)
+    def password_hasher_busy(e):
+        return jsonify({'code': 503, 'msg': '服务繁忙，请稍后重试', 'data': None}), 503
+
     @app.errorhandler(500)
     def internal_error(e):
         return jsonify({'code': 500, 'msg': '服务器内部错误', 'data': None}), 500
@@ -1,21 +1,20 @@
 # -*- coding: utf-8 -*-
-import bcrypt
 from flask import Blueprint, request, g
+from app.models import db
 from app.models.user import User
-from app.utils.jwt_utils import generate_token, login_required
+from app.utils.jwt_utils import generate_token, login_required, verify_token_cached
+from app.utils.password import password_hasher, check_password, hash_password
+from app.utils.permission_resolver import permission_resolver
+from app.utils.token_denylist import token_denylist
+from app.utils.session_registry import session_registry
+from app.utils.rate_limit import login_limiter
+from app.utils.login_records import login_records
+from app.utils.menu_tree import menu_tree
 from app.utils.response import success, fail
 
 auth_bp = Blueprint('auth', __name__)
 
 
-def check_password(plain: str, hashed: str) -> bool:
-    """验证密码"""
-    try:
-        return bcrypt.checkpw(plain.encode('utf-8'), hashed.encode('utf-8'))
-    except Exception:
-        return False
-
-
 @auth_bp.post('/api/v1/system/auth/login')
 def login():
     """用户登录"""
@@ -26,17 +25,43 @@ def login():
     if not username or not password:
         return fail('用户名和密码不能为空')
 
+    # 限流在查库与 bcrypt 之前，被锁定或超速的请求不消耗 worker 的 CPU
+    # 按 TCP 对端地址计数，经过可信代理时由 ProxyFix（PROXY_TRUSTED_HOPS）改写，客户端无法用请求头伪造
+    ip = request.remote_addr or ''
+    retry_after = login_limiter.check(username, ip)
+    if retry_after:
+        login_records.record(username, 0, '登录尝试过于频繁')
+        resp, code = fail(f'登录尝试过于频繁，请 {int(retry_after) + 1} 秒后重试', 429)
+        resp.headers['Retry-After'] = str(int(retry_after) + 1)
+        return resp, code
+
     user = User.query.filter_by(username=username, enabled_flag=True).first()
     if not user:
+        login_limiter.failure(username, ip)
+        login_records.record(username, 0, '用户不存在')
         return fail('用户名或密码错误', 401)
 
     if not check_password(password, user.password):
+        login_limiter.failure(username, ip)
+        login_records.record(username, 0, '密码错误', user.id)
         return fail('用户名或密码错误', 401)
 
     if user.status != 1:
+        login_records.record(username, 0, '用户已被禁用', user.id)
         return fail('用户已被禁用', 403)
 
+    login_limiter.success(username)
+
+    # bcrypt cost 配置变更后，登录成功时透明地按新 cost 重新哈希
+    if password_hasher.needs_rehash(user.password):
+        user.password = hash_password(password)
+        db.session.commit()
+
     token = generate_token(user.id)
+    # 顺带预热 token 缓存，登录后的第一个请求不必再验签
+    payload = verify_token_cached(token)
+    session_registry.login(payload)
+    login_records.record(username, 1, '登录成功', user.id, payload['jti'])
     return success({
         'access_token': token,
         'token_type': 'Bearer',
@@ -47,7 +72,10 @@ def login():
 @auth_bp.post('/api/v1/system/auth/logout')
 @login_required
 def logout():
-    """用户登出（前端删除 token 即可，服务端不做处理）"""
+    """用户登出，当前 token 加入黑名单直到过期"""
+    token_denylist.revoke(g.token_payload)
+    session_registry.remove(g.token_payload['jti'])
+    login_records.mark_logout(g.token_payload)
     return success(msg='登出成功')
 
 
@@ -59,13 +87,7 @@ def userinfo():
     if not user or not user.enabled_flag:
         return fail('用户不存在', 404)
 
-    role_codes = [r.role_code for r in user.roles if r.enabled_flag]
-    permissions = []
-    for role in user.roles:
-        if role.enabled_flag:
-            for perm in role.permissions:
-                if perm.enabled_flag and perm.permission_code not in permissions:
-                    permissions.append(perm.permission_code)
+    perms = permission_resolver.resolve(user.id)
 
     return success({
         'id': user.id,
@@ -75,31 +97,27 @@ def userinfo():
         'phone': user.phone,
         'avatar': user.avatar,
         'user_type': user.user_type,
-        'roles': role_codes,
-        'permissions': permissions,
+        'roles': sorted(perms.role_codes),
+        'permissions': sorted(perms.permission_codes),
     })
 
 
 @auth_bp.get('/api/v1/system/auth/menus')
 @login_required
 def menus():
-    """返回用户菜单（前端路由用）— 返回空列表，路由由前端自行控制"""
-    return success([])
+    """返回用户菜单（前端路由用），按用户权限过滤，权限相同的用户共用缓存"""
+    perms = permission_resolver.resolve(g.user_id)
+    if perms is None:
+        return fail('用户不存在', 404)
+    return success(menu_tree.routes_for(perms))
 
 
 @auth_bp.get('/api/v1/system/auth/permissions')
 @login_required
 def permissions():
     """返回当前用户的权限编码列表"""
-    user = User.query.get(g.user_id)
-    if not user or not user.enabled_flag:
+    perms = permission_resolver.resolve(g.user_id)
+    if perms is None:
         return fail('用户不存在', 404)
 
-    perm_codes = []
-    for role in user.roles:
-        if role.enabled_flag:
-            for perm in role.permissions:
-                if perm.enabled_flag and perm.permission_code not in perm_codes:
-                    perm_codes.append(perm.permission_code)
-
-    return success(perm_codes)
+    return success(sorted(perms.permission_codes))
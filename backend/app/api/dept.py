@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+from flask import Blueprint, request, g
+from app.models import db
+from app.models.dept import Dept
+from app.models.user import User
+from app.utils.dept_tree import child_path, subtree_ids_select, is_in_subtree, move
+from app.utils.http_cache import conditional, bump_version
+from app.utils.jwt_utils import login_required
+from app.utils.response import success, fail
+from app.utils.tree import build_tree
+
+dept_bp = Blueprint('dept', __name__)
+
+EDITABLE_FIELDS = ('dept_name', 'sort', 'leader', 'phone', 'email', 'status')
+
+
+def _check_fields(data):
+    """校验排序、状态（不能为 null），返回错误信息"""
+    if 'sort' in data and (not isinstance(data['sort'], int) or isinstance(data['sort'], bool)):
+        return '排序值错误'
+    if 'status' in data and data['status'] not in (0, 1):
+        return '状态值错误'
+    return None
+
+
+def _get_dept(dept_id):
+    return Dept.query.filter_by(id=dept_id, enabled_flag=True).first()
+
+
+def _dept_tree(name='', status=None) -> list:
+    """一次查询取出全部部门并挂接成树；按名称过滤时保留命中部门的祖先，树不断开"""
+    rows = db.session.execute(
+        db.select(*Dept.serialize_columns()).where(Dept.enabled_flag == True).order_by(Dept.sort, Dept.id)
+    ).all()
+    depts = Dept.rows_to_dicts(rows)
+    if status is not None:
+        depts = [d for d in depts if d['status'] == status]
+    if name:
+        keep = set()
+        for d in depts:
+            if name in d['dept_name']:
+                keep.update(int(i) for i in d['path'].strip('/').split('/'))
+        depts = [d for d in depts if d['id'] in keep]
+    return build_tree(depts)
+
+
+@dept_bp.get('/api/v1/system/dept')
+@login_required
+@conditional('dept')
+def get_depts():
+    """获取部门列表（树形）"""
+    name = request.args.get('name', '').strip()
+    return success(_dept_tree(name, request.args.get('status', type=int)))
+
+
+@dept_bp.get('/api/v1/system/dept/tree')
+@login_required
+@conditional('dept')
+def get_dept_tree():
+    """获取部门树"""
+    return success(_dept_tree(status=request.args.get('status', type=int)))
+
+
+@dept_bp.get('/api/v1/system/dept/<int:dept_id>')
+@login_required
+def get_dept(dept_id):
+    """获取部门详情"""
+    dept = _get_dept(dept_id)
+    if not dept:
+        return fail('部门不存在', 404)
+    data = dept.to_dict()
+    data['ancestor_ids'] = dept.ancestor_ids()
+    return success(data)
+
+
+@dept_bp.post('/api/v1/system/dept')
+@login_required
+def create_dept():
+    """创建部门"""
+    data = request.get_json() or {}
+    dept_name = (data.get('dept_name') or '').strip()
+    if not dept_name:
+        return fail('部门名称不能为空')
+    error = _check_fields(data)
+    if error:
+        return fail(error)
+
+    parent = None
+    if data.get('parent_id'):
+        parent = _get_dept(data['parent_id'])
+        if not parent:
+            return fail('上级部门不存在')
+
+    dept = Dept(parent_id=parent.id if parent else 0, created_by=g.user_id, updated_by=g.user_id)
+    for field in EDITABLE_FIELDS:
+        if field in data:
+            setattr(dept, field, data[field])
+    dept.dept_name = dept_name
+    db.session.add(dept)
+    # path 含自身 id，先 flush 取得 id
+    db.session.flush()
+    dept.path = child_path(parent, dept.id)
+    bump_version('dept')
+    db.session.commit()
+    return success(dept.to_dict(), '创建成功')
+
+
+@dept_bp.put('/api/v1/system/dept/<int:dept_id>')
+@login_required
+def update_dept(dept_id):
+    """更新部门，修改上级部门时整棵子树随之移动"""
+    dept = _get_dept(dept_id)
+    if not dept:
+        return fail('部门不存在', 404)
+
+    data = request.get_json() or {}
+    dept_name = (data.get('dept_name') or '').strip()
+    if 'dept_name' in data and not dept_name:
+        return fail('部门名称不能为空')
+    error = _check_fields(data)
+    if error:
+        return fail(error)
+    if 'parent_id' in data and (data['parent_id'] or 0) != dept.parent_id:
+        parent = None
+        if data['parent_id']:
+            parent = _get_dept(data['parent_id'])
+            if not parent:
+                return fail('上级部门不存在')
+            if is_in_subtree(dept.path, parent):
+                return fail('上级部门不能是自身或下级部门')
+        move(dept, parent)
+    for field in EDITABLE_FIELDS:
+        if field in data:
+            setattr(dept, field, data[field])
+    if dept_name:
+        dept.dept_name = dept_name
+    dept.updated_by = g.user_id
+
+    bump_version('dept')
+    db.session.commit()
+    return success(dept.to_dict(), '更新成功')
+
+
+@dept_bp.delete('/api/v1/system/dept/<int:dept_id>')
+@login_required
+def delete_dept(dept_id):
+    """删除部门（逻辑删除），存在下级部门或用户时不允许删除"""
+    dept = _get_dept(dept_id)
+    if not dept:
+        return fail('部门不存在', 404)
+    if db.session.execute(subtree_ids_select(dept.path, include_self=False).limit(1)).first():
+        return fail('存在下级部门，不允许删除')
+    if db.session.execute(
+        db.select(User.id).where(User.dept_id == dept.id, User.enabled_flag == True).limit(1)
+    ).first():
+        return fail('部门下存在用户，不允许删除')
+
+    dept.enabled_flag = False
+    dept.updated_by = g.user_id
+    bump_version('dept')
+    db.session.commit()
+    return success(msg='删除成功')
+
+
+@dept_bp.put('/api/v1/system/dept/<int:dept_id>/status')
+@login_required
+def update_dept_status(dept_id):
+    """更新部门状态"""
+    dept = _get_dept(dept_id)
+    if not dept:
+        return fail('部门不存在', 404)
+
+    data = request.get_json() or {}
+    if data.get('status') not in (0, 1):
+        return fail('状态值错误')
+    dept.status = data['status']
+    dept.updated_by = g.user_id
+    bump_version('dept')
+    db.session.commit()
+    return success(msg='更新成功')
+
+
+@dept_bp.put('/api/v1/system/dept/<int:dept_id>/sort')
+@login_required
+def update_dept_sort(dept_id):
+    """更新部门排序"""
+    dept = _get_dept(dept_id)
+    if not dept:
+        return fail('部门不存在', 404)
+
+    data = request.get_json() or {}
+    sort = data.get('sort')
+    if not isinstance(sort, int):
+        return fail('排序值错误')
+    dept.sort = sort
+    dept.updated_by = g.user_id
+    bump_version('dept')
+    db.session.commit()
+    return success(msg='更新成功')
+
+
+@dept_bp.get('/api/v1/system/dept/<int:dept_id>/users')
+@login_required
+def get_dept_users(dept_id):
+    """获取部门及其下级部门的用户（分页）"""
+    dept = _get_dept(dept_id)
+    if not dept:
+        return fail('部门不存在', 404)
+
+    page = int(request.args.get('page', 1))
+    page_size = min(int(request.args.get('page_size', request.args.get('pageSize', 10))), 100)
+    pagination = (
+        User.query.options(*User.list_options())
+        .filter(User.enabled_flag == True, User.dept_id.in_(subtree_ids_select(dept.path)))
+        .order_by(User.id.desc())
+        .paginate(page=page, per_page=page_size, error_out=False)
+    )
+    return success({
+        'rowTotal': pagination.total,
+        'pageTotal': pagination.pages,
+        'page': page,
+        'pageSize': page_size,
+        'rows': [u.to_dict() for u in pagination.items]
+    })
@@ -0,0 +1,297 @@
+# -*- coding: utf-8 -*-
+from flask import Blueprint, request, g
+from app.models import db
+from app.models.dictionary import DictType, DictData
+from app.utils.dict_store import dict_store
+from app.utils.http_cache import conditional, bump_version
+from app.utils.jwt_utils import login_required
+from app.utils.response import success, fail
+
+dict_bp = Blueprint('dict', __name__)
+
+TYPE_FIELDS = ('dict_name', 'dict_type', 'status', 'remark')
+DATA_FIELDS = ('dict_type', 'dict_label', 'dict_value', 'dict_sort', 'status', 'remark')
+
+
+def _commit():
+    bump_version('dict')
+    db.session.commit()
+    dict_store.invalidate()
+
+
+def _paginate(items):
+    """对快照中过滤后的列表分页"""
+    page = max(request.args.get('page', 1, type=int), 1)
+    page_size = min(request.args.get('page_size', 10, type=int), 100)
+    start = (page - 1) * page_size
+    return success({'items': items[start:start + page_size], 'total': len(items)})
+
+
+def _time_range(items):
+    begin_time = request.args.get('begin_time')
+    end_time = request.args.get('end_time')
+    if begin_time:
+        items = [i for i in items if i['created_at'] and str(i['created_at']) >= begin_time]
+    if end_time:
+        # 只传日期时包含当天
+        end_time = end_time if len(end_time) > 10 else end_time + ' 23:59:59'
+        items = [i for i in items if i['created_at'] and str(i['created_at']) <= end_time]
+    return items
+
+
+# ==================== 字典类型 ====================
+
+@dict_bp.get('/api/v1/system/dict/type/list/all')
+@login_required
+@conditional('dict')
+def get_all_dict_types():
+    """不带分页参数时返回全部字典类型及其数据（前端启动时加载），带分页参数时同 GET /dict/type"""
+    if not request.args:
+        return dict_store.response()
+    return _dict_type_page()
+
+
+@dict_bp.get('/api/v1/system/dict/type')
+@login_required
+@conditional('dict')
+def get_dict_types():
+    """字典类型列表（分页），可按名称、类型、状态、创建时间过滤"""
+    return _dict_type_page()
+
+
+def _dict_type_page():
+    dict_name = request.args.get('dict_name', '').strip()
+    dict_type = request.args.get('dict_type', '').strip()
+    status = request.args.get('status', type=int)
+    items = [
+        t for t in dict_store.snapshot().types
+        if (not dict_name or dict_name in t['dict_name'])
+        and (not dict_type or dict_type in t['dict_type'])
+        and (status is None or t['status'] == status)
+    ]
+    return _paginate(_time_range(items)[::-1])
+
+
+@dict_bp.get('/api/v1/system/dict/type/<int:type_id>')
+@login_required
+def get_dict_type(type_id):
+    """获取字典类型详情"""
+    dict_type = DictType.query.filter_by(id=type_id, enabled_flag=True).first()
+    if not dict_type:
+        return fail('字典类型不存在', 404)
+    return success(dict_type.to_dict())
+
+
+@dict_bp.post('/api/v1/system/dict/type')
+@login_required
+def create_dict_type():
+    """创建字典类型"""
+    data = request.get_json() or {}
+    dict_name = (data.get('dict_name') or '').strip()
+    type_code = (data.get('dict_type') or '').strip()
+    if not dict_name or not type_code:
+        return fail('字典名称和字典类型不能为空')
+    if DictType.query.filter_by(dict_type=type_code, enabled_flag=True).first():
+        return fail('字典类型已存在')
+
+    dict_type = DictType(created_by=g.user_id, updated_by=g.user_id)
+    for field in TYPE_FIELDS:
+        if field in data:
+            setattr(dict_type, field, data[field])
+    dict_type.dict_name, dict_type.dict_type = dict_name, type_code
+    db.session.add(dict_type)
+    _commit()
+    return success(dict_type.to_dict(), '创建成功')
+
+
+@dict_bp.put('/api/v1/system/dict/type/<int:type_id>')
+@login_required
+def update_dict_type(type_id):
+    """更新字典类型，修改类型编码时其下字典数据一并改写"""
+    dict_type = DictType.query.filter_by(id=type_id, enabled_flag=True).first()
+    if not dict_type:
+        return fail('字典类型不存在', 404)
+
+    data = request.get_json() or {}
+    if 'dict_name' in data and not (data['dict_name'] or '').strip():
+        return fail('字典名称不能为空')
+    if 'dict_type' in data:
+        type_code = (data['dict_type'] or '').strip()
+        if not type_code:
+            return fail('字典类型不能为空')
+        if type_code != dict_type.dict_type:
+            if DictType.query.filter_by(dict_type=type_code, enabled_flag=True).first():
+                return fail('字典类型已存在')
+            DictData.query.filter_by(dict_type=dict_type.dict_type).update(
+                {'dict_type': type_code, 'updated_by': g.user_id}, synchronize_session=False
+            )
+        data['dict_type'] = type_code
+    for field in TYPE_FIELDS:
+        if field in data:
+            setattr(dict_type, field, data[field])
+    dict_type.updated_by = g.user_id
+
+    _commit()
+    return success(dict_type.to_dict(), '更新成功')
+
+
+def _delete_dict_types(ids):
+    type_codes = db.session.execute(
+        db.select(DictType.dict_type).where(DictType.id.in_(ids), DictType.enabled_flag == True)
+    ).scalars().all()
+    if not type_codes:
+        return 0
+    DictType.query.filter(DictType.id.in_(ids), DictType.enabled_flag == True).update(
+        {'enabled_flag': False, 'updated_by': g.user_id}, synchronize_session=False
+    )
+    DictData.query.filter(DictData.dict_type.in_(type_codes), DictData.enabled_flag == True).update(
+        {'enabled_flag': False, 'updated_by': g.user_id}, synchronize_session=False
+    )
+    _commit()
+    return len(type_codes)
+
+
+@dict_bp.delete('/api/v1/system/dict/type/<int:type_id>')
+@login_required
+def delete_dict_type(type_id):
+    """删除字典类型及其数据（逻辑删除）"""
+    if not _delete_dict_types([type_id]):
+        return fail('字典类型不存在', 404)
+    return success(msg='删除成功')
+
+
+@dict_bp.delete('/api/v1/system/dict/type')
+@login_required
+def delete_dict_types():
+    """批量删除字典类型（?ids=1&ids=2）"""
+    ids = request.args.getlist('ids', type=int)
+    if not ids:
+        return fail('请提供要删除的字典类型ID')
+    _delete_dict_types(ids)
+    return success(msg='删除成功')
+
+
+# ==================== 字典数据 ====================
+
+@dict_bp.get('/api/v1/system/dict/data/list/all')
+@login_required
+@conditional('dict')
+def get_all_dict_data():
+    """不带参数时返回全部字典数据，带参数时同 GET /dict/data"""
+    if not request.args:
+        return success(dict_store.snapshot().data)
+    return _dict_data_page()
+
+
+@dict_bp.get('/api/v1/system/dict/data')
+@login_required
+@conditional('dict')
+def get_dict_data_list():
+    """字典数据列表（分页），可按类型、标签、状态过滤"""
+    return _dict_data_page()
+
+
+def _dict_data_page():
+    snapshot = dict_store.snapshot()
+    dict_type = request.args.get('dict_type', '').strip()
+    dict_label = request.args.get('dict_label', '').strip()
+    status = request.args.get('status', type=int)
+    items = snapshot.by_type.get(dict_type, []) if dict_type else snapshot.data
+    items = [
+        d for d in items
+        if (not dict_label or dict_label in d['dict_label']) and (status is None or d['status'] == status)
+    ]
+    return _paginate(items)
+
+
+@dict_bp.get('/api/v1/system/dict/data/type/<dict_type>')
+@login_required
+@conditional('dict')
+def get_dict_data_by_type(dict_type):
+    """按字典类型获取字典数据（按 dict_sort 排序）"""
+    return success(dict_store.data_by_type(dict_type))
+
+
+@dict_bp.get('/api/v1/system/dict/data/<int:data_id>')
+@login_required
+def get_dict_data(data_id):
+    """获取字典数据详情"""
+    item = DictData.query.filter_by(id=data_id, enabled_flag=True).first()
+    if not item:
+        return fail('字典数据不存在', 404)
+    return success(item.to_dict())
+
+
+@dict_bp.post('/api/v1/system/dict/data')
+@login_required
+def create_dict_data():
+    """创建字典数据"""
+    data = request.get_json() or {}
+    type_code = (data.get('dict_type') or '').strip()
+    if not DictType.query.filter_by(dict_type=type_code, enabled_flag=True).first():
+        return fail('字典类型不存在')
+    if not (data.get('dict_label') or '').strip() or data.get('dict_value') in (None, ''):
+        return fail('字典标签和字典键值不能为空')
+
+    item = DictData(created_by=g.user_id, updated_by=g.user_id)
+    for field in DATA_FIELDS:
+        if field in data:
+            setattr(item, field, data[field])
+    item.dict_type = type_code
+    db.session.add(item)
+    _commit()
+    return success(item.to_dict(), '创建成功')
+
+
+@dict_bp.put('/api/v1/system/dict/data/<int:data_id>')
+@login_required
+def update_dict_data(data_id):
+    """更新字典数据"""
+    item = DictData.query.filter_by(id=data_id, enabled_flag=True).first()
+    if not item:
+        return fail('字典数据不存在', 404)
+
+    data = request.get_json() or {}
+    if 'dict_type' in data and data['dict_type'] != item.dict_type:
+        if not DictType.query.filter_by(dict_type=data['dict_type'], enabled_flag=True).first():
+            return fail('字典类型不存在')
+    if 'dict_label' in data and not (data['dict_label'] or '').strip():
+        return fail('字典标签不能为空')
+    if 'dict_value' in data and data['dict_value'] in (None, ''):
+        return fail('字典键值不能为空')
+    for field in DATA_FIELDS:
+        if field in data:
+            setattr(item, field, data[field])
+    item.updated_by = g.user_id
+
+    _commit()
+    return success(item.to_dict(), '更新成功')
+
+
+def _delete_dict_data(ids):
+    deleted = DictData.query.filter(DictData.id.in_(ids), DictData.enabled_flag == True).update(
+        {'enabled_flag': False, 'updated_by': g.user_id}, synchronize_session=False
+    )
+    if deleted:
+        _commit()
+    return deleted
+
+
+@dict_bp.delete('/api/v1/system/dict/data/<int:data_id>')
+@login_required
+def delete_dict_data(data_id):
+    """删除字典数据（逻辑删除）"""
+    if not _delete_dict_data([data_id]):
+        return fail('字典数据不存在', 404)
+    return success(msg='删除成功')
+
+
+@dict_bp.delete('/api/v1/system/dict/data')
+@login_required
+def delete_dict_data_batch():
+    """批量删除字典数据（?ids=1&ids=2）"""
+    ids = request.args.getlist('ids', type=int)
+    if not ids:
+        return fail('请提供要删除的字典数据ID')
+    _delete_dict_data(ids)
+    return success(msg='删除成功')
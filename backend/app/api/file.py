@@ -0,0 +1,448 @@
+# -*- coding: utf-8 -*-
+import hmac
+import mimetypes
+
+from flask import Blueprint, request, g, current_app, send_file
+from werkzeug.exceptions import RequestEntityTooLarge, BadRequest
+
+from app.models import db
+from app.models.file import FileRecord
+from app.utils.file_store import file_store, file_ext, file_type, format_size, bump_stat, stats_summary, UploadError
+from app.utils.jwt_utils import login_required
+from app.utils.menu_tree import SUPER_ROLE
+from app.utils.permission_resolver import permission_resolver
+from app.utils.response import success, fail
+
+file_bp = Blueprint('file', __name__)
+
+UPDATE_FIELDS = ('original_name', 'description', 'tags', 'is_public')
+# 只返回给上传人与管理员的字段：知道 sha256 即可发起秒传，存储路径不对外暴露
+PRIVATE_FIELDS = ('sha256', 'file_path')
+
+
+def _is_admin() -> bool:
+    perms = permission_resolver.resolve(g.user_id)
+    return perms is not None and SUPER_ROLE in perms.role_codes
+
+
+def _to_item(data: dict, admin=None) -> dict:
+    data['formatted_size'] = format_size(data['file_size'])
+    data['file_url'] = f'/api/v1/system/file/{data["id"]}/download'
+    if data['uploaded_by'] != g.user_id and not (_is_admin() if admin is None else admin):
+        for field in PRIVATE_FIELDS:
+            data.pop(field, None)
+    return data
+
+
+def _get_file(file_id, write=False):
+    """当前用户可访问的文件：上传人与管理员可读写，其他人只能读取公开文件；无权访问时与不存在相同"""
+    record = FileRecord.query.filter_by(id=file_id, enabled_flag=True).first()
+    if record is None or record.uploaded_by == g.user_id:
+        return record
+    if (write or not record.is_public) and not _is_admin():
+        return None
+    return record
+
+
+def _create_record(original_name, size, sha256, rel_path, created, upload_type, form) -> FileRecord:
+    """新建文件记录并更新计数器（不提交）"""
+    ext = file_ext(original_name)
+    record = FileRecord(
+        file_name=rel_path.rsplit('/', 1)[-1],
+        original_name=original_name,
+        file_ext=ext,
+        file_type=file_type(ext),
+        mime_type=mimetypes.guess_type(original_name)[0] or 'application/octet-stream',
+        file_size=size,
+        sha256=sha256,
+        file_path=rel_path,
+        upload_type=upload_type,
+        description=form.get('description') or None,
+        tags=form.get('tags') or None,
+        is_public=1 if str(form.get('is_public', '0')) in ('1', 'true') else 0,
+        uploaded_by=g.user_id,
+        updated_by=g.user_id,
+    )
+    db.session.add(record)
+    bump_stat(f'type:{record.file_type}', 1, size)
+    if created:
+        bump_stat('storage', 1, size)
+    return record
+
+
+def _store_uploads(upload_type):
+    """解析 multipart 请求并保存其中的文件，返回 (成功的记录, 失败列表)"""
+    form, uploads = file_store.parse_multipart(request)
+    records, errors = [], []
+    for _, filename, writer in uploads:
+        error = getattr(writer, 'error', None)
+        if error:
+            errors.append({'original_name': filename, 'error': error})
+            continue
+        rel_path, created = file_store.save(writer)
+        records.append(_create_record(filename, writer.size, writer.sha256, rel_path, created, upload_type, form))
+    if records:
+        db.session.commit()
+    return records, errors
+
+
+def _upload_failed(e):
+    if isinstance(e, RequestEntityTooLarge):
+        return fail(f'文件大小不能超过 {format_size(file_store.max_size)}', 413)
+    return fail('上传内容解析失败')
+
+
+@file_bp.post('/api/v1/system/file/upload')
+@login_required
+def upload_file():
+    """上传单个文件（multipart，字段 file），请求体流式写入存储目录"""
+    if request.mimetype != 'multipart/form-data':
+        return fail('请使用 multipart/form-data 上传')
+    try:
+        records, errors = _store_uploads('single')
+    except (RequestEntityTooLarge, BadRequest) as e:
+        return _upload_failed(e)
+    if errors:
+        return fail(errors[0]['error'])
+    if not records:
+        return fail('请选择要上传的文件')
+    return success(_to_item(records[0].to_dict()), '上传成功')
+
+
+@file_bp.post('/api/v1/system/file/batch-upload')
+@login_required
+def batch_upload_files():
+    """批量上传（multipart，多个 files / file 字段），不合法的文件跳过并在 errors 中说明"""
+    if request.mimetype != 'multipart/form-data':
+        return fail('请使用 multipart/form-data 上传')
+    try:
+        records, errors = _store_uploads('batch')
+    except (RequestEntityTooLarge, BadRequest) as e:
+        return _upload_failed(e)
+    if not records and not errors:
+        return fail('请选择要上传的文件')
+    return success({
+        'items': [_to_item(r.to_dict()) for r in records],
+        'errors': errors,
+    }, f'成功上传 {len(records)} 个文件')
+
+
+# ==================== 分片上传（断点续传） ====================
+
+@file_bp.post('/api/v1/system/file/chunk/init')
+@login_required
+def init_chunk_upload():
+    """开始分片上传
+
+    提交 file_name、file_size，可选 sha256。返回 upload_id、chunk_size、chunk_count；
+    之后逐个 PUT /chunk/<upload_id>/<index>，中断后用 GET /chunk/<upload_id> 查询已收到的分片，只补传缺少的。
+
+    秒传：已存储相同内容时，当前用户自己上传过该内容则直接完成；否则响应中带 proof（服务端随机选取的
+    字节区间 offset、length），客户端计算文件该区间的 sha256，以 {"proof": 哈希} 调用 complete 即可完成，
+    不必上传分片。只知道 sha256 而没有文件内容的客户端无法通过校验。
+    """
+    data = request.get_json() or {}
+    file_name = (data.get('file_name') or '').strip()
+    file_size = data.get('file_size')
+    if not isinstance(file_size, int):
+        return fail('文件大小错误')
+    error = file_store.check(file_name, file_size)
+    if error:
+        return fail(error)
+
+    sha256 = (data.get('sha256') or '').lower()
+    rel_path = file_store.find(sha256) if sha256 else None
+    if rel_path and _owns_content(sha256):
+        record = _create_record(file_name, file_store.size(rel_path), sha256, rel_path, False, 'instant', data)
+        db.session.commit()
+        return success({'completed': True, 'file': _to_item(record.to_dict())}, '上传成功')
+
+    proof = {}
+    if rel_path:
+        proof['proof_offset'], proof['proof_length'] = file_store.proof_range(rel_path)
+    meta = file_store.create_upload(
+        g.user_id, file_name, file_size, sha256=sha256,
+        description=data.get('description'), tags=data.get('tags'), is_public=data.get('is_public', 0), **proof
+    )
+    result = {
+        'completed': False,
+        'upload_id': meta['upload_id'],
+        'chunk_size': meta['chunk_size'],
+        'chunk_count': meta['chunk_count'],
+        'received': [],
+    }
+    if proof:
+        result['proof'] = {'offset': proof['proof_offset'], 'length': proof['proof_length']}
+    return success(result)
+
+
+def _owns_content(sha256) -> bool:
+    """当前用户是否有该内容的有效文件记录"""
+    return db.session.execute(
+        db.select(FileRecord.id).where(
+            FileRecord.sha256 == sha256, FileRecord.uploaded_by == g.user_id, FileRecord.enabled_flag == True
+        ).limit(1)
+    ).first() is not None
+
+
+def _get_upload(upload_id):
+    meta = file_store.load_upload(upload_id)
+    if meta is None or meta['user_id'] != g.user_id:
+        return None
+    return meta
+
+
+@file_bp.get('/api/v1/system/file/chunk/<upload_id>')
+@login_required
+def get_chunk_upload(upload_id):
+    """查询分片上传进度"""
+    meta = _get_upload(upload_id)
+    if meta is None:
+        return fail('上传任务不存在或已过期', 404)
+    return success({
+        'upload_id': upload_id,
+        'file_name': meta['file_name'],
+        'file_size': meta['file_size'],
+        'chunk_size': meta['chunk_size'],
+        'chunk_count': meta['chunk_count'],
+        'received': file_store.received_chunks(meta),
+    })
+
+
+@file_bp.put('/api/v1/system/file/chunk/<upload_id>/<int:index>')
+@login_required
+def upload_chunk(upload_id, index):
+    """上传一个分片，请求体为分片的原始字节（application/octet-stream）"""
+    meta = _get_upload(upload_id)
+    if meta is None:
+        return fail('上传任务不存在或已过期', 404)
+    try:
+        size = file_store.write_chunk(meta, index, request.stream)
+    except UploadError as e:
+        return fail(str(e))
+    return success({'index': index, 'size': size})
+
+
+@file_bp.post('/api/v1/system/file/chunk/<upload_id>/complete')
+@login_required
+def complete_chunk_upload(upload_id):
+    """全部分片上传后合并；init 返回了 proof 时也可提交 {"proof": 区间哈希} 秒传"""
+    meta = _get_upload(upload_id)
+    if meta is None:
+        return fail('上传任务不存在或已过期', 404)
+    proof = (request.get_json(silent=True) or {}).get('proof')
+    if proof and 'proof_offset' in meta:
+        return _complete_with_proof(upload_id, meta, str(proof).lower())
+    try:
+        writer = file_store.assemble(meta)
+    except UploadError as e:
+        return fail(str(e))
+    if meta.get('sha256') and writer.sha256 != meta['sha256']:
+        writer.discard()
+        file_store.remove_upload(upload_id)
+        return fail('文件校验失败，请重新上传')
+
+    rel_path, created = file_store.save(writer)
+    record = _create_record(meta['file_name'], writer.size, writer.sha256, rel_path, created, 'chunk', meta)
+    db.session.commit()
+    file_store.remove_upload(upload_id)
+    return success(_to_item(record.to_dict()), '上传成功')
+
+
+def _complete_with_proof(upload_id, meta, proof):
+    rel_path = file_store.find(meta['sha256'])
+    if rel_path is None:
+        return fail('文件内容已不存在，请上传分片')
+    expected = file_store.range_sha256(rel_path, meta['proof_offset'], meta['proof_length'])
+    if not hmac.compare_digest(expected, proof):
+        return fail('秒传校验失败，请上传分片')
+    record = _create_record(meta['file_name'], file_store.size(rel_path), meta['sha256'], rel_path, False,
+                            'instant', meta)
+    db.session.commit()
+    file_store.remove_upload(upload_id)
+    return success(_to_item(record.to_dict()), '上传成功')
+
+
+@file_bp.delete('/api/v1/system/file/chunk/<upload_id>')
+@login_required
+def abort_chunk_upload(upload_id):
+    """取消分片上传"""
+    if _get_upload(upload_id) is None:
+        return fail('上传任务不存在或已过期', 404)
+    file_store.remove_upload(upload_id)
+    return success(msg='已取消')
+
+
+# ==================== 文件管理 ====================
+
+@file_bp.get('/api/v1/system/file')
+@login_required
+def get_files():
+    """获取文件列表（分页）：管理员看到全部文件，其他用户看到自己上传的与公开的"""
+    page = max(request.args.get('page', 1, type=int), 1)
+    page_size = min(request.args.get('page_size', 10, type=int), 100)
+
+    query = db.select(*FileRecord.serialize_columns()).where(FileRecord.enabled_flag == True)
+    admin = _is_admin()
+    if not admin:
+        query = query.where(db.or_(FileRecord.uploaded_by == g.user_id, FileRecord.is_public == 1))
+    for field in ('file_name', 'original_name', 'tags'):
+        value = request.args.get(field, '').strip()
+        if value:
+            query = query.where(getattr(FileRecord, field).contains(value, autoescape=True))
+    for field in ('file_type', 'file_ext', 'upload_type'):
+        value = request.args.get(field, '').strip()
+        if value:
+            query = query.where(getattr(FileRecord, field) == value)
+    for field in ('is_public', 'uploaded_by'):
+        value = request.args.get(field, type=int)
+        if value is not None:
+            query = query.where(getattr(FileRecord, field) == value)
+    if request.args.get('begin_time'):
+        query = query.where(FileRecord.creation_date >= request.args['begin_time'])
+    if request.args.get('end_time'):
+        end_time = request.args['end_time']
+        query = query.where(FileRecord.creation_date <= (end_time if len(end_time) > 10 else end_time + ' 23:59:59'))
+
+    total = db.session.execute(db.select(db.func.count()).select_from(query.subquery())).scalar()
+    rows = db.session.execute(
+        query.order_by(FileRecord.id.desc()).offset((page - 1) * page_size).limit(page_size)
+    ).all()
+    return success({'items': [_to_item(d, admin) for d in FileRecord.rows_to_dicts(rows)], 'total': total})
+
+
+@file_bp.get('/api/v1/system/file/stats/summary')
+@login_required
+def get_file_stats():
+    """文件统计（读计数器，不扫描文件表或存储目录）"""
+    return success(stats_summary())
+
+
+@file_bp.get('/api/v1/system/file/<int:file_id>')
+@login_required
+def get_file(file_id):
+    """获取文件详情"""
+    record = _get_file(file_id)
+    if not record:
+        return fail('文件不存在', 404)
+    return success(_to_item(record.to_dict()))
+
+
+@file_bp.get('/api/v1/system/file/<int:file_id>/url')
+@login_required
+def get_file_url(file_id):
+    """获取文件访问地址"""
+    record = _get_file(file_id)
+    if not record:
+        return fail('文件不存在', 404)
+    return success({'file_url': _to_item(record.to_dict())['file_url']})
+
+
+@file_bp.get('/api/v1/system/file/<int:file_id>/download')
+@login_required
+def download_file(file_id):
+    """下载文件，支持 Range 断点续传与 If-None-Match
+
+    配置了 FILE_ACCEL_REDIRECT 时由 nginx 发送文件；否则由 send_file 经 wsgi.file_wrapper
+    （gunicorn 下为 sendfile 系统调用）发送，FILE_X_SENDFILE 开启时改为 X-Sendfile 响应头。
+    """
+    record = _get_file(file_id)
+    if not record:
+        return fail('文件不存在', 404)
+
+    accel_prefix = current_app.config.get('FILE_ACCEL_REDIRECT')
+    if accel_prefix:
+        # Range 与条件请求由 nginx 处理，这里只能按请求头判断：续传的后续分段、带 If-None-Match 的验证不计数
+        range_header = request.headers.get('Range', '')
+        if not request.if_none_match and (not range_header or range_header.replace(' ', '').startswith('bytes=0-')):
+            _count_download(record)
+        response = current_app.response_class(mimetype=record.mime_type)
+        response.headers['X-Accel-Redirect'] = accel_prefix.rstrip('/') + '/' + record.file_path
+        response.headers.set('Content-Disposition', 'attachment', filename=record.original_name)
+        return response
+
+    path = file_store.abs_path(record.file_path)
+    try:
+        response = send_file(
+            path, mimetype=record.mime_type, as_attachment=True, download_name=record.original_name,
+            conditional=True, etag=record.sha256, max_age=0,
+        )
+    except FileNotFoundError:
+        return fail('文件内容已丢失', 410)
+    # 只有完整响应和从头开始的分段算一次下载，304、续传的后续分段、416 不计数
+    if response.status_code == 200 or (
+            response.status_code == 206 and response.content_range and response.content_range.start == 0):
+        _count_download(record)
+    return response
+
+
+def _count_download(record):
+    db.session.execute(
+        db.update(FileRecord).where(FileRecord.id == record.id)
+        .values(download_count=FileRecord.download_count + 1)
+    )
+    bump_stat('downloads', 1, 0)
+    db.session.commit()
+
+
+@file_bp.put('/api/v1/system/file/<int:file_id>')
+@login_required
+def update_file(file_id):
+    """更新文件信息"""
+    record = _get_file(file_id, write=True)
+    if not record:
+        return fail('文件不存在', 404)
+
+    data = request.get_json() or {}
+    if 'original_name' in data and not (data['original_name'] or '').strip():
+        return fail('文件名不能为空')
+    for field in UPDATE_FIELDS:
+        if field in data:
+            setattr(record, field, data[field])
+    record.updated_by = g.user_id
+    db.session.commit()
+    return success(_to_item(record.to_dict()), '更新成功')
+
+
+def _delete_files(ids):
+    """逻辑删除并扣减计数器，存储的内容保留（可能被其它记录共用）；非管理员只能删除自己上传的文件"""
+    query = (
+        db.select(FileRecord.id, FileRecord.file_type, FileRecord.file_size)
+        .where(FileRecord.id.in_(ids), FileRecord.enabled_flag == True)
+    )
+    if not _is_admin():
+        query = query.where(FileRecord.uploaded_by == g.user_id)
+    rows = db.session.execute(query.with_for_update()).all()
+    if not rows:
+        return 0
+    db.session.execute(
+        db.update(FileRecord).where(FileRecord.id.in_([r.id for r in rows]))
+        .values(enabled_flag=False, updated_by=g.user_id)
+    )
+    totals = {}
+    for row in rows:
+        count, size = totals.get(row.file_type, (0, 0))
+        totals[row.file_type] = (count + 1, size + row.file_size)
+    for name, (count, size) in totals.items():
+        bump_stat(f'type:{name}', -count, -size)
+    db.session.commit()
+    return len(rows)
+
+
+@file_bp.delete('/api/v1/system/file/<int:file_id>')
+@login_required
+def delete_file(file_id):
+    """删除文件（逻辑删除）"""
+    if not _delete_files([file_id]):
+        return fail('文件不存在', 404)
+    return success(msg='删除成功')
+
+
+@file_bp.delete('/api/v1/system/file/batch')
+@login_required
+def batch_delete_files():
+    """批量删除文件（请求体 {"ids": [...]}）"""
+    ids = (request.get_json() or {}).get('ids') or []
+    if not ids:
+        return fail('请提供要删除的文件ID')
+    return success({'deleted': _delete_files(ids)}, '删除成功')
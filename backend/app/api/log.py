@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime, timedelta
+from flask import Blueprint, request
+from app.models import db
+from app.models.log import OperationLog
+from app.utils.jwt_utils import login_required
+from app.utils.login_records import login_records
+from app.utils.response import success, fail
+from app.utils.session_registry import ip_location
+
+log_bp = Blueprint('log', __name__)
+
+
+def _parse_time(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d %H:%M:%S') if value else None
+    except ValueError:
+        return datetime.strptime(value, '%Y-%m-%d')
+
+
+@log_bp.get('/api/v1/system/log/login')
+@login_required
+def get_login_logs():
+    """登录日志列表（跨分表，按登录时间倒序）"""
+    page = max(int(request.args.get('page', 1)), 1)
+    page_size = min(max(int(request.args.get('page_size', 20)), 1), 100)
+    status = request.args.get('status')
+    try:
+        begin_time, end_time = _parse_time(request.args.get('begin_time')), _parse_time(request.args.get('end_time'))
+    except ValueError:
+        return fail('时间格式错误')
+    return success(login_records.query(
+        page, page_size,
+        username=request.args.get('username', '').strip(),
+        ip=request.args.get('ip', '').strip(),
+        status=int(status) if status not in (None, '') else None,
+        begin=begin_time,
+        end=end_time,
+    ))
+
+
+@log_bp.get('/api/v1/system/log/login/statistics')
+@login_required
+def login_log_statistics():
+    """登录统计：最近 30 天每日成功/失败次数（读按小时汇总表）"""
+    days = min(max(int(request.args.get('days', 30)), 1), 366)
+    return success(login_records.statistics(days))
+
+
+@log_bp.get('/api/v1/system/log/login/<int:log_id>')
+@login_required
+def get_login_log(log_id):
+    """登录日志详情"""
+    item = login_records.get(log_id)
+    if item is None:
+        return fail('日志不存在', 404)
+    return success(item)
+
+
+@log_bp.delete('/api/v1/system/log/login/<int:log_id>')
+@login_required
+def delete_login_log(log_id):
+    """删除单条登录日志"""
+    return success({'deleted_count': login_records.delete(log_id)}, '删除成功')
+
+
+@log_bp.delete('/api/v1/system/log/login')
+@login_required
+def batch_delete_login_logs():
+    """批量删除登录日志，请求体 {"ids": [...]}"""
+    ids = (request.get_json(silent=True) or {}).get('ids') or []
+    if not ids:
+        return fail('请提供要删除的日志ID')
+    return success({'deleted_count': login_records.delete(*ids)}, '删除成功')
+
+
+@log_bp.delete('/api/v1/system/log/login/clean')
+@login_required
+def clean_login_logs():
+    """清理 days 天之前的登录日志，按分表整表删除；不传 days 时清空全部"""
+    days = request.args.get('days')
+    count = login_records.prune(int(days) if days else None)
+    return success({'deleted_count': count}, f'已清理 {count} 条日志')
+
+
+@log_bp.get('/api/v1/system/log/operation')
+@login_required
+def get_operation_logs():
+    """操作日志列表（按操作时间倒序）"""
+    page = max(int(request.args.get('page', 1)), 1)
+    page_size = min(max(int(request.args.get('page_size', 20)), 1), 100)
+    args = request.args
+
+    conditions = []
+    if args.get('username'):
+        conditions.append(OperationLog.username.like(f"%{args['username'].strip()}%"))
+    if args.get('operation'):
+        conditions.append(OperationLog.operation == args['operation'])
+    if args.get('method'):
+        conditions.append(OperationLog.method == args['method'].upper())
+    if args.get('module'):
+        conditions.append(OperationLog.module == args['module'])
+    if args.get('status') not in (None, ''):
+        conditions.append(OperationLog.status == int(args['status']))
+    if args.get('ip'):
+        conditions.append(OperationLog.ip.like(f"{args['ip'].strip()}%"))
+    try:
+        begin_time, end_time = _parse_time(args.get('begin_time')), _parse_time(args.get('end_time'))
+    except ValueError:
+        return fail('时间格式错误')
+    if begin_time:
+        conditions.append(OperationLog.operation_time >= begin_time)
+    if end_time:
+        conditions.append(OperationLog.operation_time <= end_time)
+
+    total = db.session.execute(
+        db.select(db.func.count()).select_from(OperationLog).where(*conditions)
+    ).scalar()
+    logs = db.session.execute(
+        db.select(OperationLog).where(*conditions)
+        .order_by(OperationLog.id.desc())
+        .offset((page - 1) * page_size).limit(page_size)
+    ).scalars()
+    items = []
+    for log in logs:
+        item = log.to_dict()
+        item['location'] = ip_location(log.ip)
+        items.append(item)
+    return success({'items': items, 'total': total, 'page': page, 'page_size': page_size})
+
+
+@log_bp.get('/api/v1/system/log/operation/statistics')
+@login_required
+def operation_log_statistics():
+    """操作日志统计：总数、今日数、失败数"""
+    today = datetime.combine(datetime.now().date(), datetime.min.time())
+    total, today_count, failed = db.session.execute(
+        db.select(
+            db.func.count(),
+            db.func.coalesce(db.func.sum(db.case((OperationLog.operation_time >= today, 1), else_=0)), 0),
+            db.func.coalesce(db.func.sum(db.case((OperationLog.status == 0, 1), else_=0)), 0),
+        ).select_from(OperationLog)
+    ).one()
+    return success({'total': total, 'today': today_count, 'failed': failed})
+
+
+@log_bp.get('/api/v1/system/log/operation/<int:log_id>')
+@login_required
+def get_operation_log(log_id):
+    """操作日志详情"""
+    log = db.session.get(OperationLog, log_id)
+    if not log:
+        return fail('日志不存在', 404)
+    item = log.to_dict()
+    item['location'] = ip_location(log.ip)
+    return success(item)
+
+
+@log_bp.delete('/api/v1/system/log/operation/<int:log_id>')
+@login_required
+def delete_operation_log(log_id):
+    """删除单条操作日志"""
+    count = db.session.execute(db.delete(OperationLog).where(OperationLog.id == log_id)).rowcount
+    db.session.commit()
+    return success({'deleted_count': count}, '删除成功')
+
+
+@log_bp.delete('/api/v1/system/log/operation')
+@login_required
+def batch_delete_operation_logs():
+    """批量删除操作日志，请求体 {"ids": [...]}"""
+    ids = (request.get_json(silent=True) or {}).get('ids') or []
+    if not ids:
+        return fail('请提供要删除的日志ID')
+    count = db.session.execute(db.delete(OperationLog).where(OperationLog.id.in_(ids))).rowcount
+    db.session.commit()
+    return success({'deleted_count': count}, '删除成功')
+
+
+@log_bp.delete('/api/v1/system/log/operation/clean')
+@login_required
+def clean_operation_logs():
+    """清理 days 天之前的操作日志（默认保留 30 天）"""
+    days = int(request.args.get('days', 30))
+    cutoff = datetime.now() - timedelta(days=days)
+    count = db.session.execute(db.delete(OperationLog).where(OperationLog.operation_time < cutoff)).rowcount
+    db.session.commit()
+    return success({'deleted_count': count}, f'已清理 {count} 条日志')
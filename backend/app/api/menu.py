@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+from flask import Blueprint, request, g
+from app.models import db
+from app.models.menu import Menu
+from app.utils.http_cache import conditional, bump_version
+from app.utils.jwt_utils import login_required
+from app.utils.menu_tree import menu_tree
+from app.utils.tree import descendant_ids
+from app.utils.response import success, fail
+
+menu_bp = Blueprint('menu', __name__)
+
+MENU_TYPES = ('M', 'C', 'F')
+# 可由前端直接写入的字段
+EDITABLE_FIELDS = (
+    'menu_type', 'menu_name', 'path', 'component', 'component_name', 'query', 'perms', 'icon', 'order_num',
+    'visible', 'status', 'is_frame', 'is_cache', 'remark'
+)
+# 整数字段 -> (允许的取值，None 表示任意整数, 错误信息)
+INT_FIELDS = {
+    'order_num': (None, '排序值错误'),
+    'visible': ((0, 1), '显示状态错误'),
+    'status': ((0, 1), '状态值错误'),
+    'is_frame': ((0, 1), '是否外链取值错误'),
+    'is_cache': ((0, 1), '是否缓存取值错误'),
+}
+
+
+def _filters():
+    status = request.args.get('status', type=int)
+    menu_type = request.args.get('menu_type') or None
+    title = request.args.get('title', '').strip()
+    return status, menu_type, title
+
+
+def _get_menu(menu_id):
+    return Menu.query.filter_by(id=menu_id, enabled_flag=True).first()
+
+
+def _check_parent(menu_id, parent_id):
+    """校验上级菜单，返回错误信息；menu_id 为 None 表示新建"""
+    if not parent_id:
+        return None
+    menus = menu_tree.menus()
+    if not any(m['id'] == parent_id for m in menus):
+        return '上级菜单不存在'
+    if menu_id is not None and (parent_id == menu_id or parent_id in descendant_ids(menus, menu_id)):
+        return '上级菜单不能是自身或下级菜单'
+    return None
+
+
+def _check_fields(data):
+    """校验整数字段（不能为 null），返回错误信息"""
+    for field, (choices, msg) in INT_FIELDS.items():
+        if field not in data:
+            continue
+        value = data[field]
+        if not isinstance(value, int) or isinstance(value, bool) or (choices and value not in choices):
+            return msg
+    return None
+
+
+def _commit():
+    bump_version('menu')
+    db.session.commit()
+    menu_tree.invalidate()
+
+
+@menu_bp.get('/api/v1/system/menu')
+@login_required
+@conditional('menu')
+def get_menus():
+    """获取菜单列表（平铺）"""
+    status, menu_type, title = _filters()
+    data = [
+        m for m in menu_tree.menus()
+        if (status is None or m['status'] == status)
+        and (menu_type is None or m['menu_type'] == menu_type)
+        and (not title or title in m['menu_name'])
+    ]
+    return success(data)
+
+
+@menu_bp.get('/api/v1/system/menu/tree')
+@login_required
+@conditional('menu')
+def get_menu_tree():
+    """获取菜单树"""
+    status, menu_type, title = _filters()
+    return success(menu_tree.tree(status, menu_type, title))
+
+
+@menu_bp.get('/api/v1/system/menu/buttons')
+@login_required
+@conditional('menu')
+def get_buttons():
+    """获取按钮权限列表，可按上级菜单过滤"""
+    parent_id = request.args.get('parent_id', type=int)
+    data = [
+        m for m in menu_tree.menus()
+        if m['menu_type'] == 'F' and (parent_id is None or m['parent_id'] == parent_id)
+    ]
+    return success(data)
+
+
+@menu_bp.get('/api/v1/system/menu/<int:menu_id>')
+@login_required
+def get_menu(menu_id):
+    """获取菜单详情"""
+    menu = _get_menu(menu_id)
+    if not menu:
+        return fail('菜单不存在', 404)
+    return success(menu.to_dict())
+
+
+@menu_bp.post('/api/v1/system/menu')
+@login_required
+def create_menu():
+    """创建菜单"""
+    data = request.get_json() or {}
+    menu_name = (data.get('menu_name') or '').strip()
+    if not menu_name:
+        return fail('菜单名称不能为空')
+    menu_type = data.get('menu_type', 'C')
+    if menu_type not in MENU_TYPES:
+        return fail('菜单类型错误')
+    parent_id = data.get('parent_id') or 0
+    error = _check_fields(data) or _check_parent(None, parent_id)
+    if error:
+        return fail(error)
+
+    menu = Menu(parent_id=parent_id, created_by=g.user_id, updated_by=g.user_id)
+    for field in EDITABLE_FIELDS:
+        if field in data:
+            setattr(menu, Menu.serialize_attr(field), data[field])
+    menu.menu_name = menu_name
+    db.session.add(menu)
+    _commit()
+    return success(menu.to_dict(), '创建成功')
+
+
+@menu_bp.put('/api/v1/system/menu/<int:menu_id>')
+@login_required
+def update_menu(menu_id):
+    """更新菜单"""
+    menu = _get_menu(menu_id)
+    if not menu:
+        return fail('菜单不存在', 404)
+
+    data = request.get_json() or {}
+    menu_name = (data.get('menu_name') or '').strip()
+    if 'menu_name' in data and not menu_name:
+        return fail('菜单名称不能为空')
+    if 'menu_type' in data and data['menu_type'] not in MENU_TYPES:
+        return fail('菜单类型错误')
+    error = _check_fields(data)
+    if error:
+        return fail(error)
+    if 'parent_id' in data:
+        parent_id = data['parent_id'] or 0
+        error = _check_parent(menu.id, parent_id)
+        if error:
+            return fail(error)
+        menu.parent_id = parent_id
+    for field in EDITABLE_FIELDS:
+        if field in data:
+            setattr(menu, Menu.serialize_attr(field), data[field])
+    if menu_name:
+        menu.menu_name = menu_name
+    menu.updated_by = g.user_id
+
+    _commit()
+    return success(menu.to_dict(), '更新成功')
+
+
+@menu_bp.delete('/api/v1/system/menu/<int:menu_id>')
+@login_required
+def delete_menu(menu_id):
+    """删除菜单（逻辑删除），存在下级菜单时不允许删除"""
+    menu = _get_menu(menu_id)
+    if not menu:
+        return fail('菜单不存在', 404)
+    if any(m['parent_id'] == menu.id for m in menu_tree.menus()):
+        return fail('存在下级菜单，不允许删除')
+
+    menu.enabled_flag = False
+    menu.updated_by = g.user_id
+    _commit()
+    return success(msg='删除成功')
+
+
+@menu_bp.put('/api/v1/system/menu/<int:menu_id>/status')
+@login_required
+def update_menu_status(menu_id):
+    """更新菜单状态"""
+    menu = _get_menu(menu_id)
+    if not menu:
+        return fail('菜单不存在', 404)
+
+    data = request.get_json() or {}
+    if data.get('status') not in (0, 1):
+        return fail('状态值错误')
+    menu.status = data['status']
+    menu.updated_by = g.user_id
+    _commit()
+    return success(msg='更新成功')
+
+
+@menu_bp.put('/api/v1/system/menu/<int:menu_id>/sort')
+@login_required
+def update_menu_sort(menu_id):
+    """更新菜单排序"""
+    menu = _get_menu(menu_id)
+    if not menu:
+        return fail('菜单不存在', 404)
+
+    data = request.get_json() or {}
+    sort = data.get('sort')
+    if not isinstance(sort, int):
+        return fail('排序值错误')
+    menu.order_num = sort
+    menu.updated_by = g.user_id
+    _commit()
+    return success(msg='更新成功')
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+from flask import Blueprint, request, g
+from app.utils.jwt_utils import login_required
+from app.utils.response import success, fail
+from app.utils.server_monitor import server_monitor, RESOLUTIONS, SERIES
+from app.utils.session_registry import session_registry
+
+monitor_bp = Blueprint('monitor', __name__)
+
+
+@monitor_bp.get('/api/v1/monitor/online/users')
+@login_required
+def online_users():
+    """在线用户列表（按最后活动时间倒序）"""
+    page = max(int(request.args.get('page', 1)), 1)
+    page_size = min(max(int(request.args.get('page_size', 20)), 1), 100)
+    return success(session_registry.list(page, page_size))
+
+
+@monitor_bp.get('/api/v1/monitor/online/stats')
+@login_required
+def online_stats():
+    """在线用户统计"""
+    return success(session_registry.stats())
+
+
+@monitor_bp.post('/api/v1/monitor/online/force-offline/<int:user_id>')
+@login_required
+def force_offline(user_id):
+    """强制下线：指定 session_id 时只下线该会话，否则下线该用户全部会话"""
+    session_id = request.args.get('session_id', '').strip() or None
+    if session_id is None and user_id == g.user_id:
+        return fail('不能强制下线自己的全部会话')
+    count = session_registry.force_offline(user_id, session_id)
+    return success({'count': count}, '已强制下线')
+
+
+@monitor_bp.post('/api/v1/monitor/online/cleanup')
+@login_required
+def cleanup():
+    """清理空闲超时与 token 已过期的会话"""
+    count = session_registry.cleanup()
+    return success({'count': count}, f'已清理 {count} 个过期会话')
+
+
+def _snapshot():
+    if not server_monitor.supported:
+        return None, fail('当前系统不支持服务器监控（需要 /proc）', 501)
+    snapshot = server_monitor.snapshot()
+    if snapshot is None:
+        return None, fail('监控数据采集中，请稍后重试', 503)
+    return snapshot, None
+
+
+def _limit(default=10) -> int:
+    return min(max(int(request.args.get('limit', default)), 1), 50)
+
+
+@monitor_bp.get('/api/v1/monitor/server/info')
+@login_required
+def server_info():
+    """服务器监控汇总（后台采样的快照，请求不读取 /proc）"""
+    snapshot, error = _snapshot()
+    if error:
+        return error
+    return success(dict(snapshot, top_processes=snapshot['top_processes'][:_limit()]))
+
+
+@monitor_bp.get('/api/v1/monitor/server/<part>')
+@login_required
+def server_part(part):
+    """cpu / memory / disk / network / processes 单项"""
+    key = {'cpu': 'cpu_info', 'memory': 'memory_info', 'disk': 'disk_info',
+           'network': 'network_info', 'processes': 'top_processes'}.get(part)
+    if key is None:
+        return fail('不存在的监控项', 404)
+    snapshot, error = _snapshot()
+    if error:
+        return error
+    return success(snapshot[key][:_limit()] if part == 'processes' else snapshot[key])
+
+
+@monitor_bp.get('/api/v1/monitor/server/history')
+@login_required
+def server_history():
+    """历史曲线：?metrics=cpu,memory&resolution=1s|1m|1h&since=时间戳，返回 {指标: [[时间戳, 数值], ...]}"""
+    if not server_monitor.supported:
+        return fail('当前系统不支持服务器监控（需要 /proc）', 501)
+    resolution = request.args.get('resolution', '1s')
+    if resolution not in RESOLUTIONS:
+        return fail('resolution 仅支持 1s、1m、1h')
+    names = [n for n in request.args.get('metrics', '').split(',') if n] or list(SERIES)
+    unknown = [n for n in names if n not in SERIES]
+    if unknown:
+        return fail(f'不支持的指标：{",".join(unknown)}')
+    since = float(request.args.get('since', 0))
+    return success({'resolution': resolution, 'series': server_monitor.history(names, resolution, since)})
@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 from flask import Blueprint
+from app.models import db
 from app.models.role import Permission
+from app.utils.http_cache import conditional
 from app.utils.jwt_utils import login_required
 from app.utils.response import success
 
@@ -9,9 +11,12 @@ permission_bp = Blueprint('permission', __name__)
 
 @permission_bp.get('/api/v1/system/permission')
 @login_required
+@conditional('permission')
 def get_permissions():
     """获取所有权限列表"""
-    permissions = Permission.query.filter_by(enabled_flag=True).order_by(
-        Permission.permission_type, Permission.sort
+    rows = db.session.execute(
+        db.select(*Permission.serialize_columns())
+        .where(Permission.enabled_flag == True)
+        .order_by(Permission.permission_type, Permission.sort)
     ).all()
-    return success([p.to_dict() for p in permissions])
+    return success(Permission.rows_to_dicts(rows))
@@ -1,7 +1,9 @@
 # -*- coding: utf-8 -*-
-from flask import Blueprint, request, g
+from flask import Blueprint, request, g, current_app
 from app.models import db
 from app.models.role import Role, Permission
+from app.utils.export import FORMATS, ROLE_COLUMNS, iter_roles, export_response
+from app.utils.http_cache import conditional, bump_version
 from app.utils.jwt_utils import login_required
 from app.utils.response import success, fail
 
@@ -10,10 +12,25 @@ role_bp = Blueprint('role', __name__)
 
 @role_bp.get('/api/v1/system/role')
 @login_required
+@conditional('role')
 def get_roles():
     """获取角色列表"""
-    roles = Role.query.filter_by(enabled_flag=True).order_by(Role.id.desc()).all()
-    return success([r.to_dict() for r in roles])
+    rows = db.session.execute(
+        db.select(*Role.serialize_columns()).where(Role.enabled_flag == True).order_by(Role.id.desc())
+    ).all()
+    return success(Role.rows_to_dicts(rows))
+
+
+@role_bp.get('/api/v1/system/role/export')
+@login_required
+def export_roles():
+    """导出角色及其权限编码（流式输出，?format=csv|ndjson|xlsx，?gzip=1 实时压缩）"""
+    fmt = request.args.get('format', 'csv')
+    if fmt not in FORMATS:
+        return fail('仅支持 csv、ndjson 和 xlsx 格式')
+    compress = request.args.get('gzip', '').lower() in ('1', 'true')
+    batch_size = current_app.config['EXPORT_BATCH_SIZE']
+    return export_response(fmt, 'roles', ROLE_COLUMNS, iter_roles(batch_size), compress)
 
 
 @role_bp.post('/api/v1/system/role')
@@ -37,6 +54,7 @@ def create_role():
         updated_by=g.user_id,
     )
     db.session.add(role)
+    bump_version('role')
     db.session.commit()
     return success(role.to_dict(), '创建成功')
 
@@ -60,6 +78,7 @@ def update_role(role_id):
         role.status = data['status']
     role.updated_by = g.user_id
 
+    bump_version('role', 'permission')
     db.session.commit()
     return success(role.to_dict(), '更新成功')
 
@@ -74,6 +93,7 @@ def delete_role(role_id):
 
     role.enabled_flag = False
     role.updated_by = g.user_id
+    bump_version('role', 'permission')
     db.session.commit()
     return success(msg='删除成功')
 
@@ -106,5 +126,6 @@ def update_role_permissions(role_id):
     role.permissions = permissions
     role.updated_by = g.user_id
 
+    bump_version('permission')
     db.session.commit()
     return success(msg='权限更新成功')
@@ -1,19 +1,23 @@
 # -*- coding: utf-8 -*-
-import bcrypt
-from flask import Blueprint, request, g
+from math import ceil
+from flask import Blueprint, request, g, current_app
 from app.models import db
 from app.models.user import User
 from app.models.role import Role
+from app.utils.export import FORMATS, USER_COLUMNS, iter_users, export_response
+from app.utils.cursor import encode_cursor, decode_cursor, InvalidCursor
+from app.utils.dept_tree import dept_path, subtree_ids_select
+from app.utils.http_cache import bump_version
 from app.utils.jwt_utils import login_required
+from app.utils.password import hash_password, check_password
 from app.utils.response import success, fail
+from app.utils.token_denylist import token_denylist
+from app.utils.user_import import UserImporter, iter_rows
+from app.utils.user_search import user_search
 
 user_bp = Blueprint('user', __name__)
 
 
-def hash_password(plain: str) -> str:
-    return bcrypt.hashpw(plain.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-
-
 @user_bp.get('/api/v1/system/user')
 @login_required
 def get_users():
@@ -21,14 +25,40 @@ def get_users():
     page = int(request.args.get('page', 1))
     page_size = min(int(request.args.get('pageSize', request.args.get('page_size', 10))), 100)
     keyword = request.args.get('username', request.args.get('keyword', '')).strip()
-
-    query = User.query.filter_by(enabled_flag=True)
+    skip_total = request.args.get('skipTotal', '').lower() in ('1', 'true')
+
+    query = User.query.options(*User.list_options()).filter_by(enabled_flag=True)
+    dept_id = request.args.get('dept_id', type=int)
+    if dept_id:
+        # 本部门及所有下级部门的用户
+        path = dept_path(dept_id)
+        if path is None:
+            return fail('部门不存在', 404)
+        query = query.filter(User.dept_id.in_(subtree_ids_select(path)))
+    if 'cursor' in request.args:
+        capped = None
+        if keyword:
+            ids = user_search.search(keyword, user_search.limit + 1)
+            capped = len(ids) > user_search.limit
+            query = query.filter(User.id.in_(ids[:user_search.limit]))
+        return _get_users_by_cursor(query, page_size, capped)
     if keyword:
-        query = query.filter(
-            db.or_(User.username.like(f'%{keyword}%'), User.nickname.like(f'%{keyword}%'))
-        )
-
-    pagination = query.order_by(User.id.desc()).paginate(page=page, per_page=page_size, error_out=False)
+        return _get_users_by_keyword(query, keyword, page, page_size)
+
+    query = query.order_by(User.id.desc())
+    if skip_total:
+        # 不执行 COUNT，多取一条判断是否还有下一页
+        users = query.offset((max(page, 1) - 1) * page_size).limit(page_size + 1).all()
+        return success({
+            'rowTotal': None,
+            'pageTotal': None,
+            'page': page,
+            'pageSize': page_size,
+            'hasNext': len(users) > page_size,
+            'rows': [u.to_dict() for u in users[:page_size]]
+        })
+
+    pagination = query.paginate(page=page, per_page=page_size, error_out=False)
     return success({
         'rowTotal': pagination.total,
         'pageTotal': pagination.pages,
@@ -38,6 +68,85 @@ def get_users():
     })
 
 
+def _get_users_by_keyword(query, keyword, page, page_size):
+    """关键字搜索：搜索后端给出按相关度排序的用户 id（最多 USER_SEARCH_LIMIT 个），
+    与部门、状态等筛选条件取交集后再计数、分页
+
+    命中数超过上限时只返回前 USER_SEARCH_LIMIT 个，rowTotalCapped 为 true 表示 rowTotal 是截断后的数量。
+    """
+    limit = user_search.limit
+    ids = user_search.search(keyword, limit + 1)
+    capped = len(ids) > limit
+    ids = ids[:limit]
+    if ids:
+        matched = {i for i, in query.order_by(None).filter(User.id.in_(ids)).with_entities(User.id)}
+        ids = [i for i in ids if i in matched]
+    start = (max(page, 1) - 1) * page_size
+    page_ids = ids[start:start + page_size]
+    users = {u.id: u for u in query.filter(User.id.in_(page_ids)).all()} if page_ids else {}
+    return success({
+        'rowTotal': len(ids),
+        'rowTotalCapped': capped,
+        'pageTotal': ceil(len(ids) / page_size),
+        'page': page,
+        'pageSize': page_size,
+        'rows': [users[i].to_dict() for i in page_ids if i in users]
+    })
+
+
+def _get_users_by_cursor(query, page_size, capped=None):
+    """游标分页：按 id 定位（seek）而不是 OFFSET，任意深度的页耗时一致
+
+    ?cursor= 为空表示第一页，之后传入响应中的 next_cursor / prev_cursor。
+    rowTotal 需要额外的 COUNT，仅在 ?withTotal=1 时返回。
+    带关键字时只在相关度最高的 USER_SEARCH_LIMIT 个命中中按 id 翻页，
+    rowTotalCapped 为 true 表示命中数超过上限、翻到最后一页也不是全部结果。
+    """
+    try:
+        direction, last_id = decode_cursor(request.args.get('cursor', ''))
+    except InvalidCursor:
+        return fail('无效的分页游标')
+    if (last_id is not None and not isinstance(last_id, int)) or (direction == 'prev' and last_id is None):
+        return fail('无效的分页游标')
+
+    with_total = request.args.get('withTotal', '').lower() in ('1', 'true')
+    row_total = query.order_by(None).count() if with_total else None
+
+    if direction == 'prev':
+        users = query.filter(User.id > last_id).order_by(User.id.asc()).limit(page_size + 1).all()
+        has_prev, has_next = len(users) > page_size, True
+        users = users[:page_size][::-1]
+    else:
+        if last_id is not None:
+            query = query.filter(User.id < last_id)
+        users = query.order_by(User.id.desc()).limit(page_size + 1).all()
+        has_prev, has_next = last_id is not None, len(users) > page_size
+        users = users[:page_size]
+
+    data = {
+        'rowTotal': row_total,
+        'pageSize': page_size,
+        'next_cursor': encode_cursor('next', users[-1].id) if users and has_next else None,
+        'prev_cursor': encode_cursor('prev', users[0].id) if users and has_prev else None,
+        'rows': [u.to_dict() for u in users]
+    }
+    if capped is not None:
+        data['rowTotalCapped'] = capped
+    return success(data)
+
+
+@user_bp.get('/api/v1/system/user/export')
+@login_required
+def export_users():
+    """导出用户（流式输出，?format=csv|ndjson|xlsx，?gzip=1 实时压缩）"""
+    fmt = request.args.get('format', 'csv')
+    if fmt not in FORMATS:
+        return fail('仅支持 csv、ndjson 和 xlsx 格式')
+    compress = request.args.get('gzip', '').lower() in ('1', 'true')
+    batch_size = current_app.config['EXPORT_BATCH_SIZE']
+    return export_response(fmt, 'users', USER_COLUMNS, iter_users(batch_size), compress)
+
+
 @user_bp.get('/api/v1/system/user/<int:user_id>')
 @login_required
 def get_user(user_id):
@@ -62,6 +171,10 @@ def create_user():
     if User.query.filter_by(username=username, enabled_flag=True).first():
         return fail('用户名已存在')
 
+    dept_id = data.get('dept_id') or None
+    if dept_id and dept_path(dept_id) is None:
+        return fail('部门不存在')
+
     role_ids = data.get('role_ids', [])
     user = User(
         username=username,
@@ -71,6 +184,7 @@ def create_user():
         phone=data.get('phone'),
         status=data.get('status', 1),
         user_type=data.get('user_type', 20),
+        dept_id=dept_id,
         created_by=g.user_id,
         updated_by=g.user_id,
     )
@@ -80,9 +194,34 @@ def create_user():
 
     db.session.add(user)
     db.session.commit()
+    user_search.index(user)
     return success(user.to_dict(), '创建成功')
 
 
+@user_bp.post('/api/v1/system/user/import')
+@login_required
+def import_users():
+    """批量导入用户（流式解析 CSV / NDJSON 请求体）
+
+    格式由 ?format=csv|ndjson 指定，缺省时按 Content-Type 判断。
+    字段：username、password、nickname、email、phone、status、user_type、role_ids
+    （CSV 中多个角色用分号分隔，NDJSON 中为数组）。
+    """
+    fmt = request.args.get('format') or ('csv' if 'csv' in (request.content_type or '') else 'ndjson')
+    if fmt not in ('csv', 'ndjson'):
+        return fail('仅支持 csv 和 ndjson 格式')
+
+    importer = UserImporter(
+        g.user_id,
+        chunk_size=current_app.config['USER_IMPORT_CHUNK_SIZE'],
+        max_errors=current_app.config['USER_IMPORT_MAX_ERRORS'],
+    )
+    summary = importer.run(iter_rows(request.stream, fmt))
+    if summary['created']:
+        user_search.reset()
+    return success(summary, '导入完成')
+
+
 @user_bp.put('/api/v1/system/user/<int:user_id>')
 @login_required
 def update_user(user_id):
@@ -100,14 +239,22 @@ def update_user(user_id):
         user.phone = data['phone']
     if 'status' in data:
         user.status = data['status']
+    if 'dept_id' in data:
+        if data['dept_id'] and dept_path(data['dept_id']) is None:
+            return fail('部门不存在')
+        user.dept_id = data['dept_id'] or None
     if 'password' in data and data['password']:
         user.password = hash_password(data['password'])
     if 'role_ids' in data:
         roles = Role.query.filter(Role.id.in_(data['role_ids']), Role.enabled_flag == True).all()
         user.roles = roles
+        bump_version('permission')
     user.updated_by = g.user_id
 
     db.session.commit()
+    user_search.index(user)
+    if user.status != 1 or data.get('password'):
+        token_denylist.revoke_user(user.id)
     return success(user.to_dict(), '更新成功')
 
 
@@ -122,7 +269,10 @@ def delete_user():
     User.query.filter(User.id.in_(ids), User.enabled_flag == True).update(
         {'enabled_flag': False, 'updated_by': g.user_id}, synchronize_session=False
     )
+    bump_version('permission')
     db.session.commit()
+    user_search.remove(*ids)
+    token_denylist.revoke_user(*ids)
     return success(msg='删除成功')
 
 
@@ -138,6 +288,8 @@ def update_user_status(user_id):
     user.status = data.get('status', 1)
     user.updated_by = g.user_id
     db.session.commit()
+    if user.status != 1:
+        token_denylist.revoke_user(user.id)
     return success(msg='状态更新成功')
 
 
@@ -154,6 +306,7 @@ def reset_password(user_id):
     user.password = hash_password(new_pwd)
     user.updated_by = g.user_id
     db.session.commit()
+    token_denylist.revoke_user(user.id)
     return success(msg='密码重置成功')
 @user_bp.put('/api/v1/system/user/profile')
 @login_required
@@ -173,6 +326,7 @@ def update_profile():
 
     user.updated_by = g.user_id
     db.session.commit()
+    user_search.index(user)
     return success(user.to_dict(), '个人信息更新成功')
 
 @user_bp.put('/api/v1/system/user/avatar')
@@ -205,10 +359,11 @@ def change_password():
     old_pwd = data.get('old_password', '')
     new_pwd = data.get('new_password', '')
 
-    if not bcrypt.checkpw(old_pwd.encode('utf-8'), user.password.encode('utf-8')):
+    if not check_password(old_pwd, user.password):
         return fail('旧密码错误')
 
     user.password = hash_password(new_pwd)
     user.updated_by = g.user_id
     db.session.commit()
+    token_denylist.revoke_user(user.id)
     return success(msg='密码修改成功')
@@ -3,6 +3,37 @@ from flask_sqlalchemy import SQLAlchemy
 
 db = SQLAlchemy()
 
+# 主键类型：MySQL 使用 BIGINT，SQLite 只有 INTEGER PRIMARY KEY 才会自增
+BigIntPK = db.BigInteger().with_variant(db.Integer(), 'sqlite')
+
+
+class SerializeMixin:
+    """按 serialize_fields 输出可直接交给 JSON 编码器的元组/字典，datetime 由 JSON provider 统一格式化"""
+    serialize_fields = ()
+    # 输出字段名与模型属性名不同时的映射（输出名 -> 属性名）
+    serialize_attrs = {}
+
+    @classmethod
+    def serialize_attr(cls, field):
+        return cls.serialize_attrs.get(field, field)
+
+    @classmethod
+    def serialize_columns(cls):
+        """列表查询只取这些列，得到的行即为 to_tuple() 的结果，省去 ORM 对象的构建"""
+        return [getattr(cls, cls.serialize_attr(f)) for f in cls.serialize_fields]
+
+    @classmethod
+    def rows_to_dicts(cls, rows):
+        fields = cls.serialize_fields
+        return [dict(zip(fields, row)) for row in rows]
+
+    def to_tuple(self):
+        return tuple(getattr(self, self.serialize_attr(f)) for f in self.serialize_fields)
+
+    def to_dict(self):
+        return dict(zip(self.serialize_fields, self.to_tuple()))
+
+
 # 用户-角色关联表（多对多）
 user_role = db.Table(
     'user_role',
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime
+from app.models import db, BigIntPK, SerializeMixin
+
+
+class Dept(SerializeMixin, db.Model):
+    """部门表
+
+    path 为物化路径：从根到自身的 id 序列，形如 /1/5/12/。
+    子树查询为 path 前缀匹配（走 path 索引），祖先 id 直接从 path 解析，不需要递归。
+    """
+    __tablename__ = 'dept'
+    __table_args__ = {'mysql_charset': 'utf8', 'extend_existing': True}
+
+    id = db.Column(BigIntPK, primary_key=True, autoincrement=True, comment='主键')
+    parent_id = db.Column(db.BigInteger, nullable=False, default=0, index=True, comment='上级部门ID，0为顶级')
+    path = db.Column(db.String(255), nullable=False, default='', index=True, comment='物化路径 /祖先id/.../自身id/')
+    dept_name = db.Column(db.String(64), nullable=False, comment='部门名称')
+    sort = db.Column(db.Integer, nullable=False, default=0, comment='排序')
+    leader = db.Column(db.String(64), nullable=True, comment='负责人')
+    phone = db.Column(db.String(20), nullable=True, comment='联系电话')
+    email = db.Column(db.String(64), nullable=True, comment='邮箱')
+    status = db.Column(db.SmallInteger, nullable=False, default=1, comment='1启用 0禁用')
+    enabled_flag = db.Column(db.Boolean, nullable=False, default=True, comment='是否有效')
+    creation_date = db.Column(db.DateTime, default=datetime.now, comment='创建时间')
+    created_by = db.Column(db.BigInteger, nullable=True, comment='创建人')
+    updation_date = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now, comment='更新时间')
+    updated_by = db.Column(db.BigInteger, nullable=True, comment='更新人')
+
+    serialize_fields = (
+        'id', 'parent_id', 'path', 'dept_name', 'sort', 'leader', 'phone', 'email', 'status', 'creation_date'
+    )
+
+    def ancestor_ids(self) -> list:
+        """祖先部门 id（从根开始，不含自身）"""
+        return [int(i) for i in self.path.strip('/').split('/')[:-1]]
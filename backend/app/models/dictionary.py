@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime
+from app.models import db, BigIntPK, SerializeMixin
+
+
+class DictType(SerializeMixin, db.Model):
+    """字典类型表"""
+    __tablename__ = 'dict_type'
+    __table_args__ = {'mysql_charset': 'utf8', 'extend_existing': True}
+
+    id = db.Column(BigIntPK, primary_key=True, autoincrement=True, comment='主键')
+    dict_name = db.Column(db.String(100), nullable=False, comment='字典名称')
+    dict_type = db.Column(db.String(100), nullable=False, index=True, comment='字典类型')
+    status = db.Column(db.SmallInteger, nullable=False, default=1, comment='1启用 0禁用')
+    remark = db.Column(db.String(500), nullable=True, comment='备注')
+    enabled_flag = db.Column(db.Boolean, nullable=False, default=True, comment='是否有效')
+    creation_date = db.Column(db.DateTime, default=datetime.now, comment='创建时间')
+    created_by = db.Column(db.BigInteger, nullable=True, comment='创建人')
+    updation_date = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now, comment='更新时间')
+    updated_by = db.Column(db.BigInteger, nullable=True, comment='更新人')
+
+    # 前端字典页面使用 created_at
+    created_at = db.synonym('creation_date')
+
+    serialize_fields = ('id', 'dict_name', 'dict_type', 'status', 'remark', 'created_at')
+
+
+class DictData(SerializeMixin, db.Model):
+    """字典数据表，按 dict_type 关联字典类型"""
+    __tablename__ = 'dict_data'
+    __table_args__ = (
+        db.Index('ix_dict_data_type_sort', 'dict_type', 'dict_sort'),
+        {'mysql_charset': 'utf8', 'extend_existing': True},
+    )
+
+    id = db.Column(BigIntPK, primary_key=True, autoincrement=True, comment='主键')
+    dict_type = db.Column(db.String(100), nullable=False, comment='字典类型')
+    dict_label = db.Column(db.String(100), nullable=False, comment='字典标签')
+    dict_value = db.Column(db.String(100), nullable=False, comment='字典键值')
+    dict_sort = db.Column(db.Integer, nullable=False, default=0, comment='排序')
+    status = db.Column(db.SmallInteger, nullable=False, default=1, comment='1启用 0禁用')
+    remark = db.Column(db.String(500), nullable=True, comment='备注')
+    enabled_flag = db.Column(db.Boolean, nullable=False, default=True, comment='是否有效')
+    creation_date = db.Column(db.DateTime, default=datetime.now, comment='创建时间')
+    created_by = db.Column(db.BigInteger, nullable=True, comment='创建人')
+    updation_date = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now, comment='更新时间')
+    updated_by = db.Column(db.BigInteger, nullable=True, comment='更新人')
+
+    created_at = db.synonym('creation_date')
+
+    serialize_fields = ('id', 'dict_type', 'dict_label', 'dict_value', 'dict_sort', 'status', 'remark', 'created_at')
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime
+from app.models import db, BigIntPK, SerializeMixin
+
+
+class FileRecord(SerializeMixin, db.Model):
+    """文件表
+
+    文件内容按 sha256 存储（见 app.utils.file_store），内容相同的多次上传各有一条记录、共用一份文件。
+    """
+    __tablename__ = 'file_record'
+    __table_args__ = (
+        db.Index('ix_file_record_enabled_flag_id', 'enabled_flag', 'id'),
+        {'mysql_charset': 'utf8', 'extend_existing': True},
+    )
+
+    id = db.Column(BigIntPK, primary_key=True, autoincrement=True, comment='主键')
+    file_name = db.Column(db.String(128), nullable=False, comment='存储文件名')
+    original_name = db.Column(db.String(255), nullable=False, comment='原始文件名')
+    file_ext = db.Column(db.String(16), nullable=False, default='', comment='扩展名（不含点）')
+    file_type = db.Column(db.String(16), nullable=False, default='other', comment='文件分类')
+    mime_type = db.Column(db.String(128), nullable=True, comment='MIME 类型')
+    file_size = db.Column(db.BigInteger, nullable=False, default=0, comment='文件大小（字节）')
+    sha256 = db.Column(db.String(64), nullable=False, index=True, comment='内容哈希')
+    file_path = db.Column(db.String(255), nullable=False, comment='相对存储目录的路径')
+    upload_type = db.Column(db.String(16), nullable=False, default='single', comment='single / batch / chunk / instant')
+    description = db.Column(db.String(500), nullable=True, comment='描述')
+    tags = db.Column(db.String(255), nullable=True, comment='标签，逗号分隔')
+    is_public = db.Column(db.SmallInteger, nullable=False, default=0, comment='1公开 0私有')
+    download_count = db.Column(db.Integer, nullable=False, default=0, comment='下载次数')
+    uploaded_by = db.Column(db.BigInteger, nullable=True, index=True, comment='上传人')
+    enabled_flag = db.Column(db.Boolean, nullable=False, default=True, comment='是否有效')
+    creation_date = db.Column(db.DateTime, default=datetime.now, comment='创建时间')
+    updation_date = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now, comment='更新时间')
+    updated_by = db.Column(db.BigInteger, nullable=True, comment='更新人')
+
+    # 前端文件页面使用 created_at
+    created_at = db.synonym('creation_date')
+
+    serialize_fields = (
+        'id', 'file_name', 'original_name', 'file_ext', 'file_type', 'mime_type', 'file_size', 'sha256',
+        'file_path', 'upload_type', 'description', 'tags', 'is_public', 'download_count', 'uploaded_by', 'created_at'
+    )
+
+
+class FileStat(db.Model):
+    """文件统计计数器，随上传、删除、下载在同一事务内增减，统计接口不必扫描文件表或存储目录
+
+    name 取值：type:<文件分类>（有效文件数与大小）、storage（实际存储的文件数与大小）、downloads（下载次数）
+    """
+    __tablename__ = 'file_stat'
+    __table_args__ = {'mysql_charset': 'utf8', 'extend_existing': True}
+
+    name = db.Column(db.String(32), primary_key=True, comment='计数器名称')
+    file_count = db.Column(db.BigInteger, nullable=False, default=0, comment='数量')
+    total_size = db.Column(db.BigInteger, nullable=False, default=0, comment='字节数')
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime
+from app.models import db, BigIntPK
+
+
+class OperationLog(db.Model):
+    """操作日志表"""
+    __tablename__ = 'operation_log'
+    __table_args__ = {'mysql_charset': 'utf8', 'extend_existing': True}
+
+    id = db.Column(BigIntPK, primary_key=True, autoincrement=True, comment='主键')
+    user_id = db.Column(db.BigInteger, nullable=True, index=True, comment='操作人ID')
+    username = db.Column(db.String(64), nullable=False, default='', comment='操作人用户名')
+    operation = db.Column(db.String(32), nullable=False, default='', comment='操作类型')
+    method = db.Column(db.String(10), nullable=False, comment='请求方法')
+    module = db.Column(db.String(64), nullable=False, default='', comment='操作模块')
+    url = db.Column(db.String(255), nullable=False, comment='请求路径')
+    ip = db.Column(db.String(64), nullable=False, default='', comment='操作IP')
+    user_agent = db.Column(db.String(500), nullable=False, default='', comment='User-Agent')
+    request_data = db.Column(db.Text, nullable=True, comment='请求参数（敏感字段已脱敏）')
+    change_data = db.Column(db.Text, nullable=True, comment='数据变更（各行变更列的修改前后值）')
+    description = db.Column(db.String(255), nullable=False, default='', comment='操作描述（含提交的字段）')
+    status = db.Column(db.Integer, nullable=False, default=1, comment='状态 1成功 0失败')
+    status_code = db.Column(db.Integer, nullable=False, comment='HTTP 状态码')
+    error_msg = db.Column(db.String(500), nullable=True, comment='错误信息')
+    execution_time = db.Column(db.Integer, nullable=False, default=0, comment='执行耗时（毫秒）')
+    operation_time = db.Column(db.DateTime, nullable=False, default=datetime.now, index=True, comment='操作时间')
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'username': self.username,
+            'operation': self.operation,
+            'method': self.method,
+            'module': self.module,
+            'url': self.url,
+            'ip': self.ip,
+            'user_agent': self.user_agent,
+            'request_data': self.request_data,
+            'change_data': self.change_data,
+            'description': self.description,
+            'status': self.status,
+            'status_code': self.status_code,
+            'error_msg': self.error_msg,
+            'execution_time': self.execution_time,
+            'operation_time': self.operation_time,
+        }
+
+
+class LoginRollup(db.Model):
+    """登录按小时汇总表，每小时每个用户名/IP 一行"""
+    __tablename__ = 'login_rollup'
+    __table_args__ = {'mysql_charset': 'utf8', 'extend_existing': True}
+
+    hour = db.Column(db.DateTime, primary_key=True, comment='整点时间')
+    username = db.Column(db.String(64), primary_key=True, comment='登录用户名')
+    ip = db.Column(db.String(64), primary_key=True, comment='登录IP')
+    success_count = db.Column(db.Integer, nullable=False, default=0, comment='成功次数')
+    fail_count = db.Column(db.Integer, nullable=False, default=0, comment='失败次数')
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime
+from app.models import db, BigIntPK, SerializeMixin
+
+
+class Menu(SerializeMixin, db.Model):
+    """菜单表（目录 / 菜单 / 按钮），parent_id 为 0 表示顶级"""
+    __tablename__ = 'menu'
+    __table_args__ = {'mysql_charset': 'utf8', 'extend_existing': True}
+
+    id = db.Column(BigIntPK, primary_key=True, autoincrement=True, comment='主键')
+    parent_id = db.Column(db.BigInteger, nullable=False, default=0, index=True, comment='上级菜单ID')
+    menu_type = db.Column(db.String(1), nullable=False, default='C', comment='M目录 C菜单 F按钮')
+    menu_name = db.Column(db.String(64), nullable=False, comment='菜单名称')
+    path = db.Column(db.String(255), nullable=True, comment='路由路径')
+    component = db.Column(db.String(255), nullable=True, comment='组件路径')
+    component_name = db.Column(db.String(64), nullable=True, comment='组件名称（路由name）')
+    # 列名与前端字段为 query，属性名避开 Flask-SQLAlchemy 的 Menu.query
+    route_query = db.Column('query', db.String(255), nullable=True, comment='路由参数')
+    perms = db.Column(db.String(100), nullable=True, comment='权限标识')
+    icon = db.Column(db.String(100), nullable=True, comment='菜单图标')
+    order_num = db.Column(db.Integer, nullable=False, default=0, comment='排序')
+    visible = db.Column(db.SmallInteger, nullable=False, default=1, comment='1显示 0隐藏')
+    status = db.Column(db.SmallInteger, nullable=False, default=1, comment='1启用 0禁用')
+    is_frame = db.Column(db.SmallInteger, nullable=False, default=1, comment='是否外链 1是 0否')
+    is_cache = db.Column(db.SmallInteger, nullable=False, default=0, comment='1缓存 0不缓存')
+    remark = db.Column(db.String(500), nullable=True, comment='备注')
+    enabled_flag = db.Column(db.Boolean, nullable=False, default=True, comment='是否有效')
+    creation_date = db.Column(db.DateTime, default=datetime.now, comment='创建时间')
+    created_by = db.Column(db.BigInteger, nullable=True, comment='创建人')
+    updation_date = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now, comment='更新时间')
+    updated_by = db.Column(db.BigInteger, nullable=True, comment='更新人')
+
+    serialize_fields = (
+        'id', 'parent_id', 'menu_type', 'menu_name', 'path', 'component', 'component_name', 'query', 'perms',
+        'icon', 'order_num', 'visible', 'status', 'is_frame', 'is_cache', 'remark', 'creation_date'
+    )
+    serialize_attrs = {'query': 'route_query'}
@@ -1,14 +1,14 @@
 # -*- coding: utf-8 -*-
 from datetime import datetime
-from app.models import db
+from app.models import db, BigIntPK, SerializeMixin
 
 
-class Role(db.Model):
+class Role(SerializeMixin, db.Model):
     """角色表"""
     __tablename__ = 'roles'
     __table_args__ = {'mysql_charset': 'utf8', 'extend_existing': True}
 
-    id = db.Column(db.BigInteger, primary_key=True, autoincrement=True, comment='主键')
+    id = db.Column(BigIntPK, primary_key=True, autoincrement=True, comment='主键')
     name = db.Column(db.String(64), nullable=True, index=True, comment='角色名称')
     role_code = db.Column(db.String(64), nullable=True, index=True, comment='角色编码')
     description = db.Column(db.String(500), nullable=True, comment='描述')
@@ -27,23 +27,15 @@ class Role(db.Model):
         lazy='select'
     )
 
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'name': self.name,
-            'role_code': self.role_code,
-            'description': self.description,
-            'status': self.status,
-            'creation_date': self.creation_date.strftime('%Y-%m-%d %H:%M:%S') if self.creation_date else None,
-        }
+    serialize_fields = ('id', 'name', 'role_code', 'description', 'status', 'creation_date')
 
 
-class Permission(db.Model):
+class Permission(SerializeMixin, db.Model):
     """权限表"""
     __tablename__ = 'permission'
     __table_args__ = {'mysql_charset': 'utf8', 'extend_existing': True}
 
-    id = db.Column(db.BigInteger, primary_key=True, autoincrement=True, comment='主键')
+    id = db.Column(BigIntPK, primary_key=True, autoincrement=True, comment='主键')
     permission_code = db.Column(db.String(100), nullable=False, unique=True, index=True, comment='权限编码')
     permission_name = db.Column(db.String(100), nullable=False, comment='权限名称')
     permission_type = db.Column(db.SmallInteger, nullable=False, comment='1菜单 2按钮 3数据 4API')
@@ -53,13 +45,6 @@ class Permission(db.Model):
     enabled_flag = db.Column(db.Boolean, nullable=False, default=True, comment='是否有效')
     creation_date = db.Column(db.DateTime, default=datetime.now, comment='创建时间')
 
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'permission_code': self.permission_code,
-            'permission_name': self.permission_name,
-            'permission_type': self.permission_type,
-            'status': self.status,
-            'sort': self.sort,
-            'description': self.description,
-        }
+    serialize_fields = (
+        'id', 'permission_code', 'permission_name', 'permission_type', 'status', 'sort', 'description'
+    )
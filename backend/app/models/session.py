@@ -0,0 +1,16 @@
+# -*- coding: utf-8 -*-
+from app.models import db
+
+
+class OnlineSession(db.Model):
+    """在线会话表，一个 token（jti）对应一条记录"""
+    __tablename__ = 'online_session'
+    __table_args__ = {'mysql_charset': 'utf8', 'extend_existing': True}
+
+    session_id = db.Column(db.String(32), primary_key=True, comment='会话ID（token jti）')
+    user_id = db.Column(db.BigInteger, nullable=False, index=True, comment='用户ID')
+    ip_address = db.Column(db.String(64), nullable=False, default='', comment='登录IP')
+    user_agent = db.Column(db.String(500), nullable=False, default='', comment='User-Agent')
+    login_time = db.Column(db.DateTime, nullable=False, comment='登录时间')
+    last_activity = db.Column(db.DateTime, nullable=False, index=True, comment='最后活动时间')
+    expires_at = db.Column(db.Float, nullable=False, comment='token 过期时间戳')
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+from app.models import db
+
+
+class RevokedToken(db.Model):
+    """已吊销的 token"""
+    __tablename__ = 'token_denylist'
+    __table_args__ = {'mysql_charset': 'utf8', 'extend_existing': True}
+
+    jti = db.Column(db.String(32), primary_key=True, comment='token 唯一标识')
+    exp = db.Column(db.Float, nullable=False, index=True, comment='token 过期时间戳')
+
+
+class UserTokenWatermark(db.Model):
+    """用户 token 水位，iat 早于 not_before 的 token 失效"""
+    __tablename__ = 'user_token_watermark'
+    __table_args__ = {'mysql_charset': 'utf8', 'extend_existing': True}
+
+    user_id = db.Column(db.BigInteger, primary_key=True, comment='用户ID')
+    not_before = db.Column(db.Float, nullable=False, comment='水位时间戳')
+
+
+class RateLimitState(db.Model):
+    """登录限流状态（多 worker 共享时使用）"""
+    __tablename__ = 'rate_limit_state'
+    __table_args__ = {'mysql_charset': 'utf8', 'extend_existing': True}
+
+    key = db.Column(db.String(128), primary_key=True, comment='限流键，如 u:admin、i:10.0.0.1')
+    tat = db.Column(db.Float, nullable=False, default=0, comment='GCRA 理论到达时间戳')
+    locked_until = db.Column(db.Float, nullable=False, default=0, comment='锁定截止时间戳')
+    strikes = db.Column(db.Integer, nullable=False, default=0, comment='连续锁定次数')
+    expires = db.Column(db.Float, nullable=False, index=True, comment='状态失效时间戳')
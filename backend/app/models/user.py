@@ -1,14 +1,18 @@
 # -*- coding: utf-8 -*-
 from datetime import datetime
-from app.models import db
+from app.models import db, BigIntPK, SerializeMixin
 
 
-class User(db.Model):
+class User(SerializeMixin, db.Model):
     """用户表"""
     __tablename__ = 'user'
-    __table_args__ = {'mysql_charset': 'utf8', 'extend_existing': True}
+    __table_args__ = (
+        # 游标分页按 enabled_flag 过滤后按 id 定位
+        db.Index('ix_user_enabled_flag_id', 'enabled_flag', 'id'),
+        {'mysql_charset': 'utf8', 'extend_existing': True},
+    )
 
-    id = db.Column(db.BigInteger, primary_key=True, autoincrement=True, comment='主键')
+    id = db.Column(BigIntPK, primary_key=True, autoincrement=True, comment='主键')
     username = db.Column(db.String(64), nullable=False, index=True, comment='用户名')
     password = db.Column(db.Text, nullable=False, comment='密码')
     nickname = db.Column(db.String(255), nullable=False, default='', comment='昵称')
@@ -17,6 +21,7 @@ class User(db.Model):
     avatar = db.Column(db.Text, nullable=True, default='', comment='头像')
     status = db.Column(db.Integer, nullable=False, default=1, comment='状态 1启用 0禁用')
     user_type = db.Column(db.Integer, nullable=False, default=20, comment='用户类型 10管理员 20普通用户')
+    dept_id = db.Column(db.BigInteger, db.ForeignKey('dept.id'), nullable=True, index=True, comment='所属部门')
     enabled_flag = db.Column(db.Boolean, nullable=False, default=True, comment='是否有效 1有效 0删除')
     creation_date = db.Column(db.DateTime, default=datetime.now, comment='创建时间')
     created_by = db.Column(db.BigInteger, nullable=True, comment='创建人')
@@ -30,17 +35,26 @@ class User(db.Model):
         backref=db.backref('users', lazy='dynamic'),
         lazy='select'
     )
+    dept = db.relationship('Dept', lazy='select')
+
+    @classmethod
+    def list_options(cls):
+        """列表查询的加载策略：跳过 password 列，并用 IN 查询批量预加载当前页所有用户的角色和部门"""
+        from app.models.role import Role
+        from app.models.dept import Dept
+        return (
+            db.defer(cls.password),
+            db.selectinload(cls.roles).load_only(Role.id, Role.name, Role.role_code),
+            db.selectinload(cls.dept).load_only(Dept.id, Dept.dept_name),
+        )
+
+    serialize_fields = (
+        'id', 'username', 'nickname', 'email', 'phone', 'avatar', 'status', 'user_type', 'dept_id', 'creation_date'
+    )
 
     def to_dict(self):
-        return {
-            'id': self.id,
-            'username': self.username,
-            'nickname': self.nickname,
-            'email': self.email,
-            'phone': self.phone,
-            'avatar': self.avatar,
-            'status': self.status,
-            'user_type': self.user_type,
-            'creation_date': self.creation_date.strftime('%Y-%m-%d %H:%M:%S') if self.creation_date else None,
-            'roles': [{'id': r.id, 'name': r.name, 'role_code': r.role_code} for r in self.roles]
-        }
+        """基本字段之外加上部门名称与角色，列表查询需配合 list_options 预加载"""
+        data = super().to_dict()
+        data['dept_name'] = self.dept.dept_name if self.dept is not None else None
+        data['roles'] = [{'id': r.id, 'name': r.name, 'role_code': r.role_code} for r in self.roles]
+        return data
@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+from app.models import db
+
+
+class ResourceVersion(db.Model):
+    """资源版本号表，资源写入时递增，用于多进程间的缓存一致性判断"""
+    __tablename__ = 'resource_version'
+    __table_args__ = {'mysql_charset': 'utf8', 'extend_existing': True}
+
+    name = db.Column(db.String(64), primary_key=True, comment='资源名称')
+    version = db.Column(db.BigInteger, nullable=False, default=0, comment='版本号')
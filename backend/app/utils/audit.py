@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+"""操作日志
+
+after_request 钩子记录写操作（POST/PUT/PATCH/DELETE）的请求方法、路径、操作人、状态、耗时
+与提交的字段，交给 BatchWriter 异步批量写入 operation_log，请求线程不写库。
+操作人用户名在后台线程中按批一条 IN 查询补齐。登录请求由登录日志记录，这里跳过。
+
+变更摘要（change_data）取自会话 flush 时的属性历史：新增、修改、删除的每一行记下表名、主键
+和变更列的修改前后值，不额外查库。Query.update() 等不经过 ORM 对象的批量语句没有属性历史，
+这类操作只能从请求参数中看出。
+"""
+import json
+import time
+from datetime import datetime
+
+from flask import g, request, has_request_context
+from sqlalchemy import event, inspect
+
+from app.models import db
+from app.models.log import OperationLog
+from app.models.user import User
+from app.utils.batch_writer import BatchWriter
+from app.utils.session_registry import client_ip
+
+MODULES = {
+    'user': '用户管理',
+    'role': '角色管理',
+    'permission': '权限管理',
+    'menu': '菜单管理',
+    'dept': '部门管理',
+    'dict': '字典管理',
+    'log': '日志管理',
+    'auth': '系统认证',
+    'online': '在线用户',
+}
+OPERATIONS = {'POST': '新增', 'PUT': '修改', 'PATCH': '修改', 'DELETE': '删除'}
+# 路径末段为这些动作时覆盖按请求方法得到的操作类型
+ACTIONS = {
+    'import': '导入',
+    'status': '修改状态',
+    'permissions': '分配权限',
+    'reset-password': '重置密码',
+    'password': '修改密码',
+    'profile': '修改资料',
+    'avatar': '修改头像',
+    'logout': '登出',
+    'force-offline': '强制下线',
+    'cleanup': '清理',
+    'clean': '清理',
+}
+SKIP_PATHS = {'/api/v1/system/auth/login'}
+SENSITIVE_FIELDS = {'password', 'old_password', 'new_password', 'confirm_password',
+                    'oldPassword', 'newPassword', 'confirmPassword'}
+MAX_REQUEST_DATA = 2000
+MAX_CHANGE_DATA = 4000
+# 单个值在变更摘要中保留的最大长度
+MAX_CHANGE_VALUE = 200
+# 每次写入都会变化、不需要出现在变更摘要中的列
+IGNORED_COLUMNS = {'updation_date', 'updated_by'}
+# 会话、token 吊销、计数器等随业务操作附带写入的表
+IGNORED_TABLES = {
+    'online_session', 'token_denylist', 'user_token_watermark', 'rate_limit_state', 'resource_version', 'file_stat',
+}
+
+
+def _mask(value):
+    if isinstance(value, dict):
+        return {k: '******' if k in SENSITIVE_FIELDS else _mask(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_mask(v) for v in value]
+    return value
+
+
+def _classify(path: str):
+    """按路径得到 (模块, 操作类型)，如 /api/v1/system/user/3/status -> ('用户管理', '修改状态')"""
+    parts = [p for p in path.split('/') if p and p not in ('api', 'v1', 'system', 'monitor')]
+    module = MODULES.get(parts[0], parts[0]) if parts else ''
+    action = next((ACTIONS[p] for p in reversed(parts[1:]) if p in ACTIONS), None)
+    return module, action or OPERATIONS.get(request.method, request.method)
+
+
+def _change_value(key, value):
+    if value is None or (isinstance(value, (bool, int, float)) and key not in SENSITIVE_FIELDS):
+        return value
+    if key in SENSITIVE_FIELDS:
+        return '******'
+    return str(value)[:MAX_CHANGE_VALUE]
+
+
+def _row_changes(obj, action) -> dict:
+    """一个 ORM 对象本次 flush 的变更：{'table', 'id', 'action', 'changes': {列: [修改前, 修改后]}}
+
+    删除的行记下已加载的列值（修改后为 None）。
+    """
+    state = inspect(obj)
+    changes = {}
+    for attr in state.mapper.column_attrs:
+        key = attr.key
+        if key in IGNORED_COLUMNS:
+            continue
+        if action == 'delete':
+            if state.dict.get(key) is None:
+                continue
+            before, after = state.dict[key], None
+        else:
+            history = state.attrs[key].history
+            if not history.added:
+                continue
+            before = history.deleted[0] if history.deleted else None
+            after = history.added[0]
+            if before == after or (action == 'create' and after is None):
+                continue
+        changes[key] = [_change_value(key, before), _change_value(key, after)]
+    if action != 'delete':
+        # 多对多关联（用户角色、角色权限）记为修改前后的 id 列表
+        for rel in state.mapper.relationships:
+            if rel.secondary is None or rel.lazy == 'dynamic' or rel.key not in state.dict:
+                continue
+            history = state.attrs[rel.key].history
+            if not history.added and not history.deleted:
+                continue
+            unchanged = [o.id for o in history.unchanged]
+            changes[rel.key] = [
+                sorted(unchanged + [o.id for o in history.deleted]),
+                sorted(unchanged + [o.id for o in history.added]),
+            ]
+    # 新增的行此时还没有 identity，主键值已由 INSERT 回填到对象上
+    identity = state.mapper.primary_key_from_instance(obj)
+    return {
+        'table': state.mapper.persist_selectable.name,
+        'id': identity[0] if len(identity) == 1 else identity,
+        'action': action,
+        'changes': changes,
+    }
+
+
+def _after_flush(session, flush_context):
+    """记下本次请求中各 ORM 对象的变更，由 after_request 一并写入操作日志
+
+    同一行在一个请求内多次 flush（自动 flush、先 flush 取 id 再补写等）时合并为一条，
+    每列保留最早的修改前值与最新的修改后值。
+    """
+    if not has_request_context() or request.method not in OPERATIONS:
+        return
+    changes = g.setdefault('audit_changes', {})
+    for action, objects in (('create', session.new), ('update', session.dirty), ('delete', session.deleted)):
+        for obj in objects:
+            if inspect(obj).mapper.persist_selectable.name in IGNORED_TABLES:
+                continue
+            row = _row_changes(obj, action)
+            key = (row['table'], str(row['id']))
+            merged = changes.get(key)
+            if merged is None:
+                if row['changes'] or action != 'update':
+                    changes[key] = row
+                continue
+            if action == 'delete':
+                merged['action'] = 'delete'
+            for column, (before, after) in row['changes'].items():
+                if column in merged['changes']:
+                    merged['changes'][column][1] = after
+                else:
+                    merged['changes'][column] = [None if merged['action'] == 'create' else before, after]
+
+
+def _after_rollback(session):
+    """回滚后已 flush 的变更没有生效，不再记录"""
+    if has_request_context():
+        g.pop('audit_changes', None)
+
+
+def _fill_usernames(rows):
+    ids = {row['user_id'] for row in rows if row['user_id'] is not None}
+    if not ids:
+        return
+    names = dict(db.session.execute(db.select(User.id, User.username).where(User.id.in_(ids))).all())
+    for row in rows:
+        row['username'] = names.get(row['user_id'], '')
+
+
+class AuditLog:
+
+    def __init__(self):
+        self.enabled = True
+        self.writer = BatchWriter(OperationLog.__table__, prepare=_fill_usernames)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('AUDIT_ENABLED', True)
+        self.writer.init_app(
+            app,
+            batch_size=app.config.get('AUDIT_BATCH_SIZE', 500),
+            interval=app.config.get('AUDIT_FLUSH_MS', 200) / 1000,
+            max_queue=app.config.get('AUDIT_QUEUE_SIZE', 10000),
+            overflow=app.config.get('AUDIT_OVERFLOW', 'drop'),
+            sample_every=app.config.get('AUDIT_SAMPLE_EVERY', 10),
+        )
+        if self.enabled:
+            app.before_request(self._before_request)
+            app.after_request(self._after_request)
+            if not event.contains(db.session, 'after_flush', _after_flush):
+                event.listen(db.session, 'after_flush', _after_flush)
+                event.listen(db.session, 'after_rollback', _after_rollback)
+
+    @staticmethod
+    def _before_request():
+        g.audit_start = time.perf_counter()
+
+    def _after_request(self, response):
+        if request.method not in OPERATIONS or request.path in SKIP_PATHS or not request.path.startswith('/api/'):
+            return response
+        start = g.get('audit_start')
+        elapsed = int((time.perf_counter() - start) * 1000) if start else 0
+
+        body = request.get_json(silent=True) if request.is_json else None
+        request_data = None
+        fields = ''
+        if body is not None:
+            if isinstance(body, dict):
+                fields = ', '.join(k for k in body if k not in SENSITIVE_FIELDS)
+            request_data = json.dumps(_mask(body), ensure_ascii=False, default=str)[:MAX_REQUEST_DATA]
+        elif request.args:
+            request_data = json.dumps(request.args.to_dict(flat=False), ensure_ascii=False)[:MAX_REQUEST_DATA]
+
+        change_data = None
+        changes = g.get('audit_changes')
+        if changes:
+            change_data = json.dumps(list(changes.values()), ensure_ascii=False, default=str)[:MAX_CHANGE_DATA]
+
+        module, operation = _classify(request.path)
+        error_msg = None
+        if response.status_code >= 400 and response.is_json:
+            error_msg = str((response.get_json(silent=True) or {}).get('msg', ''))[:500]
+
+        self.writer.put({
+            'user_id': g.get('user_id'),
+            'username': '',
+            'operation': operation,
+            'method': request.method,
+            'module': module,
+            'url': request.path[:255],
+            'ip': client_ip()[:64],
+            'user_agent': request.headers.get('User-Agent', '')[:500],
+            'request_data': request_data,
+            'change_data': change_data,
+            'description': (f'{module}-{operation}' + (f'（{fields}）' if fields else ''))[:255],
+            'status': 1 if response.status_code < 400 else 0,
+            'status_code': response.status_code,
+            'error_msg': error_msg,
+            'execution_time': elapsed,
+            'operation_time': datetime.now(),
+        })
+        return response
+
+    def flush(self):
+        self.writer.flush()
+
+    def stats(self) -> dict:
+        return self.writer.stats()
+
+
+audit_log = AuditLog()
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""后台批量写入
+
+请求线程只把行放进有界队列，后台线程每 interval 秒或攒够 batch_size 行时
+用一条多行 INSERT 写入。队列积压时按 overflow 策略处理：
+drop 直接丢弃放不下的行；sample 在队列过半后每 sample_every 行只保留一行，队列满时仍然丢弃。
+丢弃与抽样跳过的行数都计入 stats()。进程退出时写完队列中剩余的行。
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+
+from app.models import db
+
+logger = logging.getLogger(__name__)
+
+# 关闭时放入队列，唤醒正在等待的后台线程
+_STOP = object()
+
+
+class BatchWriter:
+
+    def __init__(self, table, prepare=None, router=None, after_write=None, on_error=None, batch_size=500,
+                 interval=0.2, max_queue=10000, overflow='drop', sample_every=10):
+        self.table = table
+        # prepare(rows) 在后台线程中、写入前对整批行做补充（例如用一条 IN 查询补齐关联字段）
+        self.prepare = prepare
+        # router(row) 返回该行写入的表（按时间分表时使用），未提供时全部写入 table；
+        # 返回 None 的行不插入，只交给 after_write 处理（例如对已写入的行做回填）
+        self.router = router
+        # after_write(conn, rows) 与写入在同一事务中执行（例如累加汇总表）
+        self.after_write = after_write
+        # on_error(exc) 在写入失败后调用，返回 True 时整批重试一次（例如分表被其它进程删除后重建）
+        self.on_error = on_error
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_queue = max_queue
+        self.overflow = overflow
+        self.sample_every = sample_every
+        self._app = None
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._seen = 0
+        self._counters = dict.fromkeys(('enqueued', 'written', 'dropped', 'sampled', 'failed', 'batches'), 0)
+        atexit.register(self.close)
+
+    def init_app(self, app, **options):
+        for key, value in options.items():
+            setattr(self, key, value)
+        self._app = app
+
+    def _ensure_thread(self):
+        # 后台线程按 pid 懒启动，fork 出的 worker 进程各自启动自己的线程
+        if self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread.is_alive():
+                return
+            if self._pid != os.getpid():
+                self._queue = queue.Queue(self.max_queue)
+                self._pid = os.getpid()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name=f'batch-writer-{self.table.name}', daemon=True)
+            self._thread.start()
+
+    def put(self, row: dict) -> bool:
+        """放入一行，被丢弃或抽样跳过时返回 False"""
+        self._ensure_thread()
+        if self.overflow == 'sample' and self._queue.qsize() >= self.max_queue // 2:
+            self._seen += 1
+            if self._seen % self.sample_every:
+                self._counters['sampled'] += 1
+                return False
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            self._counters['dropped'] += 1
+            return False
+        self._counters['enqueued'] += 1
+        return True
+
+    def _collect(self) -> list:
+        batch = []
+        deadline = time.monotonic() + self.interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                row = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if row is _STOP:
+                break
+            batch.append(row)
+        return batch
+
+    def _run(self):
+        while not (self._stop.is_set() and self._queue.empty()):
+            batch = self._collect()
+            if batch:
+                self._write(batch)
+
+    def _write(self, batch: list, retry=True):
+        try:
+            with self._app.app_context():
+                if self.prepare is not None:
+                    self.prepare(batch)
+                groups = {}
+                for row in batch:
+                    groups.setdefault(self.table if self.router is None else self.router(row), []).append(row)
+                groups.pop(None, None)
+                with db.engine.begin() as conn:
+                    for table, rows in groups.items():
+                        conn.execute(table.insert().values(rows))
+                    if self.after_write is not None:
+                        self.after_write(conn, batch)
+        except Exception as e:
+            if retry and self.on_error is not None and self.on_error(e):
+                logger.warning('%s 批量写入失败，重试一次：%s', self.table.name, e)
+                return self._write(batch, retry=False)
+            self._counters['failed'] += len(batch)
+            logger.exception('%s 批量写入失败，丢弃 %d 行', self.table.name, len(batch))
+            return
+        self._counters['written'] += len(batch)
+        self._counters['batches'] += 1
+
+    def flush(self):
+        """在当前线程写完队列中已有的行"""
+        if self._queue is None or self._pid != os.getpid():
+            return
+        while True:
+            batch = []
+            try:
+                while len(batch) < self.batch_size:
+                    row = self._queue.get_nowait()
+                    if row is not _STOP:
+                        batch.append(row)
+            except queue.Empty:
+                pass
+            if not batch:
+                return
+            self._write(batch)
+
+    def close(self, timeout=5):
+        """停止后台线程，写完剩余的行"""
+        if self._thread is None or self._pid != os.getpid():
+            return
+        self._stop.set()
+        try:
+            self._queue.put_nowait(_STOP)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+        self.flush()
+
+    def stats(self) -> dict:
+        return {**self._counters, 'queued': self._queue.qsize() if self._queue is not None else 0}
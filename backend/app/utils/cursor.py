@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+import base64
+import json
+
+
+class InvalidCursor(ValueError):
+    """游标无法解析"""
+
+
+def encode_cursor(direction: str, key) -> str:
+    """把翻页方向（next/prev）和定位键编码为不透明的游标字符串"""
+    raw = json.dumps([direction, key], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str):
+    """解析游标，返回 (direction, key)；空游标表示第一页，返回 ('next', None)"""
+    if not cursor:
+        return 'next', None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        direction, key = json.loads(raw)
+    except (ValueError, TypeError):
+        raise InvalidCursor(cursor)
+    if direction not in ('next', 'prev'):
+        raise InvalidCursor(cursor)
+    return direction, key
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""数据库连接池
+
+连接池参数来自配置（DB_POOL_*），create_app 在 db.init_app 之前写入 SQLALCHEMY_ENGINE_OPTIONS：
+- pre_ping 取连接时先 ping，MySQL wait_timeout 断开的连接自动重连，不会让请求报错
+- recycle 连接使用超过这么多秒后重建，应小于 MySQL wait_timeout 与中间代理的空闲超时
+- LIFO 优先复用最近归还的连接，空闲连接集中在池尾，低峰期更快超时回收
+- DB_POOL_SIZE 为 0 时按 worker 模型计算：每个进程同时处理的请求数，加上后台批量写入线程占用的连接
+
+取连接的等待时间（含新建连接）记录到 db_pool_checkout_seconds，取连接超时计入 db_pool_timeouts_total，
+池大小、已借出连接数、饱和度由 /metrics 抓取时读取。
+启动时（gunicorn preload 模式下为每个 worker fork 之后）预先建立 pool_size 个连接，首批请求不必等待建连。
+SQLite 仅用于开发与压测，保持 Flask-SQLAlchemy 的默认连接池。
+"""
+import logging
+import os
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+from app.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# 后台线程（操作日志、登录日志批量写入）各占一个连接
+BACKGROUND_CONNECTIONS = 2
+
+
+class InstrumentedQueuePool(QueuePool):
+    """记录取连接耗时与超时次数的 QueuePool"""
+
+    def __init__(self, creator, pool_size=5, max_overflow=10, **kw):
+        super().__init__(creator, pool_size=pool_size, max_overflow=max_overflow, **kw)
+        # 饱和度按 pool_size + max_overflow 计算，QueuePool 只在私有属性中保存该值
+        self.max_overflow = max_overflow
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            metrics.inc('db_pool_timeouts_total')
+            raise
+        finally:
+            metrics.observe('db_pool_checkout_seconds', time.perf_counter() - start)
+
+
+def auto_pool_size() -> int:
+    """按 gunicorn worker 模型估算每个进程需要的连接数
+
+    worker 模型与线程数由 gunicorn.conf.py 写回环境变量，未设置时的默认值与其一致（gthread，4 线程）。
+    """
+    worker_class = os.getenv('SERVER_WORKER_CLASS', 'gthread')
+    if worker_class == 'sync':
+        concurrency = 1
+    elif worker_class in ('gevent', 'asgi'):
+        # 协程数可达上千，连接数不随之增长，超出部分在池上排队
+        concurrency = 10
+    else:
+        concurrency = int(os.getenv('SERVER_THREADS', 4))
+    return concurrency + BACKGROUND_CONNECTIONS
+
+
+def engine_options(config) -> dict:
+    """根据配置生成 SQLALCHEMY_ENGINE_OPTIONS"""
+    if make_url(config['SQLALCHEMY_DATABASE_URI']).get_backend_name() == 'sqlite':
+        return {}
+    return {
+        'poolclass': InstrumentedQueuePool,
+        'pool_size': config['DB_POOL_SIZE'] or auto_pool_size(),
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': config['DB_POOL_PRE_PING'],
+        'pool_use_lifo': config['DB_POOL_USE_LIFO'],
+    }
+
+
+def pool_stats(engine) -> dict:
+    pool = engine.pool
+    if not isinstance(pool, InstrumentedQueuePool):
+        return {}
+    size, checked_out = pool.size(), pool.checkedout()
+    capacity = size + max(pool.max_overflow, 0)
+    return {
+        'size': size,
+        'checked_out': checked_out,
+        'idle': pool.checkedin(),
+        'overflow': max(pool.overflow(), 0),
+        'saturation': round(checked_out / capacity, 4) if capacity else 0,
+    }
+
+
+def warmup(app) -> int:
+    """预先建立 pool_size 个连接并归还到池中，返回建立的连接数"""
+    if not app.config.get('DB_POOL_WARMUP', True):
+        return 0
+    from app.models import db
+    with app.app_context():
+        pool = db.engine.pool
+        if not isinstance(pool, QueuePool):
+            return 0
+        connections = []
+        try:
+            for _ in range(pool.size()):
+                connections.append(db.engine.connect())
+        except exc.DBAPIError:
+            # 数据库暂时不可用时不阻止启动，之后的请求按需建连
+            logger.warning('连接池预热失败，已建立 %d 个连接', len(connections), exc_info=True)
+        finally:
+            for conn in connections:
+                conn.close()
+    return len(connections)
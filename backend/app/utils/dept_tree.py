@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""部门树（物化路径）
+
+每个部门的 path 记录从根到自身的 id 序列（/1/5/12/）：
+- 子树：path LIKE '/1/5/%'，前缀匹配走 path 索引，一条查询取出任意深度的全部下级
+- 祖先：直接解析 path，不查库
+- 移动：一条 UPDATE 把子树所有 path 的旧前缀替换为新前缀
+数据权限（"本部门及以下"）用 subtree_ids_select 作为子查询拼进列表查询。
+"""
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.models import db
+from app.models.dept import Dept
+
+
+def child_path(parent, dept_id) -> str:
+    """parent 为 None 表示顶级部门"""
+    return f'{parent.path if parent is not None else "/"}{dept_id}/'
+
+
+def subtree_ids_select(path: str, include_self=True):
+    """path 对应部门的子树 id 查询（Select），可直接用于 in_()"""
+    statement = db.select(Dept.id).where(Dept.path.like(f'{path}%'), Dept.enabled_flag == True)
+    if not include_self:
+        statement = statement.where(Dept.path != path)
+    return statement
+
+
+def dept_path(dept_id):
+    """部门的 path，部门不存在时返回 None"""
+    return db.session.execute(
+        db.select(Dept.path).where(Dept.id == dept_id, Dept.enabled_flag == True)
+    ).scalar()
+
+
+def is_in_subtree(path: str, dept) -> bool:
+    """dept 是否为 path 对应部门自身或其下级"""
+    return dept.path.startswith(path)
+
+
+def move(dept, parent) -> int:
+    """把 dept 连同整棵子树移到 parent 下（parent 为 None 表示移到顶级），返回更新的部门数
+
+    调用方负责检查 parent 不在 dept 的子树中，并提交事务。
+    """
+    old_prefix = dept.path
+    new_prefix = child_path(parent, dept.id)
+    dept.parent_id = parent.id if parent is not None else 0
+    if new_prefix == old_prefix:
+        return 0
+    # 子树（含自身）的 path 批量改写：新前缀 + 去掉旧前缀后的剩余部分
+    updated = db.session.execute(
+        db.update(Dept)
+        .where(Dept.path.like(f'{old_prefix}%'))
+        .values(path=db.literal(new_prefix) + db.func.substr(Dept.path, len(old_prefix) + 1))
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    # 自身的 path 已由上面的 UPDATE 写入，只同步到对象上，不再单独更新
+    set_committed_value(dept, 'path', new_prefix)
+    return updated
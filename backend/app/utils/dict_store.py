@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""数据字典快照
+
+前端启动时一次性加载全部字典（stores/lookup.ts），字典又极少修改，因此按字典版本号
+（resource_version 中的 dict，写操作在同一事务内递增，多 worker 间一致）整体缓存一份快照：
+- 全部字典类型及其数据预先编码为完整的响应体 bytes，并预先 gzip 压缩，
+  加载全部字典的请求只需把 bytes 交给 WSGI 服务器，不再查库、不再编码
+- dict_type -> 字典数据列表 的索引，按类型取数据为一次字典查找
+每次请求只读一次版本号（HTTP_CACHE_VERSION_TTL 大于 0 时在进程内缓存版本号）。
+"""
+import gzip
+import threading
+
+from flask import current_app, request
+
+from app.models import db
+from app.models.dictionary import DictType, DictData
+from app.utils.http_cache import get_version
+
+GZIP_LEVEL = 6
+
+
+class DictSnapshot:
+    __slots__ = ('version', 'types', 'data', 'by_type', 'body', 'body_gzip')
+
+    def __init__(self, version, types, data):
+        self.version = version
+        self.types = types
+        self.data = data
+        self.by_type = {}
+        for item in data:
+            self.by_type.setdefault(item['dict_type'], []).append(item)
+        payload = [dict(t, dict_data=self.by_type.get(t['dict_type'], [])) for t in types]
+        self.body = current_app.json.dumps({'code': 200, 'msg': 'ok', 'data': payload}).encode('utf-8')
+        self.body_gzip = gzip.compress(self.body, GZIP_LEVEL)
+
+
+class DictStore:
+
+    def __init__(self):
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    def snapshot(self) -> DictSnapshot:
+        version = get_version('dict')
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == version:
+            return snapshot
+        with self._lock:
+            # 并发请求只重建一次
+            snapshot = self._snapshot
+            if snapshot is None or snapshot.version != version:
+                snapshot = self._snapshot = self._build(version)
+        return snapshot
+
+    @staticmethod
+    def _build(version) -> DictSnapshot:
+        types = db.session.execute(
+            db.select(*DictType.serialize_columns())
+            .where(DictType.enabled_flag == True)
+            .order_by(DictType.id)
+        ).all()
+        data = db.session.execute(
+            db.select(*DictData.serialize_columns())
+            .where(DictData.enabled_flag == True)
+            .order_by(DictData.dict_type, DictData.dict_sort, DictData.id)
+        ).all()
+        return DictSnapshot(version, DictType.rows_to_dicts(types), DictData.rows_to_dicts(data))
+
+    def response(self):
+        """全部字典（类型及其数据）的响应，客户端支持时直接返回预先压缩的内容"""
+        snapshot = self.snapshot()
+        if 'gzip' in request.accept_encodings:
+            response = current_app.response_class(snapshot.body_gzip, mimetype='application/json')
+            response.headers['Content-Encoding'] = 'gzip'
+        else:
+            response = current_app.response_class(snapshot.body, mimetype='application/json')
+        response.vary.add('Accept-Encoding')
+        return response
+
+    def data_by_type(self, dict_type) -> list:
+        return self.snapshot().by_type.get(dict_type, [])
+
+    def invalidate(self):
+        """字典写入后调用（版本号已在事务中递增），丢弃本进程的快照"""
+        self._snapshot = None
+
+
+dict_store = DictStore()
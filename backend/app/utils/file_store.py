@@ -0,0 +1,370 @@
+# -*- coding: utf-8 -*-
+"""文件存储
+
+上传全程流式处理，请求体不会整体读入内存：
+- 普通上传：自行解析 multipart，文件部分边解析边写入存储目录下的临时文件，同时累计 sha256 与大小
+  （Flask 默认的解析会先写入 SpooledTemporaryFile，保存时再复制一遍）
+- 分片上传：每个分片是一个独立请求，请求体按块写入分片文件，分片可并发、乱序、重传，
+  会话状态全部在 .tmp/<upload_id>/ 目录下，多 worker 共享；全部到齐后顺序拼接并计算 sha256
+文件内容按 sha256 存放在 objects/ab/cd/<sha256>，内容相同的文件只存一份（用 os.link 原子地落盘，
+并发上传相同内容时只有一个成功创建）。删除文件为逻辑删除，存储的内容保留。
+
+统计计数器（FileStat）与文件记录在同一事务内增减，统计接口只读几行计数器。
+"""
+import hashlib
+import json
+import os
+import re
+import secrets
+import shutil
+import time
+import uuid
+
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.formparser import FormDataParser
+
+from app.models import db
+from app.models.file import FileStat
+from app.utils.upsert import upsert_increment
+
+# 流式复制的块大小
+BUFFER_SIZE = 1024 * 1024
+# 秒传时要求客户端给出哈希的字节区间长度（区间起点由服务端随机选取）
+PROOF_LENGTH = 64 * 1024
+TMP_DIR = '.tmp'
+OBJECTS_DIR = 'objects'
+
+FILE_TYPES = {
+    'image': ('jpg', 'jpeg', 'png', 'gif', 'bmp', 'webp', 'svg', 'ico'),
+    'document': ('pdf', 'doc', 'docx', 'xls', 'xlsx', 'ppt', 'pptx'),
+    'text': ('txt', 'md', 'csv', 'json', 'xml', 'log'),
+    'archive': ('zip', 'rar', '7z', 'tar', 'gz', 'bz2', 'xz'),
+    'video': ('mp4', 'avi', 'mov', 'wmv', 'flv', 'mkv', 'webm'),
+    'audio': ('mp3', 'wav', 'flac', 'aac', 'ogg', 'm4a'),
+}
+_EXT_TYPES = {ext: name for name, exts in FILE_TYPES.items() for ext in exts}
+_UPLOAD_ID = re.compile(r'^[0-9a-f]{32}$')
+
+
+def file_ext(name: str) -> str:
+    return name.rsplit('.', 1)[1].lower() if '.' in name else ''
+
+
+def file_type(ext: str) -> str:
+    return _EXT_TYPES.get(ext, 'other')
+
+
+def format_size(size) -> str:
+    size = float(size or 0)
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024:
+            return f'{size:.0f} {unit}' if unit == 'B' else f'{size:.2f} {unit}'
+        size /= 1024
+    return f'{size:.2f} TB'
+
+
+class UploadError(Exception):
+    """上传内容不合法（扩展名、大小、分片序号等），message 直接返回给前端"""
+
+
+class HashingWriter:
+    """写入临时文件的同时计算 sha256 与大小，超过 max_size 时抛出 RequestEntityTooLarge"""
+
+    def __init__(self, path, max_size):
+        self.path = path
+        self.max_size = max_size
+        self.size = 0
+        self._hash = hashlib.sha256()
+        self._file = open(path, 'wb')
+
+    def write(self, data):
+        self.size += len(data)
+        if self.size > self.max_size:
+            raise RequestEntityTooLarge()
+        self._hash.update(data)
+        return self._file.write(data)
+
+    def seek(self, *args):
+        # multipart 解析完一个文件后会 seek(0)，内容不再读回，这里只需完成写入
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+    def discard(self):
+        self._file.close()
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+    @property
+    def sha256(self) -> str:
+        return self._hash.hexdigest()
+
+
+class RejectedWriter:
+    """扩展名不允许的文件：丢弃内容，只记录原因"""
+
+    def __init__(self, error):
+        self.error = error
+
+    def write(self, data):
+        return len(data)
+
+    def seek(self, *args):
+        pass
+
+    def close(self):
+        pass
+
+    def discard(self):
+        pass
+
+
+class FileStore:
+
+    def __init__(self):
+        self.root = None
+        self.max_size = 0
+        self.chunk_size = 0
+        self.upload_expire = 0
+        self.allowed = frozenset()
+
+    def init_app(self, app):
+        self.root = app.config['FILE_UPLOAD_DIR']
+        self.max_size = app.config['FILE_MAX_SIZE']
+        self.chunk_size = app.config['FILE_CHUNK_SIZE']
+        self.upload_expire = app.config['FILE_UPLOAD_EXPIRE']
+        self.allowed = frozenset(
+            ext.strip().lower().lstrip('.') for ext in app.config['FILE_ALLOWED_EXTENSIONS'].split(',') if ext.strip()
+        )
+        os.makedirs(os.path.join(self.root, TMP_DIR), exist_ok=True)
+        os.makedirs(os.path.join(self.root, OBJECTS_DIR), exist_ok=True)
+
+    def check(self, file_name, file_size=None):
+        """返回错误信息，合法时返回 None"""
+        ext = file_ext(file_name or '')
+        if not file_name:
+            return '文件名不能为空'
+        if ext not in self.allowed:
+            return f'不支持的文件类型：.{ext}' if ext else '不支持没有扩展名的文件'
+        if file_size is not None and (file_size < 0 or file_size > self.max_size):
+            return f'文件大小不能超过 {format_size(self.max_size)}'
+        return None
+
+    def _tmp_file(self) -> str:
+        return os.path.join(self.root, TMP_DIR, uuid.uuid4().hex)
+
+    def abs_path(self, rel_path) -> str:
+        return os.path.join(self.root, rel_path)
+
+    # ---- 普通上传 ----
+
+    def parse_multipart(self, request):
+        """流式解析 multipart 请求体，返回 (表单字段, [(字段名, 文件名, writer)])
+
+        writer 为 HashingWriter（已写完并关闭）或 RejectedWriter；解析失败时已写入的临时文件全部删除。
+        """
+        writers = []
+
+        def stream_factory(total_content_length, content_type, filename, content_length=None):
+            error = self.check(filename)
+            writer = RejectedWriter(error) if error else HashingWriter(self._tmp_file(), self.max_size)
+            writers.append(writer)
+            return writer
+
+        parser = FormDataParser(stream_factory=stream_factory, max_form_memory_size=1024 * 1024, silent=False)
+        try:
+            _, form, files = parser.parse(
+                request.stream, request.mimetype, request.content_length, request.mimetype_params
+            )
+        except Exception:
+            for writer in writers:
+                writer.discard()
+            raise
+        for writer in writers:
+            writer.close()
+        return form, [(name, storage.filename, storage.stream) for name, storage in files.items(multi=True)]
+
+    def save(self, writer) -> tuple:
+        """把写完的临时文件放入内容寻址存储，返回 (相对路径, 是否新存入)"""
+        sha256 = writer.sha256
+        rel_path = os.path.join(OBJECTS_DIR, sha256[:2], sha256[2:4], sha256)
+        path = self.abs_path(rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            os.link(writer.path, path)
+            created = True
+        except FileExistsError:
+            created = False
+        finally:
+            os.unlink(writer.path)
+        return rel_path.replace(os.sep, '/'), created
+
+    def find(self, sha256):
+        """已存储的内容的相对路径，不存在时返回 None"""
+        if not re.fullmatch(r'[0-9a-f]{64}', sha256 or ''):
+            return None
+        rel_path = '/'.join((OBJECTS_DIR, sha256[:2], sha256[2:4], sha256))
+        return rel_path if os.path.isfile(self.abs_path(rel_path)) else None
+
+    def size(self, rel_path) -> int:
+        return os.path.getsize(self.abs_path(rel_path))
+
+    def proof_range(self, rel_path) -> tuple:
+        """秒传校验区间 (起点, 长度)：只知道 sha256、没有文件内容的客户端无法算出该区间的哈希"""
+        size = self.size(rel_path)
+        length = min(PROOF_LENGTH, size)
+        return secrets.randbelow(size - length + 1), length
+
+    def range_sha256(self, rel_path, offset, length) -> str:
+        digest = hashlib.sha256()
+        with open(self.abs_path(rel_path), 'rb') as f:
+            f.seek(offset)
+            while length > 0:
+                block = f.read(min(BUFFER_SIZE, length))
+                if not block:
+                    break
+                digest.update(block)
+                length -= len(block)
+        return digest.hexdigest()
+
+    # ---- 分片上传 ----
+
+    def _upload_dir(self, upload_id) -> str:
+        return os.path.join(self.root, TMP_DIR, upload_id)
+
+    def create_upload(self, user_id, file_name, file_size, **extra) -> dict:
+        self.sweep_expired()
+        upload_id = uuid.uuid4().hex
+        meta = dict(
+            extra,
+            upload_id=upload_id,
+            user_id=user_id,
+            file_name=file_name,
+            file_size=file_size,
+            chunk_size=self.chunk_size,
+            chunk_count=max((file_size + self.chunk_size - 1) // self.chunk_size, 1),
+            created=time.time(),
+        )
+        os.makedirs(self._upload_dir(upload_id))
+        with open(os.path.join(self._upload_dir(upload_id), 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        return meta
+
+    def load_upload(self, upload_id):
+        if not _UPLOAD_ID.match(upload_id):
+            return None
+        try:
+            with open(os.path.join(self._upload_dir(upload_id), 'meta.json'), encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def received_chunks(self, meta) -> list:
+        names = os.listdir(self._upload_dir(meta['upload_id']))
+        return sorted(int(n[:-5]) for n in names if n.endswith('.part') and n[:-5].isdigit())
+
+    def _chunk_length(self, meta, index) -> int:
+        return min(meta['chunk_size'], meta['file_size'] - index * meta['chunk_size'])
+
+    def write_chunk(self, meta, index, stream) -> int:
+        """把请求体流式写入第 index 个分片，同一分片重传时覆盖；写完整后才以原子重命名生效"""
+        if not 0 <= index < meta['chunk_count']:
+            raise UploadError('分片序号错误')
+        expected = self._chunk_length(meta, index)
+        directory = self._upload_dir(meta['upload_id'])
+        tmp_path = os.path.join(directory, f'{index}.{uuid.uuid4().hex}')
+        size = 0
+        try:
+            with open(tmp_path, 'wb') as f:
+                while True:
+                    block = stream.read(BUFFER_SIZE)
+                    if not block:
+                        break
+                    size += len(block)
+                    if size > expected:
+                        raise UploadError(f'分片大小应为 {expected} 字节')
+                    f.write(block)
+            if size != expected:
+                raise UploadError(f'分片大小应为 {expected} 字节')
+            os.replace(tmp_path, os.path.join(directory, f'{index}.part'))
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+        return size
+
+    def assemble(self, meta) -> HashingWriter:
+        """按序拼接全部分片并计算 sha256，返回待 save 的 writer"""
+        missing = set(range(meta['chunk_count'])) - set(self.received_chunks(meta))
+        if missing:
+            raise UploadError(f'还有 {len(missing)} 个分片未上传')
+        directory = self._upload_dir(meta['upload_id'])
+        writer = HashingWriter(self._tmp_file(), meta['file_size'])
+        try:
+            for index in range(meta['chunk_count']):
+                with open(os.path.join(directory, f'{index}.part'), 'rb') as f:
+                    while True:
+                        block = f.read(BUFFER_SIZE)
+                        if not block:
+                            break
+                        writer.write(block)
+        except BaseException:
+            writer.discard()
+            raise
+        writer.close()
+        return writer
+
+    def remove_upload(self, upload_id):
+        shutil.rmtree(self._upload_dir(upload_id), ignore_errors=True)
+
+    def sweep_expired(self):
+        """清理超过 FILE_UPLOAD_EXPIRE 秒未完成的分片上传和残留的临时文件"""
+        deadline = time.time() - self.upload_expire
+        tmp_root = os.path.join(self.root, TMP_DIR)
+        for entry in os.scandir(tmp_root):
+            try:
+                if entry.stat().st_mtime >= deadline:
+                    continue
+                if entry.is_dir():
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                else:
+                    os.unlink(entry.path)
+            except FileNotFoundError:
+                pass
+
+
+def bump_stat(name, count=0, size=0):
+    """增减统计计数器，需在写操作所在事务提交前调用"""
+    upsert_increment(FileStat.__table__, {'name': name}, {'file_count': count, 'total_size': size})
+
+
+def stats_summary() -> dict:
+    stats = {s.name: s for s in db.session.execute(db.select(FileStat)).scalars()}
+    by_type = [
+        {'file_type': name[5:], 'file_count': s.file_count, 'total_size': s.total_size,
+         'formatted_size': format_size(s.total_size)}
+        for name, s in sorted(stats.items()) if name.startswith('type:') and s.file_count > 0
+    ]
+    total_files = sum(t['file_count'] for t in by_type)
+    total_size = sum(t['total_size'] for t in by_type)
+    storage = stats.get('storage')
+    storage_size = storage.total_size if storage else 0
+    downloads = stats.get('downloads')
+    return {
+        'total_files': total_files,
+        'total_size': total_size,
+        'formatted_size': format_size(total_size),
+        'storage_files': storage.file_count if storage else 0,
+        'storage_size': storage_size,
+        'saved_size': max(total_size - storage_size, 0),
+        'download_count': downloads.file_count if downloads else 0,
+        'by_type': by_type,
+    }
+
+
+file_store = FileStore()
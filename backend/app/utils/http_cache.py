@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""条件 GET（ETag / If-None-Match）
+
+ETag 由资源版本号（resource_version 表）生成，而不是对响应体做哈希：
+请求进来先读版本号，与 If-None-Match 相同则直接返回 304，不执行视图里的查询。
+写接口在提交事务前调用 bump_version，使版本号与数据在同一事务内生效。
+"""
+import hashlib
+import time
+from functools import wraps
+
+from flask import request, g, make_response, current_app, has_request_context
+
+from app.models import db
+from app.models.version import ResourceVersion
+from app.utils.upsert import upsert_increment
+
+# 进程内版本号缓存：name -> (读取时间, 版本号)，HTTP_CACHE_VERSION_TTL 为 0 时每次读库
+_versions = {}
+
+
+def get_version(name: str, ttl: float = None) -> int:
+    """资源版本号；ttl 为进程内缓存秒数，缺省取 HTTP_CACHE_VERSION_TTL"""
+    # 同一请求内只读一次（ETag 与视图里的进程内缓存都要用版本号）
+    request_versions = g.setdefault('_resource_versions', {}) if has_request_context() else {}
+    if name in request_versions:
+        return request_versions[name]
+    if ttl is None:
+        ttl = current_app.config.get('HTTP_CACHE_VERSION_TTL', 0)
+    if ttl > 0:
+        cached = _versions.get(name)
+        if cached and time.monotonic() - cached[0] < ttl:
+            request_versions[name] = cached[1]
+            return cached[1]
+    version = db.session.execute(
+        db.select(ResourceVersion.version).where(ResourceVersion.name == name)
+    ).scalar() or 0
+    if ttl > 0:
+        _versions[name] = (time.monotonic(), version)
+    request_versions[name] = version
+    return version
+
+
+def bump_version(*names):
+    """递增资源版本号，需在写操作所在事务提交前调用"""
+    for name in names:
+        # 首次写入某资源时并发的两个事务都会插入，用 upsert 避免主键冲突
+        upsert_increment(ResourceVersion.__table__, {'name': name}, {'version': 1})
+        _versions.pop(name, None)
+        if has_request_context():
+            g.setdefault('_resource_versions', {}).pop(name, None)
+
+
+def conditional(*resources, cache_control='private, no-cache', per_user=False):
+    """为只读接口加上 ETag 与 Cache-Control，需放在 @login_required 之后
+
+    :param resources: 响应所依赖的资源名称，任一资源版本变化都会改变 ETag
+    :param cache_control: Cache-Control 响应头，默认要求客户端每次携带 ETag 重新验证
+    :param per_user: 响应内容因用户而异时为 True，ETag 中包含用户 id
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            etag = '-'.join(f'{name}.{get_version(name)}' for name in resources)
+            if per_user:
+                etag += f'-u{g.user_id}'
+            if request.query_string:
+                etag += '-' + hashlib.blake2b(request.query_string, digest_size=6).hexdigest()
+
+            # 接口返回 gzip 编码的响应体时 ETag 加 -gz 后缀，与未压缩的响应体区分
+            gzip_etag = etag + '-gz'
+            if 'gzip' in request.accept_encodings and request.if_none_match.contains(gzip_etag):
+                response = current_app.response_class(status=304)
+                response.vary.add('Accept-Encoding')
+                etag = gzip_etag
+            elif request.if_none_match.contains(etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                if response.content_encoding == 'gzip':
+                    etag = gzip_etag
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = cache_control
+            response.vary.add('Authorization')
+            return response
+        return decorated
+    return decorator
@@ -1,16 +1,51 @@
 # -*- coding: utf-8 -*-
+import hashlib
+import time
+import uuid
 import jwt
 from datetime import datetime, timedelta
 from functools import wraps
 from flask import request, current_app, g
+from app.utils.cache import LRUCache
 from app.utils.response import fail
 
+# 已验证 token 缓存：键为 token 摘要，值为 payload，条目在 token 的 exp 时过期
+token_cache = LRUCache(maxsize=4096)
+
+# 吊销检查函数列表，签名为 fn(payload) -> bool，返回 True 表示 token 已失效
+_revocation_checks = []
+
+# 活动钩子列表，签名为 fn(payload)，每个通过认证的请求调用一次
+_activity_hooks = []
+
+
+def init_token_cache(app):
+    """按配置设置已验证 token 缓存，JWT_CACHE_SIZE 为 0 时关闭缓存"""
+    token_cache.maxsize = app.config.get('JWT_CACHE_SIZE', token_cache.maxsize)
+    token_cache.clear()
+
+
+def register_revocation_check(fn):
+    """注册吊销检查，缓存命中的 token 同样会经过检查"""
+    if fn not in _revocation_checks:
+        _revocation_checks.append(fn)
+    return fn
+
+
+def register_activity_hook(fn):
+    """注册活动钩子，钩子应只做内存操作，不要在其中同步写库"""
+    if fn not in _activity_hooks:
+        _activity_hooks.append(fn)
+    return fn
+
 
 def generate_token(user_id: int) -> str:
     """生成 JWT token"""
     payload = {
         'sub': user_id,
-        'iat': datetime.utcnow(),
+        'jti': uuid.uuid4().hex,
+        # 使用带小数的时间戳，按用户吊销时可以精确区分吊销前后签发的 token
+        'iat': time.time(),
         'exp': datetime.utcnow() + timedelta(hours=current_app.config['JWT_EXPIRE_HOURS'])
     }
     return jwt.encode(payload, current_app.config['JWT_SECRET_KEY'], algorithm='HS256')
@@ -21,6 +56,34 @@ def verify_token(token: str) -> dict:
     return jwt.decode(token, current_app.config['JWT_SECRET_KEY'], algorithms=['HS256'])
 
 
+def _token_key(token: str) -> bytes:
+    return hashlib.blake2b(token.encode('utf-8'), digest_size=16).digest()
+
+
+def verify_token_cached(token: str) -> dict:
+    """带缓存的 token 验证，命中时在 exp 之前跳过签名与声明校验"""
+    if token_cache.maxsize <= 0:
+        return verify_token(token)
+
+    key = _token_key(token)
+    payload = token_cache.get(key)
+    if payload is None:
+        payload = verify_token(token)
+        ttl = payload['exp'] - time.time()
+        if ttl > 0:
+            token_cache.set(key, payload, ttl)
+    return payload
+
+
+def evict_token(token: str):
+    """从缓存中移除 token"""
+    token_cache.pop(_token_key(token))
+
+
+def is_token_revoked(payload: dict) -> bool:
+    return any(check(payload) for check in _revocation_checks)
+
+
 def login_required(f):
     """登录验证装饰器"""
     @wraps(f)
@@ -30,11 +93,17 @@ def login_required(f):
             return fail('未提供认证 token', 401)
         token = auth_header[7:]
         try:
-            payload = verify_token(token)
-            g.user_id = payload['sub']
+            payload = verify_token_cached(token)
         except jwt.ExpiredSignatureError:
             return fail('token 已过期，请重新登录', 401)
         except jwt.InvalidTokenError:
             return fail('token 无效', 401)
+        if _revocation_checks and is_token_revoked(payload):
+            evict_token(token)
+            return fail('token 已失效，请重新登录', 401)
+        g.user_id = payload['sub']
+        g.token_payload = payload
+        for hook in _activity_hooks:
+            hook(payload)
         return f(*args, **kwargs)
     return decorated
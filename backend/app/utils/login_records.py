@@ -0,0 +1,375 @@
+# -*- coding: utf-8 -*-
+"""登录日志
+
+登录成功与失败都经 BatchWriter 异步写入按月（或按天）分表的 login_record_YYYYMM(DD)，
+同一事务中把这一批按 (整点, 用户名, IP) 聚合后累加到 login_rollup。
+统计图表只读汇总表；清理旧日志按整张分表 DROP TABLE，不做大范围 DELETE。
+正在写入的当前分表不会被删除（清空全部时对它执行 DELETE），其它 worker 缓存的表对象始终有效；
+写入失败时丢弃本进程的分表缓存，按 checkfirst 重新建表后重试一次。
+
+登出同样作为一条事件进入队列，在写入线程中与之前排队的登录行同一事务内回填退出时间，
+不会漏掉尚未写入的登录行。已存在的分表列表缓存在进程内，本进程建表、删表时更新，
+其它 worker 建的新分表在 PARTITIONS_TTL 秒内可见。
+
+分表各自自增 id，对外的日志 id 编码为 分表后缀 * ID_FACTOR + 分表内 id：
+按月 202610 -> 2026100000000001 起，按天 20261017 -> 202610170000001 起，都在前端数字精度内且互不重叠。
+"""
+import re
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+from flask import request
+
+from app.models import db
+from app.models.log import LoginRollup
+from app.utils.batch_writer import BatchWriter
+from app.utils.session_registry import client_ip, ip_location, parse_user_agent
+
+PREFIX = 'login_record_'
+FORMATS = {'month': '%Y%m', 'day': '%Y%m%d'}
+ID_FACTOR = {6: 10 ** 10, 8: 10 ** 7}
+# 分表列表在进程内缓存的秒数
+PARTITIONS_TTL = 60
+# 登出事件行的标记键，这类行不插入分表
+LOGOUT_KEY = 'logout_session'
+
+_metadata = db.MetaData()
+
+
+def _columns():
+    return (
+        db.Column('id', db.BigInteger().with_variant(db.Integer(), 'sqlite'), primary_key=True, autoincrement=True),
+        db.Column('user_id', db.BigInteger, nullable=True),
+        db.Column('username', db.String(64), nullable=False, default=''),
+        db.Column('ip', db.String(64), nullable=False, default=''),
+        db.Column('user_agent', db.String(500), nullable=False, default=''),
+        db.Column('status', db.Integer, nullable=False, comment='状态 1成功 0失败'),
+        db.Column('message', db.String(255), nullable=False, default=''),
+        db.Column('session_id', db.String(32), nullable=True, index=True),
+        db.Column('login_time', db.DateTime, nullable=False, index=True),
+        db.Column('logout_time', db.DateTime, nullable=True),
+    )
+
+
+# 仅用于命名后台写入线程与生成分表，本身不建表
+_template = db.Table('login_record', _metadata, *_columns())
+
+
+def _partition_start(suffix: str) -> date:
+    return datetime.strptime(suffix, FORMATS['month'] if len(suffix) == 6 else FORMATS['day']).date()
+
+
+def _partition_end(suffix: str) -> date:
+    start = _partition_start(suffix)
+    if len(suffix) == 8:
+        return start + timedelta(days=1)
+    return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def encode_id(suffix: str, local_id: int) -> int:
+    return int(suffix) * ID_FACTOR[len(suffix)] + local_id
+
+
+def decode_id(log_id: int):
+    """返回 (分表后缀, 分表内 id)"""
+    factor = ID_FACTOR[6] if log_id >= 10 ** 15 else ID_FACTOR[8]
+    return str(log_id // factor), log_id % factor
+
+
+class LoginRecords:
+
+    def __init__(self):
+        self.partition = 'month'
+        self.writer = BatchWriter(_template, router=self._route, after_write=self._after_write,
+                                  on_error=self._on_write_error)
+        self._tables = {}
+        self._partitions = None
+        self._partitions_at = 0.0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.partition = app.config.get('LOGIN_RECORD_PARTITION', self.partition)
+        self.writer.init_app(
+            app,
+            batch_size=app.config.get('AUDIT_BATCH_SIZE', 500),
+            interval=app.config.get('AUDIT_FLUSH_MS', 200) / 1000,
+            max_queue=app.config.get('AUDIT_QUEUE_SIZE', 10000),
+            overflow=app.config.get('AUDIT_OVERFLOW', 'drop'),
+            sample_every=app.config.get('AUDIT_SAMPLE_EVERY', 10),
+        )
+        self._tables = {}
+        self._partitions = None
+
+    # ---- 分表 ----
+
+    def suffix_for(self, moment) -> str:
+        return moment.strftime(FORMATS[self.partition])
+
+    def table(self, suffix: str, create=False):
+        """返回分表对象，create 为 True 时不存在则建表（每个进程每张表只检查一次）"""
+        table = self._tables.get(suffix)
+        if table is None:
+            with self._lock:
+                table = self._tables.get(suffix)
+                if table is None:
+                    name = PREFIX + suffix
+                    table = _metadata.tables.get(name)
+                    if table is None:
+                        table = db.Table(name, _metadata, *_columns(), mysql_charset='utf8')
+                    if create:
+                        table.create(db.engine, checkfirst=True)
+                        self._tables[suffix] = table
+                        partitions = self._partitions
+                        if partitions is not None and suffix not in partitions:
+                            self._partitions = sorted(partitions + [suffix], key=_partition_start, reverse=True)
+        return table
+
+    def _partition_list(self) -> list:
+        partitions = self._partitions
+        if partitions is None or time.monotonic() - self._partitions_at > PARTITIONS_TTL:
+            names = db.inspect(db.engine).get_table_names()
+            suffixes = [m.group(1) for m in (re.fullmatch(PREFIX + r'(\d{6}|\d{8})', n) for n in names) if m]
+            partitions = self._partitions = sorted(suffixes, key=_partition_start, reverse=True)
+            self._partitions_at = time.monotonic()
+        return partitions
+
+    def partitions(self, begin=None, end=None) -> list:
+        """已存在的分表后缀，新的在前；给定时间范围时只返回与之有交集的分表"""
+        suffixes = self._partition_list()
+        if begin is not None:
+            suffixes = [s for s in suffixes if _partition_end(s) > begin.date()]
+        if end is not None:
+            suffixes = [s for s in suffixes if _partition_start(s) <= end.date()]
+        return list(suffixes)
+
+    def _on_write_error(self, exc) -> bool:
+        """分表可能已被删除：清空缓存，重试时重新检查并建表"""
+        if not isinstance(exc, db.exc.DBAPIError):
+            return False
+        with self._lock:
+            self._tables = {}
+            self._partitions = None
+        return True
+
+    def _route(self, row):
+        if LOGOUT_KEY in row:
+            return None
+        return self.table(self.suffix_for(row['login_time']), create=True)
+
+    # ---- 写入 ----
+
+    def record(self, username, status, message, user_id=None, session_id=None):
+        """记录一次登录，status 1 成功 0 失败"""
+        self.writer.put({
+            'user_id': user_id,
+            'username': (username or '')[:64],
+            'ip': client_ip()[:64],
+            'user_agent': request.headers.get('User-Agent', '')[:500],
+            'status': status,
+            'message': message[:255],
+            'session_id': session_id,
+            'login_time': datetime.now(),
+            'logout_time': None,
+        })
+
+    def mark_logout(self, payload: dict):
+        """登出时回填退出时间（排入写入队列，在登录行写入之后执行）"""
+        self.writer.put({
+            LOGOUT_KEY: payload['jti'],
+            'login_time': datetime.fromtimestamp(payload.get('iat', 0)),
+            'logout_time': datetime.now(),
+        })
+
+    def _after_write(self, conn, rows):
+        logins = [row for row in rows if LOGOUT_KEY not in row]
+        if logins:
+            self._rollup(conn, logins)
+        logouts = {}
+        for row in rows:
+            if LOGOUT_KEY in row:
+                logouts.setdefault(self.suffix_for(row['login_time']), []).append(
+                    {'sid': row[LOGOUT_KEY], 'ts': row['logout_time']}
+                )
+        existing = self._partition_list() if logouts else ()
+        for suffix, params in logouts.items():
+            if suffix not in existing:
+                continue
+            table = self.table(suffix)
+            conn.execute(
+                table.update().where(table.c.session_id == db.bindparam('sid')).values(logout_time=db.bindparam('ts')),
+                params,
+            )
+
+    @staticmethod
+    def _rollup(conn, rows):
+        """把一批登录按 (整点, 用户名, IP) 聚合后累加到 login_rollup"""
+        counts = {}
+        for row in rows:
+            key = (row['login_time'].replace(minute=0, second=0, microsecond=0), row['username'], row['ip'])
+            pair = counts.setdefault(key, [0, 0])
+            pair[0 if row['status'] == 1 else 1] += 1
+        values = [
+            {'hour': hour, 'username': username, 'ip': ip, 'success_count': ok, 'fail_count': failed}
+            for (hour, username, ip), (ok, failed) in counts.items()
+        ]
+
+        table = LoginRollup.__table__
+        dialect = conn.dialect.name
+        if dialect == 'mysql':
+            from sqlalchemy.dialects.mysql import insert
+            stmt = insert(table).values(values)
+            stmt = stmt.on_duplicate_key_update(
+                success_count=table.c.success_count + stmt.inserted.success_count,
+                fail_count=table.c.fail_count + stmt.inserted.fail_count,
+            )
+            conn.execute(stmt)
+        elif dialect in ('sqlite', 'postgresql'):
+            if dialect == 'sqlite':
+                from sqlalchemy.dialects.sqlite import insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert
+            stmt = insert(table).values(values)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c.hour, table.c.username, table.c.ip],
+                set_={
+                    'success_count': table.c.success_count + stmt.excluded.success_count,
+                    'fail_count': table.c.fail_count + stmt.excluded.fail_count,
+                },
+            )
+            conn.execute(stmt)
+        else:
+            for value in values:
+                updated = conn.execute(
+                    table.update()
+                    .where(table.c.hour == value['hour'], table.c.username == value['username'],
+                           table.c.ip == value['ip'])
+                    .values(success_count=table.c.success_count + value['success_count'],
+                            fail_count=table.c.fail_count + value['fail_count'])
+                ).rowcount
+                if not updated:
+                    conn.execute(table.insert().values(value))
+
+    # ---- 查询 ----
+
+    @staticmethod
+    def _to_dict(suffix, row) -> dict:
+        browser, os_name = parse_user_agent(row.user_agent)
+        return {
+            'id': encode_id(suffix, row.id),
+            'user_id': row.user_id,
+            'username': row.username,
+            'ip': row.ip,
+            'location': ip_location(row.ip),
+            'browser': browser,
+            'os': os_name,
+            'user_agent': row.user_agent,
+            'status': row.status,
+            'message': row.message,
+            'login_time': row.login_time,
+            'logout_time': row.logout_time,
+        }
+
+    def query(self, page=1, page_size=20, username=None, ip=None, status=None, begin=None, end=None) -> dict:
+        """跨分表分页查询，按时间倒序；逐表计数定位当前页所在的分表"""
+        offset, need, total, items = (page - 1) * page_size, page_size, 0, []
+        for suffix in self.partitions(begin, end):
+            table = self.table(suffix)
+            conditions = []
+            if username:
+                conditions.append(table.c.username.like(f'%{username}%'))
+            if ip:
+                conditions.append(table.c.ip.like(f'{ip}%'))
+            if status is not None:
+                conditions.append(table.c.status == status)
+            if begin is not None:
+                conditions.append(table.c.login_time >= begin)
+            if end is not None:
+                conditions.append(table.c.login_time <= end)
+
+            count = db.session.execute(db.select(db.func.count()).select_from(table).where(*conditions)).scalar()
+            total += count
+            if need and offset < count:
+                rows = db.session.execute(
+                    db.select(table).where(*conditions).order_by(table.c.id.desc()).offset(offset).limit(need)
+                ).all()
+                items.extend(self._to_dict(suffix, row) for row in rows)
+                need -= len(rows)
+                offset = 0
+            elif need:
+                offset -= count
+        return {'items': items, 'total': total, 'page': page, 'page_size': page_size}
+
+    def get(self, log_id: int):
+        suffix, local_id = decode_id(log_id)
+        if suffix not in self.partitions():
+            return None
+        table = self.table(suffix)
+        row = db.session.execute(db.select(table).where(table.c.id == local_id)).first()
+        return self._to_dict(suffix, row) if row else None
+
+    def delete(self, *log_ids) -> int:
+        groups = {}
+        for log_id in log_ids:
+            suffix, local_id = decode_id(int(log_id))
+            groups.setdefault(suffix, []).append(local_id)
+        existing, count = set(self.partitions()), 0
+        for suffix, ids in groups.items():
+            if suffix in existing:
+                table = self.table(suffix)
+                count += db.session.execute(table.delete().where(table.c.id.in_(ids))).rowcount
+        db.session.commit()
+        return count
+
+    def prune(self, keep_days=None) -> int:
+        """整表删除结束时间早于 keep_days 天前的分表（不传时清空全部），返回删除的行数
+
+        按分表粒度清理：跨越截止时间的分表整表保留。当前分表正在写入，只 DELETE 其中的行、不删表。
+        """
+        cutoff = date.today() - timedelta(days=keep_days) if keep_days is not None else None
+        current = self.suffix_for(datetime.now())
+        count = 0
+        for suffix in self.partitions():
+            if cutoff is not None and _partition_end(suffix) > cutoff:
+                continue
+            table = self.table(suffix)
+            if suffix == current:
+                count += db.session.execute(table.delete()).rowcount
+                db.session.commit()
+                continue
+            count += db.session.execute(db.select(db.func.count()).select_from(table)).scalar()
+            db.session.commit()
+            table.drop(db.engine, checkfirst=True)
+            self._tables.pop(suffix, None)
+        self._partitions = None
+        return count
+
+    def statistics(self, days=30) -> dict:
+        """最近 days 天每日成功/失败次数，只读汇总表"""
+        today = date.today()
+        since = datetime.combine(today - timedelta(days=days - 1), datetime.min.time())
+        day = db.func.date(LoginRollup.hour)
+        rows = db.session.execute(
+            db.select(day, db.func.sum(LoginRollup.success_count), db.func.sum(LoginRollup.fail_count))
+            .where(LoginRollup.hour >= since)
+            .group_by(day)
+        ).all()
+        by_day = {str(d): (int(ok or 0), int(failed or 0)) for d, ok, failed in rows}
+        trend = []
+        for i in range(days):
+            d = (since.date() + timedelta(days=i)).isoformat()
+            ok, failed = by_day.get(d, (0, 0))
+            trend.append({'date': d, 'success': ok, 'fail': failed})
+        return {
+            'today_success': trend[-1]['success'],
+            'today_fail': trend[-1]['fail'],
+            'total_success': sum(t['success'] for t in trend),
+            'total_fail': sum(t['fail'] for t in trend),
+            'trend': trend,
+        }
+
+    def flush(self):
+        self.writer.flush()
+
+
+login_records = LoginRecords()
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""菜单树
+
+全部有效菜单按菜单版本号（resource_version 中的 menu）整体缓存在进程内，
+建树见 app.utils.tree.build_tree，任意层级都是 O(n)。
+
+用户菜单（前端路由）按"用户拥有的、且被菜单引用的权限标识集合"缓存：权限相同的用户共用一棵树，
+菜单写入时递增版本号（多 worker 间通过数据库中的版本号同步），角色 / 权限变更经 permission_resolver
+改变用户的权限集合，自然落到另一个缓存键上。拥有 admin 角色的用户看到全部菜单。
+"""
+import threading
+
+from app.models import db
+from app.models.menu import Menu
+from app.utils.cache import LRUCache
+from app.utils.http_cache import get_version
+from app.utils.tree import build_tree
+
+SUPER_ROLE = 'admin'
+# 目录使用的布局组件
+PARENT_COMPONENT = '/layout/routerView/parent'
+
+DEFAULT_MENUS = [
+    {'id': 1, 'parent_id': 0, 'menu_name': '首页', 'path': '/home', 'component': '/src/views/home/index.vue',
+     'perms': '', 'component_name': 'home', 'order_num': 1, 'menu_type': 'C', 'icon': 'iconfont icon-shouye'},
+    {'id': 2, 'parent_id': 0, 'menu_name': '系统设置', 'path': '/system',
+     'component': '/src/layout/routerView/parent.vue', 'perms': '', 'component_name': 'system', 'order_num': 2,
+     'menu_type': 'M', 'icon': 'iconfont icon-xitongshezhi'},
+    {'id': 3, 'parent_id': 2, 'menu_name': '菜单管理', 'path': '/system/menu',
+     'component': '/src/views/system/menu/index.vue', 'perms': 'system:menu:list', 'component_name': 'systemMenu',
+     'order_num': 1, 'menu_type': 'C', 'icon': 'ele-Menu'},
+    {'id': 4, 'parent_id': 2, 'menu_name': '角色管理', 'path': '/system/role',
+     'component': '/src/views/system/role/index.vue', 'perms': 'system:role:list', 'component_name': 'systemRole',
+     'order_num': 2, 'menu_type': 'C', 'icon': 'ele-ColdDrink'},
+    {'id': 5, 'parent_id': 2, 'menu_name': '用户管理', 'path': '/system/user',
+     'component': '/src/views/system/user/index.vue', 'perms': 'system:user:list', 'component_name': 'systemUser',
+     'order_num': 3, 'menu_type': 'C', 'icon': 'ele-User'},
+    {'id': 6, 'parent_id': 2, 'menu_name': '部门管理', 'path': '/system/dept',
+     'component': '/src/views/system/dept/index.vue', 'perms': 'system:dept:list', 'component_name': 'systemDept',
+     'order_num': 4, 'menu_type': 'C', 'icon': 'ele-OfficeBuilding'},
+]
+
+
+def _route_component(component: str) -> str:
+    """'/src/views/home/index.vue' -> '/home/index'，与前端 import.meta.glob 的键匹配"""
+    component = component or ''
+    if component.startswith('/src/views/'):
+        component = component[len('/src/views'):]
+    elif component.startswith('/src/'):
+        component = component[len('/src'):]
+    return component[:-4] if component.endswith('.vue') else component
+
+
+def _to_route(menu: dict) -> dict:
+    path = menu['path'] or ''
+    is_link = path.startswith(('http://', 'https://'))
+    route = {
+        'path': path,
+        'name': menu['component_name'] or f'menu{menu["id"]}',
+        'component': PARENT_COMPONENT if menu['menu_type'] == 'M' else _route_component(menu['component']),
+        'meta': {
+            'title': menu['menu_name'],
+            'icon': menu['icon'] or '',
+            'isHide': not menu['visible'],
+            'isKeepAlive': bool(menu['is_cache']),
+            'isLink': path if is_link else '',
+            'isIframe': is_link and not menu['is_frame'],
+            'isAffix': path == '/home',
+        },
+    }
+    if menu['menu_type'] == 'M':
+        route['children'] = []
+    return route
+
+
+class MenuTree:
+
+    def __init__(self, maxsize=1024):
+        # (菜单版本号, 平铺的菜单 dict 列表)
+        self._menus = (None, [])
+        self._routes = LRUCache(maxsize=maxsize)
+        self._lock = threading.Lock()
+
+    # ---- 全部菜单 ----
+
+    def _snapshot(self) -> tuple:
+        """(菜单版本号, 全部有效菜单)"""
+        version = get_version('menu')
+        snapshot = self._menus
+        if snapshot[0] == version:
+            return snapshot
+        rows = db.session.execute(
+            db.select(*Menu.serialize_columns())
+            .where(Menu.enabled_flag == True)
+            .order_by(Menu.order_num, Menu.id)
+        ).all()
+        snapshot = (version, Menu.rows_to_dicts(rows))
+        with self._lock:
+            self._menus = snapshot
+        return snapshot
+
+    def menus(self) -> list:
+        """全部有效菜单（按 order_num、id 排序），不要修改返回的 dict"""
+        return self._snapshot()[1]
+
+    def tree(self, status=None, menu_type=None, title=None) -> list:
+        """菜单管理用的完整树，可按状态、类型、名称过滤（过滤后父节点不在结果中的节点作为根）"""
+        nodes = [
+            dict(m) for m in self.menus()
+            if (status is None or m['status'] == status)
+            and (menu_type is None or m['menu_type'] == menu_type)
+            and (not title or title in m['menu_name'])
+        ]
+        return build_tree(nodes)
+
+    # ---- 用户路由 ----
+
+    def routes_for(self, perms) -> list:
+        """用户可见的前端路由树，perms 为 permission_resolver.resolve 的结果"""
+        version, menus = self._snapshot()
+        if SUPER_ROLE in perms.role_codes:
+            key = (version, None)
+        else:
+            referenced = {m['perms'] for m in menus if m['perms']}
+            key = (version, frozenset(perms.permission_codes & referenced))
+        routes = self._routes.get(key)
+        if routes is None:
+            routes = self._build_routes(menus, key[1])
+            self._routes.set(key, routes)
+        return routes
+
+    @staticmethod
+    def _build_routes(menus, granted) -> list:
+        """granted 为 None 表示不过滤；按钮不生成路由，没有可见子菜单的目录不生成"""
+        visible = [
+            m for m in menus
+            if m['menu_type'] != 'F' and m['status'] == 1
+            and (granted is None or not m['perms'] or m['perms'] in granted)
+        ]
+        routes = [_to_route(m) for m in visible]
+        for route, menu in zip(routes, visible):
+            route['id'], route['parent_id'] = menu['id'], menu['parent_id']
+        index = {r['id']: r for r in routes}
+        roots = []
+        for route in routes:
+            parent = index.get(route['parent_id'])
+            if parent is not None and 'children' in parent:
+                parent['children'].append(route)
+            elif route['parent_id'] == 0:
+                roots.append(route)
+        # 父菜单被过滤掉的节点随之不可见；去掉空目录（自底向上）
+        return _prune(roots)
+
+    def invalidate(self):
+        """菜单写入后调用（版本号已在事务中递增），清空本进程缓存"""
+        with self._lock:
+            self._menus = (None, [])
+        self._routes.clear()
+
+
+def _prune(routes) -> list:
+    result = []
+    for route in routes:
+        route.pop('id', None)
+        route.pop('parent_id', None)
+        if 'children' in route:
+            route['children'] = _prune(route['children'])
+            if not route['children']:
+                continue
+            route['redirect'] = route['children'][0]['path']
+        result.append(route)
+    return result
+
+
+def seed_default_menus():
+    """菜单表为空时写入默认菜单"""
+    if db.session.execute(db.select(Menu.id).limit(1)).first() is not None:
+        return
+    db.session.execute(db.insert(Menu), DEFAULT_MENUS)
+    db.session.commit()
+
+
+menu_tree = MenuTree()
@@ -0,0 +1,308 @@
+# -*- coding: utf-8 -*-
+"""运行指标
+
+按路由统计请求耗时直方图、进行中请求数，按请求统计 SQL 语句数与耗时，另有 bcrypt 耗时；
+各缓存命中率、队列积压等由采集函数在抓取时读取。/metrics 以 Prometheus 文本格式输出。
+
+记录走分片：每个线程首次记录时轮流分到一个分片，之后只获取本分片的锁（基本无竞争），
+抓取时再把各分片相加。分片数固定，werkzeug 每请求一个线程的模式下内存也不会增长。
+
+指标只在本进程内累计，多 worker 部署时每次抓取落到其中一个 worker。为此每条样本都带 worker（pid）标签，
+并输出 process_start_time_seconds：各 worker 是独立的序列，worker 被替换时计数从 0 开始，不会与其它 worker 相互覆盖。
+Prometheus 中按 worker 求 rate 后再 sum by 去掉该标签；抓取间隔内未被抓到的 worker 会缺点，
+需要每次抓取都是全局数值时，改为分别抓取各 worker 或单 worker 部署。
+"""
+import itertools
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from flask import Response, g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# 秒
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# 每个请求的 SQL 语句数
+SQL_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SHARDS = 16
+
+
+class _Shard:
+    __slots__ = ('lock', 'values', 'histograms')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # (指标名, 标签值元组) -> 数值
+        self.values = {}
+        # (指标名, 标签值元组) -> [各桶计数（非累计，末位为 +Inf）, 总和, 次数]
+        self.histograms = {}
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, *extra) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    pairs.extend(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+# 进程启动时间戳，fork 出的 worker 重新记录
+_started_at = time.time()
+
+
+def _reset_started_at():
+    global _started_at
+    _started_at = time.time()
+
+
+os.register_at_fork(after_in_child=_reset_started_at)
+
+
+class Metrics:
+
+    def __init__(self):
+        self.enabled = True
+        self._shards = [_Shard() for _ in range(SHARDS)]
+        self._next = itertools.count()
+        self._local = threading.local()
+        # 指标名 -> (类型, 说明, 标签名元组)
+        self._meta = {}
+        # 直方图指标名 -> 桶上界
+        self._buckets = {}
+        self._collectors = []
+
+    # ---- 声明 ----
+
+    def counter(self, name, help_text, labels=()):
+        self._meta[name] = ('counter', help_text, tuple(labels))
+
+    def gauge(self, name, help_text, labels=()):
+        self._meta[name] = ('gauge', help_text, tuple(labels))
+
+    def histogram(self, name, help_text, labels=(), buckets=BUCKETS):
+        self._meta[name] = ('histogram', help_text, tuple(labels))
+        self._buckets[name] = tuple(buckets)
+
+    def register_collector(self, fn):
+        """注册采集函数，抓取时调用，产出 (指标名, 类型, 说明, 标签 dict, 数值)"""
+        if fn not in self._collectors:
+            self._collectors.append(fn)
+        return fn
+
+    # ---- 记录 ----
+
+    def _shard(self) -> _Shard:
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = self._shards[next(self._next) % SHARDS]
+        return shard
+
+    def inc(self, name, labels=(), value=1):
+        """计数器或仪表加 value（仪表可传负数）"""
+        shard = self._shard()
+        key = (name, labels)
+        with shard.lock:
+            shard.values[key] = shard.values.get(key, 0) + value
+
+    def observe(self, name, value, labels=()):
+        buckets = self._buckets[name]
+        shard = self._shard()
+        key = (name, labels)
+        with shard.lock:
+            item = shard.histograms.get(key)
+            if item is None:
+                item = shard.histograms[key] = [[0] * (len(buckets) + 1), 0.0, 0]
+            item[0][bisect_left(buckets, value)] += 1
+            item[1] += value
+            item[2] += 1
+
+    # ---- 输出 ----
+
+    def _merge(self):
+        values, histograms = {}, {}
+        for shard in self._shards:
+            with shard.lock:
+                for key, value in shard.values.items():
+                    values[key] = values.get(key, 0) + value
+                for key, (counts, total, count) in shard.histograms.items():
+                    merged = histograms.get(key)
+                    if merged is None:
+                        histograms[key] = [list(counts), total, count]
+                    else:
+                        merged[0] = [a + b for a, b in zip(merged[0], counts)]
+                        merged[1] += total
+                        merged[2] += count
+        return values, histograms
+
+    def render(self) -> str:
+        values, histograms = self._merge()
+        worker = f'worker="{os.getpid()}"'
+        series = {}
+        for (name, label_values), value in values.items():
+            series.setdefault(name, []).append((label_values, value))
+        for (name, label_values), item in histograms.items():
+            series.setdefault(name, []).append((label_values, item))
+
+        lines = []
+        for name, (kind, help_text, label_names) in self._meta.items():
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for label_values, value in sorted(series.get(name, ()), key=lambda s: s[0]):
+                if kind != 'histogram':
+                    lines.append(f'{name}{_labels(label_names, label_values, worker)} {value}')
+                    continue
+                counts, total, count = value
+                cumulative = 0
+                for bound, n in zip(self._buckets[name] + ('+Inf',), counts):
+                    cumulative += n
+                    le = 'le="%s"' % bound
+                    lines.append(f'{name}_bucket{_labels(label_names, label_values, worker, le)} {cumulative}')
+                lines.append(f'{name}_sum{_labels(label_names, label_values, worker)} {total}')
+                lines.append(f'{name}_count{_labels(label_names, label_values, worker)} {count}')
+
+        lines.append('# HELP process_start_time_seconds 进程启动时间戳')
+        lines.append('# TYPE process_start_time_seconds gauge')
+        lines.append(f'process_start_time_seconds{{{worker}}} {_started_at}')
+
+        declared = set()
+        for collector in self._collectors:
+            for name, kind, help_text, labels, value in collector():
+                if name not in declared:
+                    lines.append(f'# HELP {name} {help_text}')
+                    lines.append(f'# TYPE {name} {kind}')
+                    declared.add(name)
+                lines.append(f'{name}{_labels(labels.keys(), labels.values(), worker)} {value}')
+        return '\n'.join(lines) + '\n'
+
+    # ---- Flask / SQLAlchemy 接入 ----
+
+    def init_app(self, app):
+        self.enabled = app.config.get('METRICS_ENABLED', True)
+        if not self.enabled:
+            return
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        self.register_collector(_default_collector)
+        app.add_url_rule(app.config.get('METRICS_PATH', '/metrics'), 'metrics', self._endpoint)
+
+    def _endpoint(self):
+        return Response(self.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+    def _route(self):
+        rule = request.url_rule
+        return (request.blueprint or '', rule.rule if rule is not None else '<unmatched>')
+
+    def _before_request(self):
+        g.metrics_start = time.perf_counter()
+        g.metrics_route = self._route()
+        _sql.count, _sql.seconds = 0, 0.0
+        self.inc('http_requests_in_flight', g.metrics_route)
+
+    @staticmethod
+    def _after_request(response):
+        g.metrics_status = response.status_code
+        return response
+
+    def _teardown_request(self, exc):
+        start = g.pop('metrics_start', None)
+        if start is None:
+            return
+        # 视图抛出异常时不经过 after_request，按 500 记录
+        self.record_request(g.metrics_route, request.method, g.pop('metrics_status', 500),
+                            time.perf_counter() - start, _sql.count, _sql.seconds)
+
+    def record_request(self, route, method, status, elapsed, sql_count, sql_seconds):
+        """请求结束时一次加锁记录全部请求级指标，并把进行中请求数减一"""
+        shard = self._shard()
+        with shard.lock:
+            values, histograms = shard.values, shard.histograms
+            key = ('http_requests_in_flight', route)
+            values[key] = values.get(key, 0) - 1
+            key = ('http_requests_total', (*route, method, str(status)))
+            values[key] = values.get(key, 0) + 1
+            for name, buckets, value in (
+                ('http_request_duration_seconds', BUCKETS, elapsed),
+                ('sql_statements_per_request', SQL_BUCKETS, sql_count),
+                ('sql_seconds_per_request', BUCKETS, sql_seconds),
+            ):
+                key = (name, route)
+                item = histograms.get(key)
+                if item is None:
+                    item = histograms[key] = [[0] * (len(buckets) + 1), 0.0, 0]
+                item[0][bisect_left(buckets, value)] += 1
+                item[1] += value
+                item[2] += 1
+
+
+# 当前线程（即当前请求）的 SQL 计数
+_sql = threading.local()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metrics_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('metrics_start')
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    _sql.count = getattr(_sql, 'count', 0) + 1
+    _sql.seconds = getattr(_sql, 'seconds', 0.0) + elapsed
+
+
+def _default_collector():
+    from app.utils.audit import audit_log
+    from app.utils.jwt_utils import token_cache
+    from app.utils.login_records import login_records
+    from app.utils.password import password_hasher
+    from app.utils.permission_resolver import permission_resolver
+    from app.utils.rate_limit import login_limiter
+    from app.utils.session_registry import session_registry
+
+    for cache_name, cache in (('token', token_cache), ('permission', permission_resolver.cache)):
+        stats = cache.stats()
+        lookups = stats['hits'] + stats['misses']
+        yield 'cache_hits_total', 'counter', '缓存命中次数', {'cache': cache_name}, stats['hits']
+        yield 'cache_misses_total', 'counter', '缓存未命中次数', {'cache': cache_name}, stats['misses']
+        yield 'cache_entries', 'gauge', '缓存条目数', {'cache': cache_name}, stats['size']
+        yield 'cache_hit_ratio', 'gauge', '缓存命中率', {'cache': cache_name}, \
+            round(stats['hits'] / lookups, 4) if lookups else 0
+
+    yield 'bcrypt_pending', 'gauge', '排队中的 bcrypt 任务数', {}, password_hasher.pending
+
+    for writer_name, writer in (('operation_log', audit_log.writer), ('login_record', login_records.writer)):
+        for key, value in writer.stats().items():
+            yield f'batch_writer_{key}', 'gauge' if key == 'queued' else 'counter', \
+                f'批量写入 {key}', {'writer': writer_name}, value
+
+    for key, value in login_limiter.stats().items():
+        yield 'login_limiter_events_total', 'counter', '登录限流事件数', {'event': key}, value
+
+    from app.models import db
+    from app.utils.db_pool import pool_stats
+    for key, value in pool_stats(db.engine).items():
+        yield f'db_pool_{key}', 'gauge', f'连接池 {key}', {}, value
+
+    for key, value in session_registry.stats().items():
+        if key != 'avg_duration':
+            yield f'online_{key}', 'gauge', f'在线会话 {key}', {}, value
+
+
+metrics = Metrics()
+metrics.histogram('http_request_duration_seconds', '请求耗时（秒）', ('blueprint', 'route'))
+metrics.counter('http_requests_total', '请求数', ('blueprint', 'route', 'method', 'status'))
+metrics.gauge('http_requests_in_flight', '进行中的请求数', ('blueprint', 'route'))
+metrics.histogram('sql_statements_per_request', '每个请求执行的 SQL 语句数', ('blueprint', 'route'), SQL_BUCKETS)
+metrics.histogram('sql_seconds_per_request', '每个请求的 SQL 总耗时（秒）', ('blueprint', 'route'))
+metrics.histogram('bcrypt_seconds', 'bcrypt 哈希/校验耗时（秒，含排队）', ('op',))
+metrics.histogram('db_pool_checkout_seconds', '从连接池取连接的耗时（秒，含等待与新建连接）')
+metrics.counter('db_pool_timeouts_total', '从连接池取连接超时次数')
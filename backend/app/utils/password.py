@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+
+import bcrypt
+
+from app.utils.metrics import metrics
+
+
+class PasswordHasherBusy(Exception):
+    """排队中的哈希任务超过上限，调用方应返回 503"""
+
+
+def _hashpw(plain: bytes, rounds: int) -> str:
+    return bcrypt.hashpw(plain, bcrypt.gensalt(rounds)).decode('utf-8')
+
+
+def _checkpw(plain: bytes, hashed: bytes) -> bool:
+    try:
+        return bcrypt.checkpw(plain, hashed)
+    except ValueError:
+        return False
+
+
+def hash_rounds(hashed: str) -> int:
+    """从 bcrypt 哈希串（$2b$12$...）中解析 cost，解析失败返回 0"""
+    try:
+        return int(hashed.split('$')[2])
+    except (AttributeError, IndexError, ValueError):
+        return 0
+
+
+class PasswordHasher:
+    """bcrypt 哈希服务
+
+    哈希/校验在独立进程池中执行，请求线程只等待结果，不占用 GIL。
+    排队任务数超过 max_pending 时直接抛出 PasswordHasherBusy，快速失败。
+    workers 为 0 时退化为在当前线程内直接计算。
+    """
+
+    def __init__(self, rounds=12, workers=0, max_pending=64, timeout=10):
+        self.rounds = rounds
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pool_pid = None
+
+    def init_app(self, app):
+        self.rounds = app.config.get('BCRYPT_ROUNDS', self.rounds)
+        self.workers = app.config.get('BCRYPT_WORKERS', self.workers)
+        self.max_pending = app.config.get('BCRYPT_MAX_PENDING', self.max_pending)
+        self.timeout = app.config.get('BCRYPT_TIMEOUT', self.timeout)
+
+    def _executor(self):
+        # 进程池按 pid 懒加载，fork 出的 worker 进程各自创建自己的池
+        if self._pool is None or self._pool_pid != os.getpid():
+            with self._lock:
+                if self._pool is None or self._pool_pid != os.getpid():
+                    self._pool = ProcessPoolExecutor(max_workers=self.workers)
+                    self._pool_pid = os.getpid()
+        return self._pool
+
+    def _run(self, fn, *args):
+        start = time.perf_counter()
+        try:
+            return self._call(fn, *args)
+        finally:
+            metrics.observe('bcrypt_seconds', time.perf_counter() - start, (fn.__name__.lstrip('_'),))
+
+    def _call(self, fn, *args):
+        if self.workers <= 0:
+            return fn(*args)
+
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise PasswordHasherBusy()
+            self._pending += 1
+        try:
+            return self._executor().submit(fn, *args).result(timeout=self.timeout)
+        except FutureTimeout:
+            raise PasswordHasherBusy()
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def hash(self, plain: str) -> str:
+        """生成密码哈希"""
+        return self._run(_hashpw, plain.encode('utf-8'), self.rounds)
+
+    def hash_many(self, plains) -> list:
+        """批量生成密码哈希
+
+        每次只提交不超过进程数的任务并等待完成，避免大批量任务长时间占满队列、
+        让并发的登录请求排在整批之后。
+        """
+        plains = [p.encode('utf-8') for p in plains]
+        if self.workers <= 0:
+            return [_hashpw(p, self.rounds) for p in plains]
+
+        hashes = []
+        for start in range(0, len(plains), self.workers):
+            window = plains[start:start + self.workers]
+            with self._lock:
+                if self._pending >= self.max_pending:
+                    raise PasswordHasherBusy()
+                self._pending += len(window)
+            try:
+                futures = [self._executor().submit(_hashpw, p, self.rounds) for p in window]
+                hashes.extend(f.result(timeout=self.timeout) for f in futures)
+            except FutureTimeout:
+                raise PasswordHasherBusy()
+            finally:
+                with self._lock:
+                    self._pending -= len(window)
+        return hashes
+
+    def verify(self, plain: str, hashed: str) -> bool:
+        """验证密码"""
+        if not hashed:
+            return False
+        return self._run(_checkpw, plain.encode('utf-8'), hashed.encode('utf-8'))
+
+    def needs_rehash(self, hashed: str) -> bool:
+        """哈希 cost 与当前配置不一致时需要重新哈希"""
+        return hash_rounds(hashed) != self.rounds
+
+
+password_hasher = PasswordHasher()
+
+
+def hash_password(plain: str) -> str:
+    return password_hasher.hash(plain)
+
+
+def check_password(plain: str, hashed: str) -> bool:
+    return password_hasher.verify(plain, hashed)
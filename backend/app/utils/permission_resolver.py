@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+from typing import NamedTuple, Optional
+
+from app.models import db, user_role, role_permission
+from app.models.role import Role, Permission
+from app.models.user import User
+from app.utils.cache import LRUCache
+from app.utils.http_cache import get_version
+
+
+class EffectivePermissions(NamedTuple):
+    role_codes: frozenset
+    permission_codes: frozenset
+
+
+class PermissionResolver:
+    """用户有效权限解析器
+
+    一次联表查询算出用户的角色编码和权限编码，结果以 frozenset 缓存在进程内
+    LRU + TTL 缓存中，缓存键为 (user_id, 权限版本号)。
+    版本号为 resource_version 中的 permission，角色、权限、用户角色的写操作在同一事务内递增，
+    之后的请求即换用新的缓存键，旧条目随 LRU 淘汰，不需要逐个失效。
+    版本号在进程内缓存 PERMISSION_VERSION_TTL 秒，命中权限缓存的请求不查库；
+    本进程的写操作立即生效，其它 worker 的写操作最多延迟这么久。
+    """
+
+    def __init__(self, maxsize=4096, ttl=60, version_ttl=2.0):
+        self._cache = LRUCache(maxsize, ttl)
+        self.version_ttl = version_ttl
+
+    def init_app(self, app):
+        self._cache = LRUCache(
+            app.config.get('PERMISSION_CACHE_SIZE', self._cache.maxsize),
+            app.config.get('PERMISSION_CACHE_TTL', self._cache.ttl),
+        )
+        self.version_ttl = app.config.get('PERMISSION_VERSION_TTL', self.version_ttl)
+
+    @property
+    def cache(self) -> LRUCache:
+        return self._cache
+
+    def resolve(self, user_id) -> Optional[EffectivePermissions]:
+        """返回用户的有效权限，用户不存在或已删除时返回 None"""
+        key = (user_id, get_version('permission', self.version_ttl))
+        perms = self._cache.get(key)
+        if perms is not None:
+            return perms
+
+        perms = self._load(user_id)
+        if perms is not None:
+            self._cache.set(key, perms)
+        return perms
+
+    @staticmethod
+    def _load(user_id) -> Optional[EffectivePermissions]:
+        rows = db.session.execute(
+            db.select(Role.role_code, Permission.permission_code)
+            .select_from(User)
+            .outerjoin(user_role, user_role.c.user_id == User.id)
+            .outerjoin(Role, db.and_(Role.id == user_role.c.role_id, Role.enabled_flag == True))
+            .outerjoin(role_permission, role_permission.c.role_id == Role.id)
+            .outerjoin(Permission, db.and_(
+                Permission.id == role_permission.c.permission_id, Permission.enabled_flag == True
+            ))
+            .where(User.id == user_id, User.enabled_flag == True)
+        ).all()
+        if not rows:
+            return None
+        return EffectivePermissions(
+            frozenset(role_code for role_code, _ in rows if role_code is not None),
+            frozenset(perm_code for _, perm_code in rows if perm_code is not None),
+        )
+
+
+permission_resolver = PermissionResolver()
@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+"""登录限流
+
+在查询用户、校验 bcrypt 之前拒绝暴力破解请求：
+- 每个 IP 的登录尝试按 GCRA 限速（LOGIN_IP_RATE，如 30/60 表示 60 秒内最多 30 次）
+- 每个用户名、每个 IP 的失败次数各自按 GCRA 计数（LOGIN_FAIL_LIMIT / LOGIN_IP_FAIL_LIMIT），
+  超出后锁定，锁定时长按连续锁定次数指数增长：base、2*base、4*base…… 不超过 LOGIN_LOCKOUT_MAX
+- 登录成功清除该用户名的失败状态
+
+GCRA 每个键只保存一个理论到达时间（tat），连同锁定信息为三个数，进程内存放在有上限的 LRU 中；
+多 worker 部署时可选 sql 存储共享状态。
+"""
+import logging
+import threading
+import time
+
+from sqlalchemy.exc import IntegrityError
+
+from app.models import db
+from app.models.token import RateLimitState
+from app.utils.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+
+def parse_rate(value: str):
+    """'30/60' -> (30, 60.0)"""
+    limit, period = str(value).split('/')
+    return int(limit), float(period)
+
+
+class MemoryStore:
+    """进程内存储，键数超过上限时淘汰最久未使用的"""
+
+    def __init__(self, maxsize=100000):
+        self._cache = LRUCache(maxsize=maxsize)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        return self._cache.get(key)
+
+    def update(self, key, fn):
+        """在进程锁内读取、计算并写回，fn(state) 返回 (结果, 新状态, 失效时间)，新状态为 None 时不写"""
+        with self._lock:
+            result, state, expires = fn(self._cache.get(key))
+            if state is not None:
+                self._cache.set(key, state, expires - time.time())
+        return result
+
+    def delete(self, key):
+        self._cache.pop(key)
+
+
+class SQLStore:
+    """数据库存储，多 worker 共享
+
+    读改写以条件 UPDATE（WHERE 旧值）实现比较并交换，不持有进程锁：其它 worker 在读取之后改过该行时
+    UPDATE 影响 0 行，重新读取再算；新键的并发 INSERT 由主键冲突判定。
+    """
+
+    # 每写入这么多次顺带删除一次已失效的状态
+    PRUNE_EVERY = 256
+    # 比较并交换的最多尝试次数
+    MAX_ATTEMPTS = 5
+
+    def __init__(self, maxsize=None):
+        self._writes = 0
+
+    def get(self, key):
+        row = db.session.get(RateLimitState, key)
+        if row is None or row.expires <= time.time():
+            return None
+        return row.tat, row.locked_until, row.strikes
+
+    def update(self, key, fn):
+        result = None
+        for _ in range(self.MAX_ATTEMPTS):
+            row = db.session.execute(
+                db.select(RateLimitState.tat, RateLimitState.locked_until, RateLimitState.strikes,
+                          RateLimitState.expires)
+                .where(RateLimitState.key == key)
+            ).first()
+            current = None if row is None or row.expires <= time.time() else (row.tat, row.locked_until, row.strikes)
+            result, state, expires = fn(current)
+            if state is None:
+                db.session.commit()
+                return result
+            values = dict(zip(('tat', 'locked_until', 'strikes'), state), expires=expires)
+            if row is None:
+                try:
+                    db.session.execute(db.insert(RateLimitState).values(key=key, **values))
+                except IntegrityError:
+                    db.session.rollback()
+                    continue
+            elif not db.session.execute(
+                db.update(RateLimitState)
+                .where(RateLimitState.key == key, RateLimitState.tat == row.tat,
+                       RateLimitState.locked_until == row.locked_until, RateLimitState.strikes == row.strikes,
+                       RateLimitState.expires == row.expires)
+                .values(**values)
+            ).rowcount:
+                db.session.rollback()
+                continue
+            self._writes += 1
+            if self._writes % self.PRUNE_EVERY == 0:
+                db.session.execute(db.delete(RateLimitState).where(RateLimitState.expires <= time.time()))
+            db.session.commit()
+            return result
+        logger.warning('登录限流状态 %s 并发更新冲突，放弃写入', key)
+        return result
+
+    def delete(self, key):
+        db.session.execute(db.delete(RateLimitState).where(RateLimitState.key == key))
+        db.session.commit()
+
+
+STORES = {'memory': MemoryStore, 'sql': SQLStore}
+
+_EMPTY = (0.0, 0.0, 0)
+
+
+class LoginRateLimiter:
+
+    def __init__(self):
+        self.enabled = True
+        self.ip_rate = (30, 60.0)
+        self.fail_limit = (5, 300.0)
+        self.ip_fail_limit = (20, 300.0)
+        self.lockout_base = 60
+        self.lockout_max = 3600
+        self.store = MemoryStore()
+        self._lock = threading.Lock()
+        self._counters = dict.fromkeys(
+            ('checked', 'rejected_locked', 'rejected_rate', 'failures', 'lockouts'), 0
+        )
+
+    def init_app(self, app):
+        self.enabled = app.config.get('LOGIN_LIMIT_ENABLED', True)
+        self.ip_rate = parse_rate(app.config.get('LOGIN_IP_RATE', '30/60'))
+        self.fail_limit = parse_rate(app.config.get('LOGIN_FAIL_LIMIT', '5/300'))
+        self.ip_fail_limit = parse_rate(app.config.get('LOGIN_IP_FAIL_LIMIT', '20/300'))
+        self.lockout_base = app.config.get('LOGIN_LOCKOUT_BASE', self.lockout_base)
+        self.lockout_max = app.config.get('LOGIN_LOCKOUT_MAX', self.lockout_max)
+        self.store = STORES[app.config.get('LOGIN_LIMIT_STORE', 'memory')](app.config.get('LOGIN_LIMIT_SIZE', 100000))
+        for key in self._counters:
+            self._counters[key] = 0
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self._counters[name] += n
+
+    def _expires(self, state) -> float:
+        # 锁定结束后再保留 lockout_max 秒，期间再次被锁定时长继续翻倍
+        tat, locked_until, _ = state
+        return max(tat, locked_until) + self.lockout_max
+
+    @staticmethod
+    def _consume(tat: float, now: float, rate) -> tuple:
+        """GCRA 消耗一次配额，返回 (是否允许, 新的 tat 或需要等待的秒数)"""
+        limit, period = rate
+        new_tat = max(tat, now) + period / limit
+        if new_tat - now > period:
+            return False, new_tat - now - period
+        return True, new_tat
+
+    def check(self, username: str, ip: str) -> float:
+        """登录前调用，返回 0 表示放行，否则为需要等待的秒数"""
+        if not self.enabled:
+            return 0
+        now = time.time()
+        self._count('checked')
+        for key in ('u:' + username, 'i:' + ip):
+            locked_until = (self.store.get(key) or _EMPTY)[1]
+            if locked_until > now:
+                self._count('rejected_locked')
+                return locked_until - now
+
+        def consume(state):
+            allowed, value = self._consume((state or _EMPTY)[0], now, self.ip_rate)
+            if not allowed:
+                return value, None, None
+            state = (value, 0.0, 0)
+            return 0, state, self._expires(state)
+
+        wait = self.store.update('a:' + ip, consume)
+        if wait:
+            self._count('rejected_rate')
+        return wait
+
+    def failure(self, username: str, ip: str):
+        """登录失败后调用，失败次数超限时锁定对应的用户名 / IP"""
+        if not self.enabled:
+            return
+        now = time.time()
+        self._count('failures')
+
+        def consume(state, rate):
+            tat, locked_until, strikes = state or _EMPTY
+            allowed, value = self._consume(tat, now, rate)
+            if allowed:
+                tat = value
+            else:
+                strikes += 1
+                locked_until = now + min(self.lockout_base * 2 ** (strikes - 1), self.lockout_max)
+                # 锁定期间 tat 清零，解锁后重新开始计数
+                tat = 0.0
+            state = (tat, locked_until, strikes)
+            return not allowed, state, self._expires(state)
+
+        for key, rate in (('u:' + username, self.fail_limit), ('i:' + ip, self.ip_fail_limit)):
+            if self.store.update(key, lambda state: consume(state, rate)):
+                self._count('lockouts')
+
+    def success(self, username: str):
+        """登录成功后清除该用户名的失败状态"""
+        if not self.enabled:
+            return
+        self.store.delete('u:' + username)
+
+    def stats(self) -> dict:
+        """各类事件的累计次数（不查询存储）"""
+        with self._lock:
+            return dict(self._counters)
+
+
+login_limiter = LoginRateLimiter()
@@ -0,0 +1,501 @@
+# -*- coding: utf-8 -*-
+"""服务器监控
+
+一个后台线程按固定间隔读取 /proc（Linux），生成当前快照并写入时间序列；
+接口只读取快照与序列，请求本身不读取 /proc，打开再多监控页也不增加采样开销。
+
+时间序列（cpu、memory、swap、load1、net_recv、net_sent）存放在定长的数组环形缓冲区中，
+按三种粒度保留：1s 原始采样最近 5 分钟，1m 分钟均值最近 24 小时，1h 小时均值最近 30 天。
+进程列表、磁盘用量变化慢且读取成本高，按更长的间隔采样。
+
+多进程部署时只有一个进程采样：各进程的线程争抢 SERVER_MONITOR_DIR 下的文件锁，持有者（leader）采样，
+每个周期把快照与序列原子地写入共享文件；其余进程读取该文件（按修改时间缓存），线程阻塞在锁上，
+leader 退出（例如 worker 达到 max_requests 被替换）时由其中一个接替，并从共享文件继续历史曲线。
+共享目录不可用时退化为各进程独立采样。
+
+采样线程懒启动：gunicorn 每个 worker 初始化后（post_worker_init）启动，开发服务器在首次访问时启动；
+fork 出的子进程丢弃继承来的数据与锁，重新启动。
+"""
+import fcntl
+import logging
+import os
+import pickle
+import platform
+import pwd
+import socket
+import tempfile
+import threading
+import time
+from array import array
+from datetime import datetime
+
+from app.utils.session_registry import format_duration
+
+logger = logging.getLogger(__name__)
+
+# 粒度 -> (秒, 保留点数)
+RESOLUTIONS = {'1s': (1, 300), '1m': (60, 1440), '1h': (3600, 720)}
+SERIES = ('cpu', 'memory', 'swap', 'load1', 'net_recv', 'net_sent')
+# 快照中保留的进程数（接口按 limit 截取）
+TOP_PROCESSES = 50
+
+_CLK_TCK = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+class RingBuffer:
+    """定长环形缓冲区，时间戳与数值分别存放在两个 double 数组中，写满后覆盖最旧的点"""
+
+    __slots__ = ('size', 'times', 'values', 'next', 'count')
+
+    def __init__(self, size: int):
+        self.size = size
+        self.times = array('d', bytes(8 * size))
+        self.values = array('d', bytes(8 * size))
+        self.next = 0
+        self.count = 0
+
+    def append(self, ts: float, value: float):
+        i = self.next
+        self.times[i] = ts
+        self.values[i] = value
+        self.next = (i + 1) % self.size
+        if self.count < self.size:
+            self.count += 1
+
+    def items(self, since: float = 0) -> list:
+        """按时间先后返回 [[时间戳, 数值], ...]，只包含晚于 since 的点"""
+        start = (self.next - self.count) % self.size
+        result = []
+        for k in range(self.count):
+            i = (start + k) % self.size
+            if self.times[i] > since:
+                result.append([int(self.times[i]), round(self.values[i], 2)])
+        return result
+
+
+class _Series:
+    """一个指标在各粒度下的环形缓冲区，粗粒度由原始采样按时间桶求平均"""
+
+    __slots__ = ('buffers', 'buckets')
+
+    def __init__(self):
+        self.buffers = {name: RingBuffer(size) for name, (_, size) in RESOLUTIONS.items()}
+        # 粒度 -> [当前桶序号, 累加值, 点数]
+        self.buckets = {name: [None, 0.0, 0] for name in RESOLUTIONS if name != '1s'}
+
+    def add(self, ts: float, value: float):
+        self.buffers['1s'].append(ts, value)
+        for name, bucket in self.buckets.items():
+            step = RESOLUTIONS[name][0]
+            index = int(ts // step)
+            if bucket[0] is not None and index != bucket[0] and bucket[2]:
+                self.buffers[name].append(bucket[0] * step, bucket[1] / bucket[2])
+                bucket[1], bucket[2] = 0.0, 0
+            bucket[0] = index
+            bucket[1] += value
+            bucket[2] += 1
+
+
+# ---- /proc 读取 ----
+
+def _read(path: str) -> str:
+    with open(path) as f:
+        return f.read()
+
+
+def _read_int(path: str, default=0) -> int:
+    try:
+        return int(_read(path).strip())
+    except (OSError, ValueError):
+        return default
+
+
+def read_cpu_times() -> list:
+    """/proc/stat 中 cpu 总计与各核的 (空闲, 总计) jiffies，首项为总计"""
+    result = []
+    for line in _read('/proc/stat').splitlines():
+        if not line.startswith('cpu'):
+            break
+        fields = [int(x) for x in line.split()[1:9]]
+        idle = fields[3] + fields[4]
+        result.append((idle, sum(fields)))
+    return result
+
+
+def read_cpuinfo() -> dict:
+    """型号、物理核数、当前频率（MHz）"""
+    model, mhz, cores = '', [], set()
+    physical_id = '0'
+    for line in _read('/proc/cpuinfo').splitlines():
+        key, _, value = line.partition(':')
+        key, value = key.strip(), value.strip()
+        if key == 'model name' and not model:
+            model = value
+        elif key == 'cpu MHz':
+            mhz.append(float(value))
+        elif key == 'physical id':
+            physical_id = value
+        elif key == 'core id':
+            cores.add((physical_id, value))
+    return {'model': model, 'physical_cores': len(cores) or os.cpu_count() or 1,
+            'current_frequency': round(sum(mhz) / len(mhz), 2) if mhz else 0.0}
+
+
+def read_meminfo() -> dict:
+    values = {}
+    for line in _read('/proc/meminfo').splitlines():
+        key, _, rest = line.partition(':')
+        parts = rest.split()
+        if parts:
+            values[key] = int(parts[0]) * 1024
+    total = values.get('MemTotal', 0)
+    available = values.get('MemAvailable', values.get('MemFree', 0))
+    swap_total, swap_free = values.get('SwapTotal', 0), values.get('SwapFree', 0)
+    swap_used = swap_total - swap_free
+    return {
+        'total': total,
+        'available': available,
+        'used': total - available,
+        'free': values.get('MemFree', 0),
+        'usage_percent': round((total - available) / total * 100, 1) if total else 0.0,
+        'swap_total': swap_total,
+        'swap_used': swap_used,
+        'swap_free': swap_free,
+        'swap_percent': round(swap_used / swap_total * 100, 1) if swap_total else 0.0,
+    }
+
+
+def read_net_dev() -> list:
+    result = []
+    for line in _read('/proc/net/dev').splitlines()[2:]:
+        name, _, rest = line.partition(':')
+        f = [int(x) for x in rest.split()]
+        result.append({
+            'interface': name.strip(),
+            'bytes_recv': f[0], 'packets_recv': f[1], 'errin': f[2], 'dropin': f[3],
+            'bytes_sent': f[8], 'packets_sent': f[9], 'errout': f[10], 'dropout': f[11],
+        })
+    return result
+
+
+def read_disks() -> list:
+    """本地文件系统（排除 /proc/filesystems 中标记 nodev 的类型）的用量，根目录总是包含"""
+    nodev = {line.split()[1] for line in _read('/proc/filesystems').splitlines() if line.startswith('nodev')}
+    result, seen = [], set()
+    for line in _read('/proc/mounts').splitlines():
+        device, mountpoint, fstype = line.split()[:3]
+        mountpoint = mountpoint.replace('\\040', ' ')
+        if mountpoint in seen or (fstype in nodev and mountpoint != '/'):
+            continue
+        try:
+            st = os.statvfs(mountpoint)
+        except OSError:
+            continue
+        seen.add(mountpoint)
+        total = st.f_blocks * st.f_frsize
+        free = st.f_bavail * st.f_frsize
+        used = total - st.f_bfree * st.f_frsize
+        result.append({
+            'device': device,
+            'mountpoint': mountpoint,
+            'fstype': fstype,
+            'total': total,
+            'used': used,
+            'free': free,
+            'usage_percent': round(used / (used + free) * 100, 1) if used + free else 0.0,
+        })
+    return result
+
+
+def read_process_times() -> dict:
+    """pid -> (名称, 状态, utime+stime jiffies, 启动时刻 jiffies, rss 字节)"""
+    result = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            data = _read(f'/proc/{entry}/stat')
+        except OSError:
+            continue
+        # 进程名可能包含空格和括号，以最后一个右括号分隔
+        name = data[data.index('(') + 1:data.rindex(')')]
+        fields = data[data.rindex(')') + 2:].split()
+        result[int(entry)] = (name, fields[0], int(fields[11]) + int(fields[12]), int(fields[19]),
+                              int(fields[21]) * _PAGE_SIZE)
+    return result
+
+
+_STATUS = {'R': 'running', 'S': 'sleeping', 'D': 'disk-sleep', 'Z': 'zombie', 'T': 'stopped',
+           't': 'tracing-stop', 'I': 'idle', 'X': 'dead'}
+
+
+def _process_owner(pid: int, cache: dict) -> str:
+    try:
+        for line in _read(f'/proc/{pid}/status').splitlines():
+            if line.startswith('Uid:'):
+                uid = int(line.split()[1])
+                if uid not in cache:
+                    try:
+                        cache[uid] = pwd.getpwuid(uid).pw_name
+                    except KeyError:
+                        cache[uid] = str(uid)
+                return cache[uid]
+    except OSError:
+        pass
+    return ''
+
+
+def _process_cmdline(pid: int) -> str:
+    try:
+        return _read(f'/proc/{pid}/cmdline').replace('\x00', ' ').strip()
+    except OSError:
+        return ''
+
+
+class ServerMonitor:
+
+    def __init__(self):
+        self.interval = 1.0
+        self.process_interval = 5.0
+        self.disk_interval = 30.0
+        self.supported = os.path.exists('/proc/stat')
+        self.state_dir = os.path.join(tempfile.gettempdir(), f'server-monitor-{os.getuid()}')
+        self.series = {name: _Series() for name in SERIES}
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._thread = None
+        self._uids = {}
+        self._leader = False
+        self._lock_fd = None
+        self._loaded = None
+        self._errors = set()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset)
+
+    def init_app(self, app):
+        self.interval = app.config.get('SERVER_MONITOR_INTERVAL', self.interval)
+        self.process_interval = app.config.get('SERVER_MONITOR_PROCESS_INTERVAL', self.process_interval)
+        self.disk_interval = app.config.get('SERVER_MONITOR_DISK_INTERVAL', self.disk_interval)
+        self.state_dir = app.config.get('SERVER_MONITOR_DIR') or self.state_dir
+
+    @property
+    def _data_path(self) -> str:
+        return os.path.join(self.state_dir, 'state.pickle')
+
+    def _reset(self):
+        # fork 出的子进程没有采样线程，继承来的序列属于父进程，丢弃；锁仍由父进程持有
+        self.series = {name: _Series() for name in SERIES}
+        self._snapshot = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+        self._leader = False
+        self._lock_fd = None
+        self._loaded = None
+
+    def start(self):
+        """启动当前进程的采样线程（已在运行时不做任何事）"""
+        if not self.supported or self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='server-monitor', daemon=True)
+            self._thread.start()
+        # 首个快照需要两次 CPU 采样求差值，等待其就绪，避免首次请求拿到空数据
+        deadline = time.monotonic() + self.interval + 1
+        while self._current() is None and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+    # ---- 进程间共享 ----
+
+    def _open_lock(self):
+        """打开共享目录下的锁文件；目录不属于当前用户或对其他用户可写时不使用（共享文件以 pickle 读取）"""
+        try:
+            os.makedirs(self.state_dir, mode=0o700, exist_ok=True)
+            st = os.stat(self.state_dir)
+            if st.st_uid != os.getuid() or st.st_mode & 0o077:
+                logger.warning('服务器监控目录 %s 不属于当前用户或权限过宽，各进程独立采样', self.state_dir)
+                return None
+            return os.open(os.path.join(self.state_dir, 'leader.lock'), os.O_RDWR | os.O_CREAT, 0o600)
+        except OSError:
+            logger.warning('服务器监控目录 %s 不可用，各进程独立采样', self.state_dir, exc_info=True)
+            return None
+
+    def _refresh(self):
+        """从共享文件加载 leader 写入的快照与序列，文件未变化时不读取"""
+        try:
+            mtime = os.stat(self._data_path).st_mtime_ns
+        except OSError:
+            return
+        with self._lock:
+            if mtime == self._loaded:
+                return
+            try:
+                with open(self._data_path, 'rb') as f:
+                    data = pickle.load(f)
+            except (OSError, EOFError, pickle.UnpicklingError):
+                return
+            self.series, self._snapshot, self._loaded = data['series'], data['snapshot'], mtime
+
+    def _save(self):
+        """写入临时文件后替换，读取方不会读到写了一半的文件"""
+        tmp = f'{self._data_path}.{os.getpid()}'
+        with self._lock:
+            data = pickle.dumps({'series': self.series, 'snapshot': self._snapshot}, pickle.HIGHEST_PROTOCOL)
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, self._data_path)
+
+    def _current(self):
+        if not self._leader and self._lock_fd is not None:
+            self._refresh()
+        return self._snapshot
+
+    # ---- 采样 ----
+
+    def _run(self):
+        self._lock_fd = self._open_lock()
+        if self._lock_fd is not None:
+            # 阻塞直到成为 leader，先接上前一个 leader 留下的序列
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+            self._refresh()
+        self._leader = True
+        state = {'cpu': read_cpu_times(), 'net': read_net_dev(), 'procs': read_process_times(),
+                 'time': time.monotonic(), 'proc_time': time.monotonic(), 'disk_time': 0.0,
+                 'cpuinfo': read_cpuinfo(), 'disks': [], 'top': []}
+        static = self._static_info()
+        next_tick = time.monotonic()
+        while True:
+            next_tick += self.interval
+            time.sleep(max(0.0, next_tick - time.monotonic()))
+            try:
+                self._sample(state, static)
+                if self._lock_fd is not None:
+                    self._save()
+            except Exception as e:
+                # 采样失败（例如容器内 /proc 权限受限）不终止线程，下一周期重试；同类错误只记录一次
+                if type(e) not in self._errors:
+                    self._errors.add(type(e))
+                    logger.exception('服务器监控采样失败，同类错误不再重复记录')
+
+    @staticmethod
+    def _static_info() -> dict:
+        btime = 0
+        for line in _read('/proc/stat').splitlines():
+            if line.startswith('btime'):
+                btime = int(line.split()[1])
+        cpu0 = '/sys/devices/system/cpu/cpu0/cpufreq/'
+        return {
+            'hostname': socket.gethostname(),
+            'platform': platform.platform(),
+            'architecture': platform.machine(),
+            'boot_time': btime,
+            'logical_cores': os.cpu_count() or 1,
+            'min_frequency': round(_read_int(cpu0 + 'cpuinfo_min_freq') / 1000, 2),
+            'max_frequency': round(_read_int(cpu0 + 'cpuinfo_max_freq') / 1000, 2),
+        }
+
+    def _sample(self, state, static):
+        now, ts = time.monotonic(), time.time()
+        elapsed = max(now - state['time'], 1e-6)
+
+        cpu = read_cpu_times()
+        usage = [
+            round((1 - (idle - idle0) / (total - total0)) * 100, 1) if total > total0 else 0.0
+            for (idle, total), (idle0, total0) in zip(cpu, state['cpu'])
+        ]
+        memory = read_meminfo()
+        net = read_net_dev()
+        previous = {n['interface']: n for n in state['net']}
+        recv = sum(n['bytes_recv'] - previous[n['interface']]['bytes_recv']
+                   for n in net if n['interface'] != 'lo' and n['interface'] in previous)
+        sent = sum(n['bytes_sent'] - previous[n['interface']]['bytes_sent']
+                   for n in net if n['interface'] != 'lo' and n['interface'] in previous)
+        load1 = float(_read('/proc/loadavg').split()[0])
+
+        if now - state['proc_time'] >= self.process_interval:
+            state['cpuinfo'] = read_cpuinfo()
+            procs = read_process_times()
+            state['top'] = self._top_processes(procs, state['procs'], now - state['proc_time'], memory['total'],
+                                               static['boot_time'])
+            state['procs'], state['proc_time'] = procs, now
+        if now - state['disk_time'] >= self.disk_interval:
+            state['disks'], state['disk_time'] = read_disks(), now
+        state['cpu'], state['net'], state['time'] = cpu, net, now
+
+        with self._lock:
+            for name, value in (('cpu', usage[0]), ('memory', memory['usage_percent']),
+                                ('swap', memory['swap_percent']), ('load1', load1),
+                                ('net_recv', max(recv, 0) / elapsed), ('net_sent', max(sent, 0) / elapsed)):
+                self.series[name].add(ts, value)
+
+        cpuinfo = state['cpuinfo']
+        uptime = ts - static['boot_time']
+        # 整体替换快照引用，读取方无需加锁
+        self._snapshot = {
+            'server_info': {
+                'hostname': static['hostname'],
+                'platform': static['platform'],
+                'architecture': static['architecture'],
+                'processor': cpuinfo['model'] or platform.processor(),
+                'boot_time': datetime.fromtimestamp(static['boot_time']),
+                'uptime': format_duration(uptime),
+            },
+            'cpu_info': {
+                'physical_cores': cpuinfo['physical_cores'],
+                'logical_cores': static['logical_cores'],
+                'current_frequency': cpuinfo['current_frequency'],
+                'min_frequency': static['min_frequency'],
+                'max_frequency': static['max_frequency'],
+                'usage_percent': usage[0],
+                'usage_per_core': usage[1:],
+            },
+            'memory_info': memory,
+            'disk_info': state['disks'],
+            'network_info': net,
+            'top_processes': state['top'],
+            'timestamp': datetime.fromtimestamp(ts),
+        }
+
+    def _top_processes(self, procs, previous, elapsed, mem_total, boot_time) -> list:
+        rows = []
+        for pid, (name, status, cpu_time, start, rss) in procs.items():
+            before = previous.get(pid)
+            # pid 复用时启动时刻不同，按新进程处理
+            delta = cpu_time - before[2] if before and before[3] == start else 0
+            rows.append((delta / _CLK_TCK / elapsed * 100, rss, pid, name, status, start))
+        rows.sort(reverse=True)
+        result = []
+        for cpu_percent, rss, pid, name, status, start in rows[:TOP_PROCESSES]:
+            result.append({
+                'pid': pid,
+                'name': name,
+                'username': _process_owner(pid, self._uids),
+                'status': _STATUS.get(status, status),
+                'cpu_percent': round(cpu_percent, 1),
+                'memory_percent': round(rss / mem_total * 100, 2) if mem_total else 0.0,
+                'memory_info': rss,
+                'create_time': datetime.fromtimestamp(boot_time + start / _CLK_TCK),
+                'cmdline': _process_cmdline(pid),
+            })
+        return result
+
+    # ---- 读取（不读取 /proc） ----
+
+    def snapshot(self):
+        self.start()
+        return self._current()
+
+    def history(self, names, resolution='1s', since=0) -> dict:
+        self.start()
+        self._current()
+        with self._lock:
+            return {name: self.series[name].buffers[resolution].items(since) for name in names}
+
+
+server_monitor = ServerMonitor()
@@ -0,0 +1,375 @@
+# -*- coding: utf-8 -*-
+"""在线会话登记
+
+登录时写入一条会话记录（一个 token 一条），之后经过 login_required 的请求只在内存中
+记下最后活动时间，每 SESSION_FLUSH_INTERVAL 秒由当时的请求线程用一条 executemany UPDATE 批量写回。
+
+空闲过期用时间轮：会话按截止时间落入槽位，续期时不移动，槽位到期时再核对真实截止时间，
+未到期的重新入轮。每个会话每个空闲周期只被检查一次，不需要扫描全部会话。
+
+在线数、今日峰值、今日登录数、平均在线时长均为增量维护的计数，统计接口 O(1)；
+多 worker 部署时这些计数是本进程的观测值，列表与强制下线以数据库为准。
+"""
+import ipaddress
+import threading
+import time
+from datetime import date, datetime
+
+from flask import request
+
+from app.models import db
+from app.models.session import OnlineSession
+from app.models.user import User
+
+# 最后活动在该秒数内的会话视为活跃
+ACTIVE_WINDOW = 300
+
+
+class TimerWheel:
+    """单层时间轮，截止时间超出一圈的键在到期检查时由调用方重新入轮"""
+
+    def __init__(self, tick=1.0, size=512):
+        self.tick = tick
+        self.size = size
+        self._slots = [set() for _ in range(size)]
+        self._cursor = int(time.time() // tick)
+
+    def schedule(self, key, deadline: float):
+        index = max(int(deadline // self.tick), self._cursor + 1)
+        self._slots[index % self.size].add(key)
+
+    def advance(self, now: float) -> list:
+        """推进到 now，返回经过的槽位中的全部键"""
+        current = int(now // self.tick)
+        due = []
+        for index in range(self._cursor + 1, min(current, self._cursor + self.size) + 1):
+            slot = self._slots[index % self.size]
+            if slot:
+                due.extend(slot)
+                slot.clear()
+        self._cursor = max(current, self._cursor)
+        return due
+
+
+class _Session:
+    __slots__ = ('user_id', 'login_at', 'last_at', 'exp')
+
+    def __init__(self, user_id, login_at, last_at, exp):
+        self.user_id = user_id
+        self.login_at = login_at
+        self.last_at = last_at
+        self.exp = exp
+
+
+def parse_user_agent(ua: str):
+    """从 User-Agent 粗略识别浏览器与操作系统"""
+    if 'Edg/' in ua:
+        browser = 'Edge'
+    elif 'OPR/' in ua or 'Opera' in ua:
+        browser = 'Opera'
+    elif 'Firefox/' in ua:
+        browser = 'Firefox'
+    elif 'Chrome/' in ua:
+        browser = 'Chrome'
+    elif 'Safari/' in ua:
+        browser = 'Safari'
+    elif 'MSIE' in ua or 'Trident/' in ua:
+        browser = 'IE'
+    else:
+        browser = 'Unknown'
+
+    if 'Windows' in ua:
+        os_name = 'Windows'
+    elif 'Android' in ua:
+        os_name = 'Android'
+    elif 'iPhone' in ua or 'iPad' in ua:
+        os_name = 'iOS'
+    elif 'Mac OS X' in ua:
+        os_name = 'macOS'
+    elif 'Linux' in ua:
+        os_name = 'Linux'
+    else:
+        os_name = 'Unknown'
+    return browser, os_name
+
+
+def ip_location(ip: str) -> str:
+    try:
+        return '内网IP' if ipaddress.ip_address(ip).is_private else '未知'
+    except ValueError:
+        return '未知'
+
+
+def format_duration(seconds: float) -> str:
+    seconds = int(seconds)
+    if seconds < 60:
+        return f'{seconds}秒'
+    hours, minutes = divmod(seconds // 60, 60)
+    return f'{hours}小时{minutes}分钟' if hours else f'{minutes}分钟'
+
+
+def client_ip() -> str:
+    """客户端 IP：经过可信代理时已由 ProxyFix（PROXY_TRUSTED_HOPS）改写 remote_addr，不直接读取请求头"""
+    return request.remote_addr or ''
+
+
+class SessionRegistry:
+
+    def __init__(self):
+        self.idle_timeout = 1800
+        self.flush_interval = 10
+        self._reset()
+
+    def init_app(self, app):
+        from app.utils.jwt_utils import register_activity_hook
+        self.idle_timeout = app.config.get('SESSION_IDLE_TIMEOUT', self.idle_timeout)
+        self.flush_interval = app.config.get('SESSION_FLUSH_INTERVAL', self.flush_interval)
+        self._reset()
+        register_activity_hook(self.touch)
+
+    def _reset(self):
+        self._sessions = {}
+        self._user_sessions = {}
+        self._pending = {}
+        self._learned = {}
+        # 在线会话 login_at / last_at 之和，平均在线时长 = (sum_last - sum_login) / 在线数
+        self._sum_login = 0.0
+        self._sum_last = 0.0
+        self._day = date.today()
+        self._new_today = 0
+        self._peak_today = 0
+        # 一圈时间轮覆盖一个空闲周期，过期精度约为一个 tick
+        self._wheel = TimerWheel(tick=max(1.0, self.idle_timeout / 512), size=512)
+        self._flushed_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+    # ---- 计数维护（调用方持有 _lock） ----
+
+    def _roll_day(self):
+        today = date.today()
+        if today != self._day:
+            self._day = today
+            self._new_today = 0
+            self._peak_today = len(self._sessions)
+
+    def _deadline(self, session: _Session) -> float:
+        return min(session.last_at + self.idle_timeout, session.exp)
+
+    def _add(self, jti, session: _Session):
+        self._sessions[jti] = session
+        self._user_sessions[session.user_id] = self._user_sessions.get(session.user_id, 0) + 1
+        self._sum_login += session.login_at
+        self._sum_last += session.last_at
+        self._roll_day()
+        self._peak_today = max(self._peak_today, len(self._sessions))
+        self._wheel.schedule(jti, self._deadline(session))
+
+    def _remove(self, jti):
+        session = self._sessions.pop(jti, None)
+        if session is None:
+            return
+        self._pending.pop(jti, None)
+        self._learned.pop(jti, None)
+        count = self._user_sessions[session.user_id] - 1
+        if count:
+            self._user_sessions[session.user_id] = count
+        else:
+            del self._user_sessions[session.user_id]
+        self._sum_login -= session.login_at
+        self._sum_last -= session.last_at
+
+    # ---- 会话登记 ----
+
+    def login(self, payload: dict):
+        """登录成功后登记会话，写入一条会话记录"""
+        now = time.time()
+        ua = request.headers.get('User-Agent', '')[:500]
+        db.session.add(OnlineSession(
+            session_id=payload['jti'],
+            user_id=payload['sub'],
+            ip_address=client_ip()[:64],
+            user_agent=ua,
+            login_time=datetime.fromtimestamp(now),
+            last_activity=datetime.fromtimestamp(now),
+            expires_at=payload['exp'],
+        ))
+        db.session.commit()
+        with self._lock:
+            self._add(payload['jti'], _Session(payload['sub'], now, now, payload['exp']))
+            self._new_today += 1
+
+    def touch(self, payload: dict):
+        """记录一次活动，只改内存，到期时顺带批量写回"""
+        jti = payload.get('jti')
+        if not jti:
+            return
+        now = time.time()
+        with self._lock:
+            session = self._sessions.get(jti)
+            if session is None:
+                # 其它 worker 登录、本进程重启前签发或空闲过期后再次活动的 token，写回时补建缺失的记录
+                login_at = payload.get('iat', now)
+                self._add(jti, _Session(payload['sub'], login_at, now, payload['exp']))
+                self._learned[jti] = {
+                    'session_id': jti,
+                    'user_id': payload['sub'],
+                    'ip_address': client_ip()[:64],
+                    'user_agent': request.headers.get('User-Agent', '')[:500],
+                    'login_time': datetime.fromtimestamp(login_at),
+                    'last_activity': datetime.fromtimestamp(now),
+                    'expires_at': payload['exp'],
+                }
+            else:
+                self._sum_last += now - session.last_at
+                session.last_at = now
+            self._pending[jti] = now
+        if time.monotonic() - self._flushed_at >= self.flush_interval:
+            self.flush()
+
+    def flush(self, block=False):
+        """把积攒的最后活动时间批量写回，并处理时间轮上到期的会话"""
+        if not self._flush_lock.acquire(blocking=block):
+            return
+        try:
+            self._flushed_at = time.monotonic()
+            now = time.time()
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                learned, self._learned = self._learned, {}
+                expired = []
+                for jti in self._wheel.advance(now):
+                    session = self._sessions.get(jti)
+                    if session is None:
+                        continue
+                    deadline = self._deadline(session)
+                    if deadline > now:
+                        self._wheel.schedule(jti, deadline)
+                    else:
+                        expired.append(jti)
+                        self._remove(jti)
+
+            table = OnlineSession.__table__
+            with db.engine.begin() as conn:
+                if learned:
+                    existing = set(conn.execute(
+                        db.select(table.c.session_id).where(table.c.session_id.in_(list(learned)))
+                    ).scalars())
+                    missing = [row for jti, row in learned.items() if jti not in existing]
+                    if missing:
+                        conn.execute(table.insert(), missing)
+                if pending:
+                    conn.execute(
+                        table.update()
+                        .where(table.c.session_id == db.bindparam('sid'))
+                        .values(last_activity=db.bindparam('ts')),
+                        [{'sid': jti, 'ts': datetime.fromtimestamp(ts)} for jti, ts in pending.items()],
+                    )
+                if expired:
+                    # 其它 worker 上仍有活动的会话不删除
+                    conn.execute(table.delete().where(
+                        table.c.session_id.in_(expired),
+                        db.or_(table.c.last_activity < datetime.fromtimestamp(now - self.idle_timeout),
+                               table.c.expires_at <= now),
+                    ))
+        finally:
+            self._flush_lock.release()
+
+    def cleanup(self) -> int:
+        """立即处理到期会话，并删除所有已空闲超时或 token 已过期的记录（包括已退出的 worker 留下的），返回删除数"""
+        self.flush(block=True)
+        now = time.time()
+        table = OnlineSession.__table__
+        with db.engine.begin() as conn:
+            result = conn.execute(table.delete().where(db.or_(
+                table.c.last_activity < datetime.fromtimestamp(now - self.idle_timeout),
+                table.c.expires_at <= now,
+            )))
+        return result.rowcount
+
+    def remove(self, *session_ids):
+        """删除会话记录（登出、强制下线时调用，token 的吊销由调用方负责）"""
+        if not session_ids:
+            return
+        db.session.execute(db.delete(OnlineSession).where(OnlineSession.session_id.in_(session_ids)))
+        db.session.commit()
+        with self._lock:
+            for jti in session_ids:
+                self._remove(jti)
+
+    def force_offline(self, user_id, session_id=None) -> int:
+        """吊销用户的会话 token 并删除会话记录，不指定 session_id 时下线该用户全部会话"""
+        from app.utils.token_denylist import token_denylist
+        query = db.select(OnlineSession.session_id, OnlineSession.expires_at).where(OnlineSession.user_id == user_id)
+        if session_id:
+            query = query.where(OnlineSession.session_id == session_id)
+        rows = db.session.execute(query).all()
+        for jti, exp in rows:
+            token_denylist.revoke({'jti': jti, 'exp': exp})
+        if not session_id:
+            # 覆盖没有会话记录的旧 token
+            token_denylist.revoke_user(user_id)
+        self.remove(*(jti for jti, _ in rows))
+        return len(rows)
+
+    def list(self, page=1, page_size=20) -> dict:
+        """按最后活动时间倒序分页列出在线会话"""
+        self.flush(block=True)
+        now = time.time()
+        conditions = (
+            OnlineSession.last_activity >= datetime.fromtimestamp(now - self.idle_timeout),
+            OnlineSession.expires_at > now,
+        )
+        total = db.session.execute(
+            db.select(db.func.count()).select_from(OnlineSession).where(*conditions)
+        ).scalar()
+        rows = db.session.execute(
+            db.select(OnlineSession, User.username, User.nickname, User.avatar)
+            .join(User, User.id == OnlineSession.user_id)
+            .where(*conditions)
+            .order_by(OnlineSession.last_activity.desc())
+            .offset((page - 1) * page_size)
+            .limit(page_size)
+        ).all()
+
+        items = []
+        for s, username, nickname, avatar in rows:
+            browser, os_name = parse_user_agent(s.user_agent)
+            items.append({
+                'user_id': s.user_id,
+                'username': username,
+                'nickname': nickname,
+                'avatar': avatar,
+                'login_time': s.login_time,
+                'last_activity': s.last_activity,
+                'ip_address': s.ip_address,
+                'location': ip_location(s.ip_address),
+                'browser': browser,
+                'os': os_name,
+                'user_agent': s.user_agent,
+                'session_id': s.session_id,
+                'is_active': now - s.last_activity.timestamp() < ACTIVE_WINDOW,
+                'duration': format_duration(s.last_activity.timestamp() - s.login_time.timestamp()),
+            })
+        return {
+            'items': items,
+            'total': total,
+            'page': page,
+            'page_size': page_size,
+            'pages': (total + page_size - 1) // page_size,
+        }
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._roll_day()
+            online = len(self._sessions)
+            return {
+                'total_online': online,
+                'active_users': len(self._user_sessions),
+                'new_today': self._new_today,
+                'peak_today': self._peak_today,
+                'avg_duration': format_duration((self._sum_last - self._sum_login) / online if online else 0),
+            }
+
+
+session_registry = SessionRegistry()
@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+"""SQL 剖析与 N+1 检测
+
+开启后记录请求执行的每条 SQL 的耗时与调用位置（app 包内最近的一帧），
+按归一化后的语句分组，同一语句在同一位置执行次数达到阈值即标记为疑似 N+1。
+响应头 X-SQL-Profile 给出摘要，完整结果在 /debug/requests/<id> 查看（最近 SQL_PROFILER_KEEP 个）。
+
+SQL_PROFILER 配置：off 关闭；header 仅对带 X-SQL-Profile 请求头的请求开启
+（配置了 SQL_PROFILER_TOKEN 时请求头的值必须与之相同，适合灰度环境）；always 对所有请求开启（开发环境）。
+
+测试中可用 assert_max_queries 断言一段代码（例如一次 test_client 请求）执行的 SQL 条数上限。
+"""
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.utils.cache import LRUCache
+from app.utils.response import success, fail
+
+HEADER = 'X-SQL-Profile'
+_APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_THIS_FILE = os.path.abspath(__file__)
+# IN 列表展开后的占位符个数随参数变化，归一化后才能归为同一语句
+_IN_LIST = re.compile(r'\((?:\s*(?:\?|%s|%\(\w+\)s|:\w+)\s*,)+\s*(?:\?|%s|%\(\w+\)s|:\w+)\s*\)')
+
+_local = threading.local()
+
+
+def normalize(statement: str) -> str:
+    return _IN_LIST.sub('(...)', ' '.join(statement.split()))
+
+
+def _call_site() -> str:
+    """调用栈中 app 包内、本模块以外最近的一帧"""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = os.path.abspath(frame.f_code.co_filename)
+        if filename.startswith(_APP_DIR) and filename != _THIS_FILE:
+            return f'{os.path.relpath(filename, os.path.dirname(_APP_DIR))}:{frame.f_lineno} in {frame.f_code.co_name}'
+        frame = frame.f_back
+    return '<unknown>'
+
+
+class QueryProfile:
+
+    def __init__(self, label='', threshold=5):
+        self.id = uuid.uuid4().hex
+        self.label = label
+        self.threshold = threshold
+        self.started = time.time()
+        # [(语句, 耗时秒, 调用位置)]
+        self.statements = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    @property
+    def total_seconds(self) -> float:
+        return sum(s[1] for s in self.statements)
+
+    def groups(self) -> list:
+        """按归一化语句分组，执行次数多的在前"""
+        groups = {}
+        for statement, seconds, site in self.statements:
+            group = groups.setdefault(normalize(statement), {'count': 0, 'seconds': 0.0, 'sites': {}})
+            group['count'] += 1
+            group['seconds'] += seconds
+            group['sites'][site] = group['sites'].get(site, 0) + 1
+        return sorted(
+            ({'statement': k, 'count': v['count'], 'total_ms': round(v['seconds'] * 1000, 3), 'sites': v['sites']}
+             for k, v in groups.items()),
+            key=lambda item: item['count'], reverse=True,
+        )
+
+    def n_plus_one(self, groups=None) -> list:
+        """同一语句在同一调用位置执行次数达到阈值的分组"""
+        return [
+            {'statement': group['statement'], 'site': site, 'count': count}
+            for group in (groups if groups is not None else self.groups())
+            for site, count in group['sites'].items() if count >= self.threshold
+        ]
+
+    def summary(self) -> str:
+        return f'id={self.id}; count={self.count}; time={self.total_seconds * 1000:.2f}ms; ' \
+               f'n+1={len(self.n_plus_one())}'
+
+    def to_dict(self) -> dict:
+        groups = self.groups()
+        return {
+            'id': self.id,
+            'label': self.label,
+            'started': self.started,
+            'count': self.count,
+            'total_ms': round(self.total_seconds * 1000, 3),
+            'n_plus_one': self.n_plus_one(groups),
+            'groups': groups,
+            'statements': [
+                {'statement': s, 'ms': round(seconds * 1000, 3), 'site': site}
+                for s, seconds, site in self.statements
+            ],
+        }
+
+    def report(self) -> str:
+        lines = [f'{self.count} 条 SQL，{self.total_seconds * 1000:.2f}ms']
+        for group in self.groups():
+            lines.append(f'  x{group["count"]} {group["statement"][:200]}')
+            for site, count in group['sites'].items():
+                lines.append(f'      {count} 次 @ {site}')
+        return '\n'.join(lines)
+
+
+def _stack() -> list:
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if getattr(_local, 'stack', None):
+        conn.info.setdefault('profiler_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stack = getattr(_local, 'stack', None)
+    if not stack:
+        return
+    starts = conn.info.get('profiler_start')
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    entry = (statement, elapsed, _call_site())
+    for profile in stack:
+        profile.statements.append(entry)
+
+
+def _install_listeners():
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+@contextmanager
+def profile_queries(label='', threshold=5):
+    """在代码块内记录当前线程执行的 SQL，产出 QueryProfile"""
+    _install_listeners()
+    profile = QueryProfile(label, threshold)
+    stack = _stack()
+    stack.append(profile)
+    try:
+        yield profile
+    finally:
+        stack.remove(profile)
+
+
+@contextmanager
+def assert_max_queries(limit, label=''):
+    """断言代码块内执行的 SQL 不超过 limit 条，超出时 AssertionError 附带分组报告
+
+        with assert_max_queries(3):
+            client.get('/api/v1/system/user?page=1', headers=headers)
+    """
+    with profile_queries(label) as profile:
+        yield profile
+    if profile.count > limit:
+        raise AssertionError(f'{label or "代码块"}执行了 {profile.count} 条 SQL，上限 {limit}\n{profile.report()}')
+
+
+class SQLProfiler:
+
+    def __init__(self):
+        self.mode = 'off'
+        self.token = ''
+        self.threshold = 5
+        self.recent = LRUCache(maxsize=100, ttl=3600)
+
+    def init_app(self, app):
+        self.mode = app.config.get('SQL_PROFILER', 'off')
+        self.token = app.config.get('SQL_PROFILER_TOKEN', '')
+        self.threshold = app.config.get('SQL_PROFILER_N1_THRESHOLD', self.threshold)
+        self.recent = LRUCache(maxsize=app.config.get('SQL_PROFILER_KEEP', 100), ttl=3600)
+        if self.mode == 'off':
+            return
+        _install_listeners()
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+
+        from app.utils.jwt_utils import login_required
+        app.add_url_rule('/debug/requests', 'debug_requests', login_required(self._list_view))
+        app.add_url_rule('/debug/requests/<profile_id>', 'debug_request', login_required(self._detail_view))
+
+    def _wanted(self) -> bool:
+        if self.mode == 'always':
+            return True
+        value = request.headers.get(HEADER)
+        return value is not None and (not self.token or value == self.token)
+
+    def _before_request(self):
+        if request.path.startswith('/debug/') or not self._wanted():
+            return
+        profile = QueryProfile(f'{request.method} {request.full_path.rstrip("?")}', self.threshold)
+        _stack().append(profile)
+        g.sql_profile = profile
+
+    def _after_request(self, response):
+        profile = g.get('sql_profile')
+        if profile is not None:
+            self.recent.set(profile.id, profile)
+            response.headers[HEADER] = profile.summary()
+        return response
+
+    @staticmethod
+    def _teardown_request(exc):
+        profile = g.pop('sql_profile', None)
+        if profile is not None:
+            _stack().remove(profile)
+
+    def _list_view(self):
+        items = []
+        for profile_id in self.recent.keys():
+            profile = self.recent.get(profile_id)
+            if profile is not None:
+                items.append({'id': profile.id, 'label': profile.label, 'count': profile.count,
+                              'n_plus_one': len(profile.n_plus_one())})
+        return success(items[::-1])
+
+    def _detail_view(self, profile_id):
+        profile = self.recent.get(profile_id)
+        if profile is None:
+            return fail('记录不存在或已过期', 404)
+        return success(profile.to_dict())
+
+
+sql_profiler = SQLProfiler()
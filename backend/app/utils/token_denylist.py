@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+"""token 吊销
+
+- 单个 token：按 jti 加入黑名单，条目在 token 的 exp 之后自动清除
+- 按用户：记录水位时间，iat 早于该时间的 token 全部失效（禁用、删除、重置密码时使用）
+
+黑名单前面有一层布隆过滤器：绝大多数未吊销的 token 在过滤器中直接判定不存在，
+不查字典也不查库。存储默认为数据库（sql），其它 worker 的吊销在 TOKEN_DENYLIST_REFRESH 秒内生效；
+进程内存储（memory）的吊销只对本进程有效，仅用于单进程部署。
+
+数据库存储的读取不写库：过期条目由吊销时抽样清理，或定时执行 flask --app main prune-token-denylist。
+"""
+import heapq
+import random
+import threading
+import time
+
+import click
+from flask.cli import with_appcontext
+
+from app.models import db
+from app.models.token import RevokedToken, UserTokenWatermark
+
+
+class BloomFilter:
+    """位数组布隆过滤器，元素为 uuid4 十六进制字符串
+
+    jti 本身是随机数，直接取其不同位段做双重哈希（Kirsch-Mitzenmacher），不再额外计算摘要。
+    """
+
+    def __init__(self, bits=1 << 20, hashes=4):
+        self.bits = bits
+        self.hashes = hashes
+        self._array = bytearray(bits // 8)
+
+    def _indexes(self, jti: str):
+        value = int(jti, 16)
+        # uuid4 的版本位、变体位在 62~79 位之间，两段哈希都避开它们
+        h1 = value & 0xFFFFFFFFFFFF
+        h2 = (value >> 80) | 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.bits
+
+    def add(self, jti: str):
+        for index in self._indexes(jti):
+            self._array[index >> 3] |= 1 << (index & 7)
+
+    def __contains__(self, jti: str) -> bool:
+        for index in self._indexes(jti):
+            if not self._array[index >> 3] & (1 << (index & 7)):
+                return False
+        return True
+
+
+class MemoryStore:
+    """进程内存储"""
+
+    def __init__(self):
+        self._entries = {}
+        self._expiry = []
+        self._watermarks = {}
+
+    def add(self, jti: str, exp: float):
+        self._entries[jti] = exp
+        heapq.heappush(self._expiry, (exp, jti))
+
+    def contains(self, jti: str) -> bool:
+        exp = self._entries.get(jti)
+        return exp is not None and exp > time.time()
+
+    def set_watermarks(self, user_ids, ts: float):
+        for user_id in user_ids:
+            self._watermarks[user_id] = ts
+
+    def prune(self, watermark_before: float) -> int:
+        now = time.time()
+        removed = 0
+        while self._expiry and self._expiry[0][0] <= now:
+            _, jti = heapq.heappop(self._expiry)
+            if self._entries.get(jti, now + 1) <= now:
+                del self._entries[jti]
+                removed += 1
+        for user_id in [uid for uid, ts in self._watermarks.items() if ts <= watermark_before]:
+            del self._watermarks[user_id]
+        return removed
+
+    def load(self):
+        """清除过期条目，返回 (有效 jti 列表, 用户水位字典)"""
+        self.prune(float('-inf'))
+        return list(self._entries), dict(self._watermarks)
+
+
+class SQLStore:
+    """数据库存储，多 worker 共享"""
+
+    # 每次吊销以该概率顺带清理过期条目
+    PRUNE_SAMPLE = 0.01
+
+    def add(self, jti: str, exp: float):
+        db.session.merge(RevokedToken(jti=jti, exp=exp))
+        if random.random() < self.PRUNE_SAMPLE:
+            db.session.execute(db.delete(RevokedToken).where(RevokedToken.exp <= time.time()))
+        db.session.commit()
+
+    def contains(self, jti: str) -> bool:
+        return db.session.execute(
+            db.select(RevokedToken.jti).where(RevokedToken.jti == jti, RevokedToken.exp > time.time())
+        ).first() is not None
+
+    def set_watermarks(self, user_ids, ts: float):
+        """一次删除、一次批量插入，整批只提交一次"""
+        user_ids = list(dict.fromkeys(user_ids))
+        db.session.execute(db.delete(UserTokenWatermark).where(UserTokenWatermark.user_id.in_(user_ids)))
+        db.session.execute(
+            db.insert(UserTokenWatermark), [{'user_id': uid, 'not_before': ts} for uid in user_ids]
+        )
+        db.session.commit()
+
+    def prune(self, watermark_before: float) -> int:
+        removed = db.session.execute(db.delete(RevokedToken).where(RevokedToken.exp <= time.time())).rowcount
+        db.session.execute(db.delete(UserTokenWatermark).where(UserTokenWatermark.not_before <= watermark_before))
+        db.session.commit()
+        return removed
+
+    def load(self):
+        """只读：过期条目留在表里，由 prune 清除"""
+        jtis = db.session.execute(
+            db.select(RevokedToken.jti).where(RevokedToken.exp > time.time())
+        ).scalars().all()
+        watermarks = dict(db.session.execute(
+            db.select(UserTokenWatermark.user_id, UserTokenWatermark.not_before)
+        ).all())
+        return jtis, watermarks
+
+
+STORES = {'memory': MemoryStore, 'sql': SQLStore}
+
+
+class TokenDenylist:
+
+    def __init__(self):
+        self.store = MemoryStore()
+        self.refresh = 5
+        self.bloom_bits = 1 << 20
+        self.max_age = 24 * 3600
+        self._bloom = BloomFilter(self.bloom_bits)
+        self._watermarks = {}
+        self._loaded_at = float('-inf')
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        from app.utils.jwt_utils import register_revocation_check
+        self.store = STORES[app.config.get('TOKEN_DENYLIST_STORE', 'sql')]()
+        self.refresh = app.config.get('TOKEN_DENYLIST_REFRESH', self.refresh)
+        self.bloom_bits = app.config.get('TOKEN_BLOOM_BITS', self.bloom_bits)
+        self.max_age = app.config['JWT_EXPIRE_HOURS'] * 3600
+        self._bloom = BloomFilter(self.bloom_bits)
+        self._watermarks = {}
+        self._loaded_at = float('-inf')
+        register_revocation_check(self.is_revoked)
+        app.cli.add_command(prune_token_denylist)
+
+    def _reload(self):
+        """从存储重建布隆过滤器与水位（只取未过期条目，过滤器随之收缩）"""
+        with self._lock:
+            if time.monotonic() - self._loaded_at < self.refresh:
+                return
+            jtis, watermarks = self.store.load()
+            bloom = BloomFilter(self.bloom_bits)
+            for jti in jtis:
+                bloom.add(jti)
+            # 超过 token 最长有效期的水位不会再命中任何 token
+            cutoff = time.time() - self.max_age
+            self._watermarks = {uid: ts for uid, ts in watermarks.items() if ts > cutoff}
+            self._bloom = bloom
+            self._loaded_at = time.monotonic()
+
+    def is_revoked(self, payload: dict) -> bool:
+        if time.monotonic() - self._loaded_at >= self.refresh:
+            self._reload()
+        if self._watermarks:
+            not_before = self._watermarks.get(payload['sub'])
+            if not_before is not None and payload.get('iat', 0) < not_before:
+                return True
+        jti = payload.get('jti')
+        if not jti or jti not in self._bloom:
+            return False
+        return self.store.contains(jti)
+
+    def revoke(self, payload: dict):
+        """吊销单个 token"""
+        jti = payload.get('jti')
+        if not jti:
+            return
+        self.store.add(jti, payload['exp'])
+        self._bloom.add(jti)
+
+    def revoke_user(self, *user_ids):
+        """使这些用户当前已签发的 token 全部失效"""
+        if not user_ids:
+            return
+        now = time.time()
+        self.store.set_watermarks(user_ids, now)
+        for user_id in user_ids:
+            self._watermarks[user_id] = now
+
+    def prune(self) -> int:
+        """清除存储中已过期的 jti 与超过 token 最长有效期的水位，返回清除的 jti 数"""
+        return self.store.prune(time.time() - self.max_age)
+
+
+token_denylist = TokenDenylist()
+
+
+@click.command('prune-token-denylist')
+@with_appcontext
+def prune_token_denylist():
+    """清除已过期的 token 吊销记录（建议定时执行）"""
+    removed = token_denylist.prune()
+    click.echo(f'已清除过期 token 吊销记录：{removed}')
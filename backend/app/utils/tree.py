@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+"""平铺节点（parent_id 关联）与树之间的转换，菜单、部门共用"""
+
+
+def build_tree(nodes, key='id', parent_key='parent_id') -> list:
+    """把平铺的节点（dict，已按排序字段排好）挂接成树，节点增加 children 字段
+
+    先建 id 索引再遍历一次，父节点不存在的节点作为根。
+    """
+    index = {node[key]: node for node in nodes}
+    roots = []
+    for node in nodes:
+        node['children'] = []
+    for node in nodes:
+        parent = index.get(node[parent_key])
+        (parent['children'] if parent is not None and parent is not node else roots).append(node)
+    return roots
+
+
+def descendant_ids(nodes, root_id, key='id', parent_key='parent_id') -> set:
+    """root_id 的全部子孙节点 id（不含自身）"""
+    children = {}
+    for node in nodes:
+        children.setdefault(node[parent_key], []).append(node[key])
+    result, stack = set(), [root_id]
+    while stack:
+        for child in children.get(stack.pop(), ()):
+            if child not in result:
+                result.add(child)
+                stack.append(child)
+    return result
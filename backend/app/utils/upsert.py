@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""计数类数据的原子累加
+
+先 UPDATE、未命中再 INSERT 的写法在两个事务同时写入同一个新键时会有一方主键冲突，
+这里按方言生成一条 INSERT ... ON DUPLICATE KEY UPDATE / ON CONFLICT DO UPDATE。
+"""
+from app.models import db
+
+
+def upsert_increment(table, keys: dict, deltas: dict, conn=None):
+    """keys 对应的行不存在时以 deltas 为初值插入，存在时把 deltas 累加到对应列
+
+    :param table: Table 对象（模型用 Model.__table__）
+    :param keys: 主键或唯一键列名 -> 值
+    :param deltas: 计数列名 -> 增量
+    :param conn: 在该连接上执行，缺省使用 db.session（随会话事务提交）
+    """
+    executor = conn if conn is not None else db.session
+    dialect = conn.dialect.name if conn is not None else db.engine.dialect.name
+    values = {**keys, **deltas}
+    if dialect == 'mysql':
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(table).values(values)
+        stmt = stmt.on_duplicate_key_update({name: table.c[name] + stmt.inserted[name] for name in deltas})
+    elif dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(table).values(values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c[name] for name in keys],
+            set_={name: table.c[name] + stmt.excluded[name] for name in deltas},
+        )
+    else:
+        updated = executor.execute(
+            table.update()
+            .where(*(table.c[name] == value for name, value in keys.items()))
+            .values({name: table.c[name] + delta for name, delta in deltas.items()})
+        ).rowcount
+        if not updated:
+            executor.execute(table.insert().values(values))
+        return
+    executor.execute(stmt)
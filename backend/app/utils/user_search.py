@@ -0,0 +1,362 @@
+# -*- coding: utf-8 -*-
+"""用户关键字搜索
+
+get_users 的 keyword 过滤原先是 username/nickname 前后模糊 LIKE，无法走索引。
+这里按数据库方言选择可插拔的搜索后端，返回按相关度排序的用户 id：
+
+- fulltext：MySQL ngram 全文索引
+- fts5：SQLite FTS5 trigram 外部内容表，由触发器与 user 表保持同步
+- trigram：进程内三元组倒排索引，在用户增删改时同步
+- like：原有 LIKE 查询，作为兜底
+
+相关度排序规则统一为：用户名完全匹配 > 用户名前缀 > 昵称前缀 > 其余命中，同级按 id 倒序。
+
+全文索引、FTS5 表与触发器需要提前创建（大表上的 DDL 不能放在请求里执行）：
+    flask --app main init-search-index
+索引不存在时搜索退回 LIKE，每 RETRY_INTERVAL 秒重新检查一次，索引建好后无需重启即可生效。
+"""
+import logging
+import threading
+import time
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy.dialects.mysql import match as mysql_match
+
+from app.models import db
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+
+def _escape_like(keyword: str) -> str:
+    return keyword.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _relevance(keyword: str):
+    """相关度排序表达式，值越小越相关"""
+    prefix = _escape_like(keyword) + '%'
+    return db.case(
+        (User.username == keyword, 0),
+        (User.username.like(prefix, escape='\\'), 1),
+        (User.nickname.like(prefix, escape='\\'), 2),
+        else_=3,
+    )
+
+
+class LikeBackend:
+    """LIKE '%kw%' 全表扫描，兜底实现"""
+    name = 'like'
+
+    def ready(self) -> bool:
+        """索引是否已就绪，请求中调用，只做检查"""
+        return True
+
+    def create_index(self):
+        """创建索引（DDL），由 init-search-index 命令执行"""
+
+    def setup(self):
+        pass
+
+    def search(self, keyword: str, limit: int) -> list:
+        pattern = f'%{_escape_like(keyword)}%'
+        return db.session.execute(
+            db.select(User.id)
+            .where(User.enabled_flag == True, db.or_(
+                User.username.like(pattern, escape='\\'), User.nickname.like(pattern, escape='\\')
+            ))
+            .order_by(_relevance(keyword), User.id.desc())
+            .limit(limit)
+        ).scalars().all()
+
+    def index(self, *users):
+        pass
+
+    def remove(self, *user_ids):
+        pass
+
+    def reset(self):
+        pass
+
+
+class MySQLFulltextBackend(LikeBackend):
+    """MySQL ngram 全文索引（username, nickname）
+
+    索引由 init-search-index 命令创建（ALTER TABLE，大表上在维护窗口执行）。
+    关键字短于 ngram_token_size（默认 2）时退回 LIKE。
+    """
+    name = 'fulltext'
+    INDEX_NAME = 'ft_user_search'
+    MIN_LENGTH = 2
+
+    def ready(self) -> bool:
+        return bool(db.session.execute(db.text(
+            'SELECT COUNT(*) FROM information_schema.statistics '
+            'WHERE table_schema = DATABASE() AND table_name = :table AND index_name = :index'
+        ), {'table': User.__tablename__, 'index': self.INDEX_NAME}).scalar())
+
+    def create_index(self):
+        if not self.ready():
+            db.session.execute(db.text(
+                f'ALTER TABLE `{User.__tablename__}` '
+                f'ADD FULLTEXT INDEX {self.INDEX_NAME} (username, nickname) WITH PARSER ngram'
+            ))
+            db.session.commit()
+
+    def search(self, keyword: str, limit: int) -> list:
+        if len(keyword) < self.MIN_LENGTH:
+            return super().search(keyword, limit)
+        # 短语查询：ngram 分词后要求所有片段连续出现，等价于子串匹配
+        score = mysql_match(User.username, User.nickname, against='"' + keyword.replace('"', ' ') + '"')
+        score = score.in_boolean_mode()
+        return db.session.execute(
+            db.select(User.id)
+            .where(User.enabled_flag == True, score)
+            .order_by(_relevance(keyword), score.desc(), User.id.desc())
+            .limit(limit)
+        ).scalars().all()
+
+
+class SQLiteFTS5Backend(LikeBackend):
+    """SQLite FTS5 trigram 外部内容表，支持子串与前缀匹配，关键字少于 3 个字符时退回 LIKE
+
+    虚拟表与同步触发器由 init-search-index 命令创建。
+    """
+    name = 'fts5'
+    MIN_LENGTH = 3
+
+    def ready(self) -> bool:
+        return db.session.execute(db.text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'user_fts'"
+        )).first() is not None
+
+    def create_index(self):
+        if self.ready():
+            return
+        table = User.__tablename__
+        statements = [
+            f"CREATE VIRTUAL TABLE user_fts USING fts5("
+            f"username, nickname, content='{table}', content_rowid='id', tokenize='trigram')",
+            f"CREATE TRIGGER IF NOT EXISTS user_fts_ai AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO user_fts(rowid, username, nickname) VALUES (new.id, new.username, new.nickname); END",
+            f"CREATE TRIGGER IF NOT EXISTS user_fts_ad AFTER DELETE ON {table} BEGIN "
+            f"INSERT INTO user_fts(user_fts, rowid, username, nickname) "
+            f"VALUES ('delete', old.id, old.username, old.nickname); END",
+            f"CREATE TRIGGER IF NOT EXISTS user_fts_au AFTER UPDATE OF username, nickname ON {table} BEGIN "
+            f"INSERT INTO user_fts(user_fts, rowid, username, nickname) "
+            f"VALUES ('delete', old.id, old.username, old.nickname); "
+            f"INSERT INTO user_fts(rowid, username, nickname) VALUES (new.id, new.username, new.nickname); END",
+            "INSERT INTO user_fts(user_fts) VALUES ('rebuild')",
+        ]
+        for statement in statements:
+            db.session.execute(db.text(statement))
+        db.session.commit()
+
+    def search(self, keyword: str, limit: int) -> list:
+        if len(keyword) < self.MIN_LENGTH:
+            return super().search(keyword, limit)
+        fts = db.table('user_fts', db.column('rowid'))
+        return db.session.execute(
+            db.select(User.id)
+            .join(fts, fts.c.rowid == User.id)
+            .where(User.enabled_flag == True, db.text('user_fts MATCH :q').bindparams(
+                q='"' + keyword.replace('"', '""') + '"'
+            ))
+            .order_by(_relevance(keyword), db.text('bm25(user_fts)'), User.id.desc())
+            .limit(limit)
+        ).scalars().all()
+
+
+class TrigramBackend(LikeBackend):
+    """进程内三元组倒排索引
+
+    首次搜索时从数据库全量加载，之后在本进程的用户增删改时增量同步；
+    其它 worker 进程的写入在 refresh 秒后通过全量重建生效。
+    关键字少于 3 个字符时在内存中顺序扫描。
+    """
+    name = 'trigram'
+
+    def __init__(self, refresh=300):
+        self.refresh = refresh
+        self._docs = {}
+        self._postings = {}
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _grams(text: str) -> set:
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+
+    def _add(self, user_id, username, nickname):
+        doc = ((username or '').lower(), (nickname or '').lower())
+        self._docs[user_id] = doc
+        for gram in self._grams(doc[0]) | self._grams(doc[1]):
+            self._postings.setdefault(gram, set()).add(user_id)
+
+    def _discard(self, user_id):
+        doc = self._docs.pop(user_id, None)
+        if doc is None:
+            return
+        for gram in self._grams(doc[0]) | self._grams(doc[1]):
+            posting = self._postings.get(gram)
+            if posting is not None:
+                posting.discard(user_id)
+                if not posting:
+                    del self._postings[gram]
+
+    def setup(self):
+        rows = db.session.execute(
+            db.select(User.id, User.username, User.nickname).where(User.enabled_flag == True)
+        )
+        with self._lock:
+            self._docs, self._postings = {}, {}
+            for user_id, username, nickname in rows:
+                self._add(user_id, username, nickname)
+            self._loaded_at = time.monotonic()
+
+    def search(self, keyword: str, limit: int) -> list:
+        if self._loaded_at is None or time.monotonic() - self._loaded_at > self.refresh:
+            self.setup()
+
+        keyword = keyword.lower()
+        with self._lock:
+            grams = self._grams(keyword)
+            if grams:
+                postings = sorted((self._postings.get(g, set()) for g in grams), key=len)
+                candidates = set.intersection(*postings) if postings[0] else set()
+            else:
+                candidates = self._docs.keys()
+            ranked = []
+            for user_id in candidates:
+                username, nickname = self._docs[user_id]
+                if username == keyword:
+                    rank = 0
+                elif username.startswith(keyword):
+                    rank = 1
+                elif nickname.startswith(keyword):
+                    rank = 2
+                elif keyword in username or keyword in nickname:
+                    rank = 3
+                else:
+                    continue
+                ranked.append((rank, -user_id))
+        ranked.sort()
+        return [-neg_id for _, neg_id in ranked[:limit]]
+
+    def index(self, *users):
+        if self._loaded_at is None:
+            return
+        with self._lock:
+            for user in users:
+                self._discard(user.id)
+                if user.enabled_flag is not False:
+                    self._add(user.id, user.username, user.nickname)
+
+    def remove(self, *user_ids):
+        if self._loaded_at is None:
+            return
+        with self._lock:
+            for user_id in user_ids:
+                self._discard(user_id)
+
+    def reset(self):
+        self._loaded_at = None
+
+
+BACKENDS = {
+    LikeBackend.name: LikeBackend,
+    MySQLFulltextBackend.name: MySQLFulltextBackend,
+    SQLiteFTS5Backend.name: SQLiteFTS5Backend,
+    TrigramBackend.name: TrigramBackend,
+}
+
+
+class UserSearch:
+    """按配置选择搜索后端，首次使用时检查索引是否已创建，未创建或初始化失败时退回 LIKE"""
+
+    # 退回 LIKE 后重新检查索引的间隔秒数
+    RETRY_INTERVAL = 60
+
+    def __init__(self):
+        self.backend_name = 'auto'
+        self.limit = 1000
+        self._backend = None
+        self._fallback_at = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.backend_name = app.config.get('USER_SEARCH_BACKEND', self.backend_name)
+        self.limit = app.config.get('USER_SEARCH_LIMIT', self.limit)
+        self._backend = None
+        self._fallback_at = None
+        app.cli.add_command(init_search_index)
+
+    def _configured(self):
+        name = self.backend_name
+        if name == 'auto':
+            name = {'mysql': 'fulltext', 'sqlite': 'fts5'}.get(db.engine.dialect.name, 'like')
+        return BACKENDS[name]()
+
+    def _choose(self):
+        backend = self._configured()
+        try:
+            if not backend.ready():
+                logger.warning('用户搜索后端 %s 的索引未创建，退回 LIKE 查询（执行 flask init-search-index 创建）',
+                               backend.name)
+                self._fallback_at = time.monotonic()
+                return LikeBackend()
+            backend.setup()
+        except Exception:
+            db.session.rollback()
+            logger.exception('用户搜索后端 %s 初始化失败，退回 LIKE 查询', backend.name)
+            self._fallback_at = time.monotonic()
+            return LikeBackend()
+        self._fallback_at = None
+        return backend
+
+    @property
+    def backend(self):
+        fallback_at = self._fallback_at
+        if self._backend is None or (
+                fallback_at is not None and time.monotonic() - fallback_at > self.RETRY_INTERVAL):
+            with self._lock:
+                if self._backend is None or self._fallback_at == fallback_at:
+                    self._backend = self._choose()
+        return self._backend
+
+    def search(self, keyword: str, limit: int = None) -> list:
+        """返回按相关度排序的用户 id，最多 limit 个"""
+        return self.backend.search(keyword, limit or self.limit)
+
+    def create_index(self) -> str:
+        """创建所配置后端的索引，返回后端名称"""
+        backend = self._configured()
+        backend.create_index()
+        self._backend = None
+        return backend.name
+
+    def index(self, *users):
+        """用户新增或 username/nickname 变更后调用"""
+        if self._backend is not None:
+            self._backend.index(*users)
+
+    def remove(self, *user_ids):
+        """用户删除后调用"""
+        if self._backend is not None:
+            self._backend.remove(*user_ids)
+
+    def reset(self):
+        """批量写入用户后调用，进程内索引在下次搜索时全量重建"""
+        if self._backend is not None:
+            self._backend.reset()
+
+
+user_search = UserSearch()
+
+
+@click.command('init-search-index')
+@with_appcontext
+def init_search_index():
+    """创建用户关键字搜索索引（MySQL 全文索引 / SQLite FTS5 表），已存在时跳过"""
+    name = user_search.create_index()
+    click.echo(f'用户搜索索引已就绪：{name}')
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""登录压测：并发登录期间，对比登录接口与其它接口的 p99
+
+用法（在 backend 目录下）：
+    python -m benchmark.bench_login --duration 10 --login-threads 8 --other-threads 4
+"""
+import argparse
+import json
+import threading
+import time
+
+from benchmark.common import make_app, serve, call, summarize
+
+
+def seed_admin(app, password):
+    from app.models import db
+    from app.models.user import User
+    from app.utils.password import hash_password
+    with app.app_context():
+        db.session.add(User(username='admin', nickname='admin', password=hash_password(password)))
+        db.session.commit()
+
+
+def run(workers, args):
+    # 压测来自同一 IP，关闭登录限流
+    app = make_app(BCRYPT_WORKERS=workers, BCRYPT_ROUNDS=args.rounds, LOGIN_LIMIT_ENABLED=False)
+    seed_admin(app, '123456')
+    base_url, server = serve(app)
+
+    _, body, _ = call(f'{base_url}/api/v1/system/auth/login', 'POST', {'username': 'admin', 'password': '123456'})
+    token = body['data']['access_token']
+
+    login_latencies, other_latencies, rejected = [], [], []
+    deadline = time.perf_counter() + args.duration
+
+    def login_loop():
+        while time.perf_counter() < deadline:
+            status, _, elapsed = call(
+                f'{base_url}/api/v1/system/auth/login', 'POST', {'username': 'admin', 'password': '123456'}
+            )
+            (login_latencies if status == 200 else rejected).append(elapsed)
+
+    def other_loop():
+        while time.perf_counter() < deadline:
+            _, _, elapsed = call(f'{base_url}/api/v1/system/dict/type/list/all', token=token)
+            other_latencies.append(elapsed)
+
+    threads = [threading.Thread(target=login_loop) for _ in range(args.login_threads)]
+    threads += [threading.Thread(target=other_loop) for _ in range(args.other_threads)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    server.shutdown()
+
+    return {
+        'bcrypt_workers': workers,
+        'login': summarize(login_latencies, elapsed),
+        'login_rejected_503': len(rejected),
+        'other': summarize(other_latencies, elapsed),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--rounds', type=int, default=12)
+    parser.add_argument('--login-threads', type=int, default=8)
+    parser.add_argument('--other-threads', type=int, default=4)
+    parser.add_argument('--workers', type=int, nargs='+', default=[0, 4],
+                        help='要对比的 BCRYPT_WORKERS 取值，0 表示在请求线程内计算')
+    args = parser.parse_args()
+    print(json.dumps([run(w, args) for w in args.workers], indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""指标开销基准：同一接口在开启 / 关闭指标时的单请求耗时与吞吐
+
+两个应用交替各跑一轮，减少机器负载波动的影响。用法（在 backend 目录下）：
+    python -m benchmark.bench_metrics --repeat 5000 --rounds 5
+"""
+import argparse
+import json
+import time
+
+from benchmark.common import make_app, summarize
+
+URL = '/api/v1/system/dict/type/list/all'
+
+
+def build(enabled):
+    from app.utils.jwt_utils import generate_token
+    app = make_app(METRICS_ENABLED=enabled, AUDIT_ENABLED=False)
+    with app.app_context():
+        token = generate_token(1)
+    return app.test_client(), {'Authorization': f'Bearer {token}'}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=5000)
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    clients = {'metrics_on': build(True), 'metrics_off': build(False)}
+    latencies = {name: [] for name in clients}
+    for _ in range(args.rounds):
+        for name, (client, headers) in clients.items():
+            client.get(URL, headers=headers)
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                client.get(URL, headers=headers)
+                latencies[name].append(time.perf_counter() - start)
+
+    result = {name: summarize(values, sum(values)) for name, values in latencies.items()}
+    on, off = result['metrics_on']['rps'], result['metrics_off']['rps']
+    result['overhead_pct'] = round((off - on) / off * 100, 2) if off else 0
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
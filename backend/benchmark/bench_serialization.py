@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""列表接口序列化基准：对比标准库 json 与 orjson 下权限列表、用户列表的延迟
+
+用法（在 backend 目录下）：
+    python -m benchmark.bench_serialization --permissions 5000 --users 1000
+"""
+import argparse
+import json
+import time
+
+from benchmark.common import make_app, seed_users, summarize
+
+
+def seed_permissions(app, count):
+    from app.models import db
+    from app.models.role import Permission
+    with app.app_context():
+        db.session.execute(db.insert(Permission), [
+            {'permission_code': f'perm:{n}', 'permission_name': f'权限{n}', 'permission_type': 1 + n % 4,
+             'sort': n, 'enabled_flag': True}
+            for n in range(count)
+        ])
+        db.session.commit()
+
+
+def run(provider, args):
+    from app.utils.jwt_utils import generate_token
+
+    app = make_app(JSON_PROVIDER=provider)
+    seed_permissions(app, args.permissions)
+    seed_users(app, args.users)
+    with app.app_context():
+        token = generate_token(1)
+    client = app.test_client()
+    headers = {'Authorization': f'Bearer {token}'}
+
+    result = {'json_provider': type(app.json).__name__}
+    for name, url in (('permission_list', '/api/v1/system/permission'),
+                      ('user_list_100', '/api/v1/system/user?page_size=100&skipTotal=1')):
+        client.get(url, headers=headers)
+        latencies = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            client.get(url, headers=headers)
+            latencies.append(time.perf_counter() - start)
+        result[name] = summarize(latencies, sum(latencies))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--permissions', type=int, default=5000)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+    print(json.dumps([run('stdlib', args), run('orjson', args)], indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""部署模式压测：同一份 SQLite 测试数据，依次用 gunicorn 的各 worker 模型启动服务，经 HTTP 跑压测套件的场景
+
+用法（在 backend 目录下，需要安装 gunicorn；gevent、asgi 模式另需 gevent / uvicorn + asgiref）：
+    python -m benchmark.bench_serving --modes sync gthread gevent asgi --users 100000 --concurrency 32
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from benchmark.common import call
+from benchmark.suite import SCENARIOS, HTTPRequester, build, environment, login_tokens, run_scenario, scenarios
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(mode, db_uri, args):
+    port = free_port()
+    env = dict(
+        os.environ,
+        MYSQL_DATABASE_URI_SYNC=db_uri,
+        BCRYPT_ROUNDS=str(args.bcrypt_rounds),
+        BCRYPT_WORKERS='0',
+        LOGIN_LIMIT_ENABLED='false',
+        USER_SEARCH_BACKEND=args.search_backend,
+        SERVER_WORKER_CLASS=mode,
+        SERVER_BIND=f'127.0.0.1:{port}',
+        SERVER_LOG_LEVEL='warning',
+    )
+    if args.workers:
+        env['SERVER_WORKERS'] = str(args.workers)
+    proc = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py'],
+                            cwd=BACKEND_DIR, env=env)
+    base_url = f'http://127.0.0.1:{port}'
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            return None, proc
+        try:
+            if call(base_url + '/api/health/health')[0] == 200:
+                return base_url, proc
+        except OSError:
+            pass
+        time.sleep(0.2)
+    proc.terminate()
+    proc.wait(30)
+    return None, proc
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modes', nargs='+', choices=('sync', 'gthread', 'gevent', 'asgi'),
+                        default=['sync', 'gthread', 'gevent', 'asgi'])
+    parser.add_argument('--workers', type=int, default=0, help='每种模式的 worker 数，0 表示按 CPU 自动计算')
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--roles', type=int, default=200)
+    parser.add_argument('--permissions', type=int, default=5000)
+    parser.add_argument('--perms-per-role', type=int, default=50)
+    parser.add_argument('--roles-per-user', type=int, default=2)
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS,
+                        default=['login', 'userinfo', 'permissions', 'user_list', 'user_search'])
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--warmup', type=float, default=2)
+    parser.add_argument('--page-size', type=int, default=20)
+    parser.add_argument('--max-page', type=int, default=500)
+    parser.add_argument('--bcrypt-rounds', type=int, default=4)
+    parser.add_argument('--search-backend', default='auto')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    app, role_ids, perm_ids = build(args)
+    db_uri = app.config['SQLALCHEMY_DATABASE_URI']
+
+    report = {'environment': environment(args), 'modes': {}}
+    for mode in args.modes:
+        base_url, proc = start_server(mode, db_uri, args)
+        if base_url is None:
+            report['modes'][mode] = {'error': f'gunicorn 启动失败（退出码 {proc.returncode}）'}
+            continue
+        try:
+            requester = HTTPRequester(base_url)
+            makers = scenarios(args, role_ids, perm_ids, login_tokens(requester, args))
+            report['modes'][mode] = {name: run_scenario(requester, makers[name], args) for name in args.scenarios}
+        finally:
+            proc.terminate()
+            proc.wait(30)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
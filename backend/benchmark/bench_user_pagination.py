@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""用户列表分页基准：对比 OFFSET 分页与游标分页在第 1 页和深页上的延迟
+
+用法（在 backend 目录下）：
+    python -m benchmark.bench_user_pagination --users 1000000 --page-size 20 --deep-page 10000
+"""
+import argparse
+import json
+import time
+
+from benchmark.common import make_app, seed_users, summarize
+
+
+def timed(client, url, headers, repeat):
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        resp = client.get(url, headers=headers)
+        latencies.append(time.perf_counter() - start)
+        assert resp.status_code == 200, resp.get_json()
+    return summarize(latencies, sum(latencies))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=200000)
+    parser.add_argument('--page-size', type=int, default=20)
+    parser.add_argument('--deep-page', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    from app.models import db
+    from app.models.user import User
+    from app.utils.cursor import encode_cursor
+    from app.utils.jwt_utils import generate_token
+
+    app = make_app()
+    seed_users(app, args.users)
+    with app.app_context():
+        token = generate_token(1)
+        # 深页游标：定位到第 deep_page 页之前最后一行的 id
+        deep_id = db.session.execute(
+            db.select(User.id).where(User.enabled_flag == True).order_by(User.id.desc())
+            .offset((args.deep_page - 1) * args.page_size - 1).limit(1)
+        ).scalar()
+
+    client = app.test_client()
+    headers = {'Authorization': f'Bearer {token}'}
+    base = f'/api/v1/system/user?page_size={args.page_size}'
+    results = {
+        'users': args.users,
+        'page_size': args.page_size,
+        'deep_page': args.deep_page,
+        'offset_page_1': timed(client, f'{base}&page=1&skipTotal=1', headers, args.repeat),
+        'offset_deep_page': timed(client, f'{base}&page={args.deep_page}&skipTotal=1', headers, args.repeat),
+        'cursor_page_1': timed(client, f'{base}&cursor=', headers, args.repeat),
+        'cursor_deep_page': timed(client, f'{base}&cursor={encode_cursor("next", deep_id)}', headers, args.repeat),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""用户关键字搜索基准：对比 LIKE 与各搜索后端的单次搜索延迟
+
+用法（在 backend 目录下）：
+    python -m benchmark.bench_user_search --users 200000 --keywords user1234 昵称99 er12
+"""
+import argparse
+import json
+import time
+
+from benchmark.common import make_app, seed_users, summarize
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=200000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--keywords', nargs='+', default=['user1234', '昵称99', 'er12', 'nomatch'])
+    parser.add_argument('--backends', nargs='+', default=['like', 'fts5', 'trigram'])
+    args = parser.parse_args()
+
+    from app.utils.user_search import BACKENDS
+
+    app = make_app()
+    seed_users(app, args.users)
+    results = {'users': args.users, 'backends': {}}
+    with app.app_context():
+        for name in args.backends:
+            backend = BACKENDS[name]()
+            start = time.perf_counter()
+            backend.setup()
+            setup_ms = round((time.perf_counter() - start) * 1000, 1)
+            per_keyword = {}
+            for keyword in args.keywords:
+                latencies = []
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    hits = backend.search(keyword, 1000)
+                    latencies.append(time.perf_counter() - start)
+                per_keyword[keyword] = dict(summarize(latencies, sum(latencies)), hits=len(hits))
+            results['backends'][name] = {'setup_ms': setup_ms, 'keywords': per_keyword}
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
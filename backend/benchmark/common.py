@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""基准测试公共工具：基于 SQLite 构建应用、写入测试数据、在本地端口启动多线程服务、并发压测、统计延迟"""
+import json
+import logging
+import os
+import random
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+
+def make_app(db_path=None, **config):
+    """使用临时 SQLite 数据库构建应用，config 中的键覆盖 Config 同名属性"""
+    if db_path is None:
+        db_path = os.path.join(tempfile.mkdtemp(prefix='bench_'), 'bench.db')
+    os.environ['MYSQL_DATABASE_URI_SYNC'] = f'sqlite:///{db_path}'
+
+    from config import config as app_config
+    app_config.SQLALCHEMY_DATABASE_URI = os.environ['MYSQL_DATABASE_URI_SYNC']
+    for key, value in config.items():
+        setattr(app_config, key, value)
+
+    from app import create_app
+    from app.models import db
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def seed_users(app, count, batch=10000, password='x'):
+    """批量写入 count 个用户（username 为 user{n}），返回写入数量"""
+    from app.models import db
+    from app.models.user import User
+    with app.app_context():
+        start = db.session.execute(db.select(db.func.count(User.id))).scalar()
+        for offset in range(0, count, batch):
+            rows = [
+                {'username': f'user{n}', 'nickname': f'昵称{n}', 'password': password, 'enabled_flag': True}
+                for n in range(start + offset, start + min(offset + batch, count))
+            ]
+            db.session.execute(db.insert(User), rows)
+        db.session.commit()
+    return count
+
+
+def seed_rbac(app, roles, permissions, perms_per_role=50, roles_per_user=2, seed=0):
+    """写入 permissions 个权限、roles 个角色（每个角色随机分配 perms_per_role 个权限），
+    并给已有的每个用户随机分配 roles_per_user 个角色；返回 (角色 id 列表, 权限 id 列表)"""
+    from app.models import db, user_role, role_permission
+    from app.models.role import Role, Permission
+    from app.models.user import User
+    rng = random.Random(seed)
+    with app.app_context():
+        db.session.execute(db.insert(Permission), [
+            {'permission_code': f'perm:{n}', 'permission_name': f'权限{n}', 'permission_type': 1 + n % 4,
+             'sort': n, 'enabled_flag': True}
+            for n in range(permissions)
+        ])
+        db.session.execute(db.insert(Role), [
+            {'name': f'角色{n}', 'role_code': f'role{n}', 'status': 10, 'enabled_flag': True}
+            for n in range(roles)
+        ])
+        perm_ids = db.session.execute(db.select(Permission.id).order_by(Permission.id)).scalars().all()
+        role_ids = db.session.execute(db.select(Role.id).order_by(Role.id)).scalars().all()
+        db.session.execute(role_permission.insert(), [
+            {'role_id': role_id, 'permission_id': perm_id}
+            for role_id in role_ids for perm_id in rng.sample(perm_ids, min(perms_per_role, len(perm_ids)))
+        ])
+
+        user_ids = db.session.execute(db.select(User.id).order_by(User.id)).scalars().all()
+        for offset in range(0, len(user_ids), 10000):
+            db.session.execute(user_role.insert(), [
+                {'user_id': user_id, 'role_id': role_id}
+                for user_id in user_ids[offset:offset + 10000]
+                for role_id in rng.sample(role_ids, min(roles_per_user, len(role_ids)))
+            ])
+        db.session.commit()
+    return role_ids, perm_ids
+
+
+def run_load(request_fn, concurrency, duration=None, requests=None):
+    """用 concurrency 个线程循环调用 request_fn(worker 序号)，直到 duration 秒或共 requests 次
+
+    request_fn 返回 (是否成功, 耗时秒)；结果为 summarize 的输出加上 errors 失败次数。
+    """
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    remaining = [requests]
+    deadline = time.perf_counter() + duration if duration else None
+
+    def take():
+        if deadline is not None:
+            return time.perf_counter() < deadline
+        with lock:
+            if remaining[0] <= 0:
+                return False
+            remaining[0] -= 1
+            return True
+
+    def worker(index):
+        local, failed = [], 0
+        while take():
+            ok, elapsed = request_fn(index)
+            if ok:
+                local.append(elapsed)
+            else:
+                failed += 1
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return dict(summarize(latencies, time.perf_counter() - start), errors=errors[0])
+
+
+def serve(app):
+    """在后台线程中以多线程模式启动 WSGI 服务，返回 (base_url, server)"""
+    from werkzeug.serving import make_server
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f'http://127.0.0.1:{server.server_port}', server
+
+
+def call(url, method='GET', data=None, token=None):
+    """发送请求，返回 (http 状态码, 响应 JSON, 耗时秒)"""
+    body = json.dumps(data).encode('utf-8') if data is not None else None
+    req = urllib.request.Request(url, data=body, method=method)
+    req.add_header('Content-Type', 'application/json')
+    if token:
+        req.add_header('Authorization', f'Bearer {token}')
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req) as resp:
+            status, payload = resp.status, resp.read()
+    except urllib.error.HTTPError as e:
+        status, payload = e.code, e.read()
+    elapsed = time.perf_counter() - start
+    try:
+        return status, json.loads(payload), elapsed
+    except ValueError:
+        return status, None, elapsed
+
+
+def percentile(values, p):
+    """返回 p 分位值（p 取 0~100），values 为空时返回 0"""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, int(round(p / 100.0 * len(values))) - 1))
+    return values[index]
+
+
+def summarize(latencies, elapsed):
+    """把一组延迟（秒）汇总为毫秒分位值与吞吐量"""
+    return {
+        'count': len(latencies),
+        'rps': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+    }
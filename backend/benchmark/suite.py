@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""可复现的接口压测套件
+
+基于 SQLite 构建应用（create_app），写入指定规模的用户、角色、权限后，
+用并发负载依次压测登录、用户信息、权限列表、用户列表（翻页 / 关键字搜索）与角色权限更新，
+输出每个场景的吞吐量与 p50/p95/p99（JSON）。
+
+--mode inprocess 每个压测线程使用自己的 test_client，不经过网络；
+--mode socket 在本地端口启动多线程 WSGI 服务，经 HTTP 请求。
+
+传入 --baseline 时与之前保存的结果对比，任一场景吞吐下降或 p99 上升超过 --tolerance 则以退出码 1 结束，
+可直接用于 CI 拦截性能回退。用法（在 backend 目录下）：
+    python -m benchmark.suite --users 1000000 --roles 200 --permissions 5000 --output result.json
+    python -m benchmark.suite --baseline result.json --tolerance 0.15
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import sys
+import threading
+import time
+
+from benchmark.common import make_app, seed_users, seed_rbac, serve, call, run_load
+
+PASSWORD = 'bench123'
+SCENARIOS = ('login', 'userinfo', 'permissions', 'user_list', 'user_search', 'role_permissions')
+
+
+class InProcessRequester:
+    """每个线程一个 test_client"""
+
+    def __init__(self, app):
+        self.app = app
+        self._local = threading.local()
+
+    def __call__(self, method, path, data=None, token=None):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        headers = {'Authorization': f'Bearer {token}'} if token else None
+        start = time.perf_counter()
+        resp = client.open(path, method=method, json=data, headers=headers)
+        elapsed = time.perf_counter() - start
+        return resp.status_code, resp.get_json(silent=True), elapsed
+
+
+class HTTPRequester:
+    """经 HTTP 请求 base_url（本进程内启动的服务或外部服务）"""
+
+    def __init__(self, base_url, server=None):
+        self.base_url = base_url
+        self.server = server
+
+    def __call__(self, method, path, data=None, token=None):
+        return call(self.base_url + path, method, data, token)
+
+
+def build(args):
+    """构建应用并写入测试数据，返回 (app, 角色 id 列表, 权限 id 列表)"""
+    # 压测来自同一 IP，关闭登录限流；降低 bcrypt cost 让登录场景测的是接口本身而不是哈希
+    app = make_app(BCRYPT_ROUNDS=args.bcrypt_rounds, BCRYPT_WORKERS=0, LOGIN_LIMIT_ENABLED=False,
+                   USER_SEARCH_BACKEND=args.search_backend)
+    from app.utils.password import hash_password
+    with app.app_context():
+        # 所有用户共用同一个哈希，避免写入时逐个计算 bcrypt
+        hashed = hash_password(PASSWORD)
+    seed_users(app, args.users, password=hashed)
+    role_ids, perm_ids = seed_rbac(app, args.roles, args.permissions, args.perms_per_role, args.roles_per_user,
+                                   args.seed)
+    return app, role_ids, perm_ids
+
+
+def scenarios(args, role_ids, perm_ids, tokens):
+    """场景名 -> 生成一次请求参数的函数 (rng, worker 序号) -> (method, path, data, token)"""
+    users, pages = args.users, max(1, min(args.users // args.page_size, args.max_page))
+
+    def token_of(worker):
+        return tokens[worker % len(tokens)]
+
+    return {
+        'login': lambda rng, w: ('POST', '/api/v1/system/auth/login',
+                                 {'username': f'user{rng.randrange(users)}', 'password': PASSWORD}, None),
+        'userinfo': lambda rng, w: ('GET', '/api/v1/system/auth/userinfo', None, token_of(w)),
+        'permissions': lambda rng, w: ('GET', '/api/v1/system/auth/permissions', None, token_of(w)),
+        'user_list': lambda rng, w: ('GET', f'/api/v1/system/user?page={rng.randint(1, pages)}'
+                                            f'&pageSize={args.page_size}', None, token_of(w)),
+        'user_search': lambda rng, w: ('GET', f'/api/v1/system/user?keyword=user{rng.randrange(users)}'
+                                              f'&pageSize={args.page_size}', None, token_of(w)),
+        'role_permissions': lambda rng, w: ('PUT', f'/api/v1/system/role/{rng.choice(role_ids)}/permissions',
+                                            {'permission_ids': rng.sample(perm_ids, min(args.perms_per_role,
+                                                                                        len(perm_ids)))},
+                                            token_of(w)),
+    }
+
+
+def login_tokens(requester, args) -> list:
+    """用前几个用户登录，各压测线程轮流使用这些 token"""
+    tokens = []
+    for n in range(min(args.users, max(args.concurrency, 1))):
+        status, body, _ = requester('POST', '/api/v1/system/auth/login', {'username': f'user{n}', 'password': PASSWORD})
+        if status != 200:
+            sys.exit(f'登录失败：{body}')
+        tokens.append(body['data']['access_token'])
+    return tokens
+
+
+def run_scenario(requester, make_request, args):
+    rngs = [random.Random(args.seed + i) for i in range(args.concurrency)]
+
+    def request_fn(worker):
+        method, path, data, token = make_request(rngs[worker], worker)
+        status, _, elapsed = requester(method, path, data, token)
+        return status == 200, elapsed
+
+    if args.warmup:
+        run_load(request_fn, args.concurrency, duration=args.warmup)
+    return run_load(request_fn, args.concurrency, duration=args.duration)
+
+
+def environment(args) -> dict:
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'sqlite': sqlite3.sqlite_version,
+        'args': {k: v for k, v in vars(args).items() if k not in ('baseline', 'output')},
+    }
+
+
+def compare(results, baseline, tolerance) -> list:
+    """与基线对比，返回回退项列表"""
+    regressions = []
+    for name, current in results.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        if before['rps'] and current['rps'] < before['rps'] * (1 - tolerance):
+            regressions.append({'scenario': name, 'metric': 'rps', 'baseline': before['rps'],
+                                'current': current['rps']})
+        if before['p99_ms'] and current['p99_ms'] > before['p99_ms'] * (1 + tolerance):
+            regressions.append({'scenario': name, 'metric': 'p99_ms', 'baseline': before['p99_ms'],
+                                'current': current['p99_ms']})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--roles', type=int, default=200)
+    parser.add_argument('--permissions', type=int, default=5000)
+    parser.add_argument('--perms-per-role', type=int, default=50)
+    parser.add_argument('--roles-per-user', type=int, default=2)
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument('--mode', choices=('inprocess', 'socket'), default='inprocess')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10, help='每个场景的压测秒数')
+    parser.add_argument('--warmup', type=float, default=1, help='每个场景正式压测前的预热秒数')
+    parser.add_argument('--page-size', type=int, default=20)
+    parser.add_argument('--max-page', type=int, default=500, help='用户列表随机翻页的最大页码')
+    parser.add_argument('--bcrypt-rounds', type=int, default=4)
+    parser.add_argument('--search-backend', default='auto')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='结果另存为 JSON 文件')
+    parser.add_argument('--baseline', help='基线结果 JSON 文件')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='允许的回退比例')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    app, role_ids, perm_ids = build(args)
+    seed_seconds = round(time.perf_counter() - start, 1)
+
+    requester = InProcessRequester(app) if args.mode == 'inprocess' else HTTPRequester(*serve(app))
+    tokens = login_tokens(requester, args)
+    makers = scenarios(args, role_ids, perm_ids, tokens)
+    results = {name: run_scenario(requester, makers[name], args) for name in args.scenarios}
+    if isinstance(requester, HTTPRequester):
+        requester.server.shutdown()
+
+    report = {'environment': dict(environment(args), seed_seconds=seed_seconds), 'scenarios': results}
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        report['regressions'] = compare(results, baseline.get('scenarios', {}), args.tolerance)
+
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    print(text)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    if report.get('regressions'):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
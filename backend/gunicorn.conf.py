@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""gunicorn 配置：gunicorn -c gunicorn.conf.py（应用由 wsgi_app 指定，命令行不要再传 main:app）
+
+SERVER_WORKER_CLASS 选择 worker 模型（默认 gthread），worker 数默认按 CPU 核数计算（SERVER_WORKERS 可覆盖）：
+- gthread  多进程 + 线程池；workers = CPU + 1，每个进程 SERVER_THREADS 个线程。
+           请求在线程中执行，流式导出、大批量导入这类长请求不会触发 worker 超时
+- sync     多进程，每个进程同时处理一个请求；workers = 2 * CPU + 1。CPU 密集、请求短时可用；
+           一个请求超过 timeout 秒 worker 即被杀掉，默认 timeout 因此放宽到 SERVER_SYNC_TIMEOUT（300 秒）
+- gevent   多进程 + 协程（需安装 gevent）；workers = CPU，每个进程最多 SERVER_WORKER_CONNECTIONS 个连接。
+           慢客户端、长连接多时用；PyMySQL 为纯 Python 实现，打补丁后查询不阻塞其它协程
+- asgi     uvicorn worker 运行 main:asgi_app（需安装 uvicorn、asgiref）；workers = CPU
+
+SERVER_PRELOAD（默认开启）在 master 进程中加载应用后再 fork，各 worker 写时复制共享代码与只读数据，
+启动更快、内存更省；master 就绪后关闭自己的数据库连接，fork 后各 worker 在 post_fork 中丢弃继承来的连接池并预热。
+后台线程（批量写日志）、bcrypt 进程池都按 pid 懒启动，不受 fork 影响。
+
+worker 处理 SERVER_MAX_REQUESTS 个请求后（加 SERVER_MAX_REQUESTS_JITTER 随机量，避免同时重启）由 master 替换，
+控制内存碎片与泄漏；kill -HUP <master pid> 平滑重载：新 worker 起来后旧 worker 在 graceful_timeout 内处理完
+进行中的请求再退出。开启 preload 时 HUP 不会重新加载代码，上线新代码需要重启 master（或 USR2 + WINCH 切换）。
+
+多 worker 时进程内存储（*_STORE=memory）各进程互不相通：token 吊销只在处理登出的进程生效，因此拒绝启动；
+登录限流的计数按进程分散（实际上限约为配置的 workers 倍），启动时给出警告。
+/metrics 的计数、直方图同样按进程累计，每次抓取落到一个 worker，样本带 worker（pid）标签区分，
+查询时按 worker 求 rate 再求和（见 app/utils/metrics.py）。
+
+各模式在本机的吞吐可用 python -m benchmark.bench_serving 测量。
+"""
+import multiprocessing
+import os
+
+worker_class = os.getenv('SERVER_WORKER_CLASS', 'gthread')
+if worker_class == 'gevent':
+    # 必须在导入应用之前打补丁，preload 时 master 中创建的锁、socket 才是协程友好的
+    from gevent import monkey
+    monkey.patch_all()
+
+cpus = multiprocessing.cpu_count()
+_default_workers = {'sync': 2 * cpus + 1, 'gthread': cpus + 1, 'gevent': cpus, 'asgi': cpus}
+
+bind = os.getenv('SERVER_BIND', '0.0.0.0:8100')
+workers = int(os.getenv('SERVER_WORKERS', 0)) or _default_workers[worker_class]
+# sync 模式下 threads 大于 1 时 gunicorn 会自动改用 gthread，只有 gthread 使用线程数
+threads = int(os.getenv('SERVER_THREADS', 4)) if worker_class == 'gthread' else 1
+# 写回实际使用的值，应用据此计算连接池大小（app.utils.db_pool.auto_pool_size）
+os.environ['SERVER_WORKER_CLASS'] = worker_class
+os.environ['SERVER_THREADS'] = str(threads)
+worker_connections = int(os.getenv('SERVER_WORKER_CONNECTIONS', 1000))
+wsgi_app = 'main:app'
+if worker_class == 'asgi':
+    worker_class = 'uvicorn.workers.UvicornWorker'
+    wsgi_app = 'main:asgi_app'
+
+preload_app = os.getenv('SERVER_PRELOAD', 'true').lower() in ('1', 'true')
+max_requests = int(os.getenv('SERVER_MAX_REQUESTS', 10000))
+max_requests_jitter = int(os.getenv('SERVER_MAX_REQUESTS_JITTER', max_requests // 10))
+# sync worker 在一个请求内超过 timeout 秒即被 SIGKILL，其它模型的 timeout 只针对失去响应的进程
+timeout = int(os.getenv('SERVER_TIMEOUT', 0)) or (
+    int(os.getenv('SERVER_SYNC_TIMEOUT', 300)) if worker_class == 'sync' else 60
+)
+graceful_timeout = int(os.getenv('SERVER_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.getenv('SERVER_KEEPALIVE', 5))
+backlog = int(os.getenv('SERVER_BACKLOG', 2048))
+
+accesslog = os.getenv('SERVER_ACCESS_LOG') or None
+errorlog = '-'
+loglevel = os.getenv('SERVER_LOG_LEVEL', 'info')
+
+
+# 多进程部署时不能使用进程内存储的配置：(配置项, 是否拒绝启动, 说明)
+# 运行指标（/metrics）也是进程内的，不在此检查：样本带 worker 标签，各 worker 各成序列
+_MEMORY_STORES = (
+    ('TOKEN_DENYLIST_STORE', True, '登出、强制下线只在处理该请求的 worker 中吊销 token'),
+    ('LOGIN_LIMIT_STORE', False, '登录限流计数按 worker 分散，实际上限约为配置的 workers 倍'),
+)
+
+
+def on_starting(server):
+    """多 worker 时检查进程内存储配置"""
+    if workers <= 1:
+        return
+    from config import config
+    refused = False
+    for name, fatal, reason in _MEMORY_STORES:
+        if getattr(config, name) != 'memory':
+            continue
+        if fatal:
+            server.log.error('%s=memory 不能用于多 worker（workers=%d）：%s，请改为 sql', name, workers, reason)
+            refused = True
+        else:
+            server.log.warning('%s=memory 且 workers=%d：%s，建议改为 sql', name, workers, reason)
+    if refused:
+        raise SystemExit(1)
+
+
+def when_ready(server):
+    """master 不处理请求，关闭 preload 时建立的连接，只保留各 worker 自己的"""
+    if not preload_app:
+        return
+    from main import app
+    from app.models import db
+    with app.app_context():
+        db.engine.dispose()
+
+
+def post_fork(server, worker):
+    """丢弃从 master 继承的连接池，各 worker 使用自己的数据库连接并预热"""
+    if not preload_app:
+        return
+    from main import app
+    from app.models import db
+    from app.utils.db_pool import warmup
+    with app.app_context():
+        db.engine.dispose(close=False)
+    warmup(app)
+
+
+def post_worker_init(worker):
+    """worker 启动监控线程：持有文件锁的一个 worker 采样，其余读取共享数据并在它退出时接替"""
+    from app.utils.server_monitor import server_monitor
+    server_monitor.start()
@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+"""生产环境入口
+
+WSGI：gunicorn -c gunicorn.conf.py（worker 模型见 gunicorn.conf.py）
+ASGI：SERVER_WORKER_CLASS=asgi gunicorn -c gunicorn.conf.py，或 uvicorn main:asgi_app（需要安装 asgiref；由线程池执行 WSGI 应用，适合与其它 ASGI 服务统一部署）
+"""
+from app import create_app
+
+app = create_app()
+
+
+def __getattr__(name):
+    # 只有 ASGI 方式启动时才需要 asgiref
+    if name == 'asgi_app':
+        from asgiref.wsgi import WsgiToAsgi
+        globals()['asgi_app'] = WsgiToAsgi(app)
+        return globals()['asgi_app']
+    raise AttributeError(name)
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+"""测试基于临时 SQLite 数据库构建应用，在 backend 目录下运行：python -m pytest tests"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope='session')
+def app(tmp_path_factory):
+    from benchmark.common import make_app
+    # 关闭随机触发的后台写回，每次请求执行的 SQL 条数确定
+    return make_app(
+        str(tmp_path_factory.mktemp('db') / 'test.db'),
+        BCRYPT_WORKERS=0,
+        BCRYPT_ROUNDS=4,
+        SESSION_FLUSH_INTERVAL=3600,
+        TOKEN_DENYLIST_REFRESH=3600,
+        DB_POOL_WARMUP=False,
+    )
+
+
+@pytest.fixture(scope='session')
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture(scope='session')
+def admin_headers(app, client):
+    from app.models import db
+    from app.models.user import User
+    from app.models.role import Role
+    from app.utils.password import hash_password
+    with app.app_context():
+        role = Role(name='超级管理员', role_code='admin')
+        db.session.add(User(username='admin', nickname='管理员', password=hash_password('123456'), roles=[role]))
+        db.session.commit()
+    data = client.post('/api/v1/system/auth/login', json={'username': 'admin', 'password': '123456'}).get_json()
+    return {'Authorization': f'Bearer {data["data"]["access_token"]}'}
@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+"""菜单、部门更新：整数字段不能为 null，名称与新建时一样去除首尾空白"""
+MENU = '/api/v1/system/menu'
+DEPT = '/api/v1/system/dept'
+
+
+def test_menu_update_validates_fields(client, admin_headers):
+    menu = client.post(MENU, headers=admin_headers, json={'menu_name': 'm1', 'menu_type': 'M'}).get_json()['data']
+    url = f'{MENU}/{menu["id"]}'
+    for body in ({'order_num': None}, {'status': None}, {'visible': '1'}, {'is_cache': 2}):
+        assert client.put(url, headers=admin_headers, json=body).status_code == 400, body
+
+    data = client.put(url, headers=admin_headers, json={'menu_name': '  m2  ', 'order_num': 3}).get_json()['data']
+    assert (data['menu_name'], data['order_num']) == ('m2', 3)
+
+
+def test_dept_update_validates_fields(client, admin_headers):
+    dept = client.post(DEPT, headers=admin_headers, json={'dept_name': 'd1'}).get_json()['data']
+    url = f'{DEPT}/{dept["id"]}'
+    for body in ({'sort': None}, {'status': None}, {'sort': '1'}):
+        assert client.put(url, headers=admin_headers, json=body).status_code == 400, body
+
+    data = client.put(url, headers=admin_headers, json={'dept_name': '  d2  ', 'sort': 5}).get_json()['data']
+    assert (data['dept_name'], data['sort']) == ('d2', 5)
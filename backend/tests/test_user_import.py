@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+"""用户批量导入：0 是有效的状态值，只有空值才取默认值"""
+import json
+
+IMPORT = '/api/v1/system/user/import'
+
+
+def _statuses(app, *usernames):
+    from app.models.user import User
+    with app.app_context():
+        return {u.username: u.status for u in User.query.filter(User.username.in_(usernames))}
+
+
+def test_import_ndjson_keeps_disabled_status(app, client, admin_headers):
+    body = '\n'.join(json.dumps(row) for row in (
+        {'username': 'imp_off', 'password': 'secret1', 'status': 0},
+        {'username': 'imp_on', 'password': 'secret1'},
+    ))
+    data = client.post(IMPORT, headers=admin_headers, data=body, query_string={'format': 'ndjson'},
+                       content_type='application/x-ndjson').get_json()['data']
+    assert data['created'] == 2
+    assert _statuses(app, 'imp_off', 'imp_on') == {'imp_off': 0, 'imp_on': 1}
+
+
+def test_import_csv_keeps_disabled_status(app, client, admin_headers):
+    body = 'username,password,status\nimp_csv_off,secret1,0\nimp_csv_on,secret1,\n'
+    data = client.post(IMPORT, headers=admin_headers, data=body, query_string={'format': 'csv'},
+                       content_type='text/csv').get_json()['data']
+    assert data['created'] == 2
+    assert _statuses(app, 'imp_csv_off', 'imp_csv_on') == {'imp_csv_off': 0, 'imp_csv_on': 1}
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""用户列表的 SQL 条数不随每页行数增长（角色、部门按页批量预加载，没有 N+1）"""
+import pytest
+
+from app.utils.sql_profiler import assert_max_queries, profile_queries
+
+USER_LIST = '/api/v1/system/user'
+# 当前页 + 角色 + 部门，分页模式另加一条 COUNT（token 校验走进程内缓存，不查库）
+PAGE_QUERIES = 3
+
+
+@pytest.fixture(scope='module', autouse=True)
+def users(app):
+    from benchmark.common import seed_users, seed_rbac
+    from app.models import db
+    from app.models.dept import Dept
+    from app.models.user import User
+    seed_users(app, 120)
+    seed_rbac(app, roles=5, permissions=20, perms_per_role=5, roles_per_user=2)
+    with app.app_context():
+        depts = [Dept(dept_name=f'部门{n}', path='/') for n in range(3)]
+        db.session.add_all(depts)
+        db.session.flush()
+        for dept in depts:
+            dept.path = f'/{dept.id}/'
+        for n, user in enumerate(User.query.all()):
+            user.dept_id = depts[n % 3].id
+        db.session.commit()
+
+
+def _count(client, headers, **params):
+    client.get(USER_LIST, headers=headers, query_string=params)  # 预热权限缓存
+    with profile_queries() as profile:
+        response = client.get(USER_LIST, headers=headers, query_string=params)
+    data = response.get_json()['data']
+    assert len(data['rows']) == params['pageSize']
+    assert all(row['roles'] and row['dept_name'] for row in data['rows'])
+    return profile.count
+
+
+@pytest.mark.parametrize('mode', [{}, {'skipTotal': 1}, {'cursor': ''}])
+def test_user_list_query_count_is_constant(client, admin_headers, mode):
+    small = _count(client, admin_headers, page=1, pageSize=5, **mode)
+    large = _count(client, admin_headers, page=1, pageSize=100, **mode)
+    assert small == large
+
+
+@pytest.mark.parametrize('mode, limit', [({}, PAGE_QUERIES + 1), ({'cursor': ''}, PAGE_QUERIES)])
+def test_user_list_max_queries(client, admin_headers, mode, limit):
+    client.get(USER_LIST, headers=admin_headers, query_string=dict(pageSize=50, **mode))
+    with assert_max_queries(limit, '用户列表'):
+        response = client.get(USER_LIST, headers=admin_headers, query_string=dict(pageSize=50, **mode))
+    assert response.get_json()['code'] == 200
+
+
+def test_user_list_next_cursor_page(client, admin_headers):
+    first = client.get(USER_LIST, headers=admin_headers, query_string={'cursor': '', 'pageSize': 20}).get_json()
+    cursor = first['data']['next_cursor']
+    client.get(USER_LIST, headers=admin_headers, query_string={'cursor': cursor, 'pageSize': 20})
+    with assert_max_queries(PAGE_QUERIES, '用户列表第二页'):
+        second = client.get(USER_LIST, headers=admin_headers, query_string={'cursor': cursor, 'pageSize': 20})
+    rows = second.get_json()['data']['rows']
+    assert rows[0]['id'] < first['data']['rows'][-1]['id']
+
+
+def test_user_keyword_search_respects_dept_filter(app, client, admin_headers):
+    from app.models.user import User
+    with app.app_context():
+        user = User.query.filter_by(username='user7').first()
+        dept_id = user.dept_id
+        expected = User.query.filter(User.username.like('user%'), User.dept_id == dept_id).count()
+    params = {'keyword': 'user', 'dept_id': dept_id, 'page': 1, 'pageSize': 10}
+    data = client.get(USER_LIST, headers=admin_headers, query_string=params).get_json()['data']
+    assert data['rowTotal'] == expected
+    assert data['pageTotal'] == -(-expected // 10)
+    assert len(data['rows']) == 10
+    assert all(row['dept_id'] == dept_id for row in data['rows'])
+
+
+def test_user_keyword_cursor_reports_capped_hits(client, admin_headers, monkeypatch):
+    from app.utils.user_search import user_search
+    monkeypatch.setattr(user_search, 'limit', 10)
+    params = {'keyword': 'user', 'cursor': '', 'pageSize': 6}
+    first = client.get(USER_LIST, headers=admin_headers, query_string=params).get_json()['data']
+    assert first['rowTotalCapped'] is True
+    params['cursor'] = first['next_cursor']
+    second = client.get(USER_LIST, headers=admin_headers, query_string=params).get_json()['data']
+    assert len(first['rows']) + len(second['rows']) == 10
+    assert second['next_cursor'] is None